@@ -1,16 +1,26 @@
+import time
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core import auth_cache
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.models.user import User
 
 # This tells FastAPI that the token comes from the "/login" endpoint
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-# Helper to get DB session
-def get_db():
+# Helper to get DB session (async; sync helpers can run on it via `await db.run_sync(fn, ...)`)
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Sync session for plain `def` endpoints (run in the threadpool)
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
@@ -18,24 +28,51 @@ def get_db():
         db.close()
 
 # The "Guard" Function
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-        
-    user = db.query(User).filter(User.email == email).first()
+    user = await resolve_user(token, db)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def resolve_user(token: str, db: AsyncSession) -> Optional[User]:
+    """
+    Token -> User, or None if the token is invalid/expired or the user is gone.
+    Shared by get_current_user and WebSocket endpoints (which pass the token in the query string).
+    """
+    use_cache = settings.AUTH_CACHE_ENABLED
+
+    # 1. Decode the token (or reuse the payload while it's still valid)
+    payload = auth_cache.token_cache.get(token) if use_cache else None
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        except JWTError:
+            return None
+        if use_cache:
+            auth_cache.token_cache.put(token, payload, ttl=payload.get("exp", 0) - time.time())
+    elif payload.get("exp", 0) <= time.time():
+        return None
+
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+
+    # 2. Resolve the user (cached snapshot first, DB on a miss)
+    user = auth_cache.cached_user(email) if use_cache else None
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+        if user is None:
+            return None
+        # Nothing to write: end the transaction so the connection goes back to the pool
+        # (expire_on_commit=False keeps `user` readable) instead of idling through the request
+        await db.commit()
+        if use_cache:
+            auth_cache.remember_user(user)
+    return user
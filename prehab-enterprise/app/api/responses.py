@@ -0,0 +1,45 @@
+from typing import Any, List, Optional
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # Optional: pydantic-core's encoder is the fallback
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON rendered by orjson (numpy values included), or by pydantic-core
+    without it. Endpoints return it directly for payloads they build
+    themselves (reports), which skips FastAPI's response_model validation:
+    response_model stays on the route for the OpenAPI schema only.
+    Timezone-aware UTC datetimes are written with "Z", like pydantic does.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        return to_json(content)
+
+
+def compact_report(report: dict) -> dict:
+    """What a report keeps with ?compact=true: its texts live in GET /analytics/codes."""
+    return {
+        "user_id": report.get("user_id"),
+        "report_type": report.get("report_type"),
+        "score": report.get("score"),
+        "codes": report.get("codes") or [], # Reports stored before codes existed
+    }
+
+
+def report_body(report: Optional[dict], compact: bool = False) -> Optional[dict]:
+    return compact_report(report) if compact and report is not None else report
+
+
+def report_response(report: dict, compact: bool = False, status_code: int = 200) -> FastJSONResponse:
+    return FastJSONResponse(report_body(report, compact), status_code=status_code)
+
+
+def reports_response(reports: List[dict], compact: bool = False) -> FastJSONResponse:
+    """Squad responses: {"reports": [...]}."""
+    return FastJSONResponse({"reports": [compact_report(r) for r in reports] if compact else reports})
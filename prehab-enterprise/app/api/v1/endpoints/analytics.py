@@ -1,77 +1,668 @@
-import shutil
-import os
-from fastapi import APIRouter, Depends, File, UploadFile
+import asyncio
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+import numpy as np
+from celery.result import AsyncResult
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from app.api import deps
+from app.api.responses import FastJSONResponse, report_body, report_response, reports_response
+from app.core.config import settings
+from app.core.risk_rules import rule_engine
+from app.db.session import AsyncSessionLocal
+from app.models.metrics import KeypointTrack
 from app.models.user import User
+from app.services import biometric_store, rollups
 from app.services.analysis_service import AnalysisService
+from app.services.live_analysis import LiveSession
+from app.services.result_cache import VisionResultCache
+from app.services.track_store import TrackStore
+from app.services.workload import utc_today, workload_engine
+from app.services.video_ingest import IngestedVideo, ingest_multipart, ingest_stream, multipart_openapi
 from app.core.vision_engine import VisionEngine
+from app.core.vision_pool import VisionPool
+from app.worker import analyze_video_task, celery_app, rescore_tracks_task
 
 # Import all sub-models used in the code
 from app.schemas.analytics import (
-    AnalysisInput, 
-    AnalysisResponse, 
-    MechanicsInput, 
-    LoadInput
+    AnalysisInput,
+    AnalysisResponse,
+    BulkBiometricsInput,
+    BulkInsertResponse,
+    CacheStatsResponse,
+    CodeCatalogueResponse,
+    HistoryResponse,
+    JobSubmitResponse,
+    JobStatusResponse,
+    PlayersAnalysisResponse,
+    RescoreSubmitResponse,
+    SquadAnalysisInput,
+    SquadAnalysisResponse,
+    SquadWorkloadResponse,
+    TeamSummaryResponse,
 )
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Initialize Services
 analyzer = AnalysisService()
 vision_model = VisionEngine()
+vision_pool = VisionPool() if settings.VISION_POOL_WORKERS > 0 else None
+vision_cache = VisionResultCache.from_settings()
+track_store = TrackStore.from_settings()
+
+# Report endpoints build their payloads themselves and return FastJSONResponse directly
+# (no second validation pass through AnalysisResponse). All of them take:
+#   locale:  language of alerts/recommendations (rules' own text when not translated)
+#   compact: codes only (user_id, report_type, score, codes); texts come from GET /codes
 
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_my_data(
-    data: AnalysisInput, 
-    current_user: User = Depends(deps.get_current_user)
+    data: AnalysisInput,
+    locale: Optional[str] = None,
+    compact: bool = False,
+    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """
     Standard Endpoint: Accepts JSON data (manual entry) and returns risk report.
     """
-    return await analyzer.process_metrics(current_user, data)
+    data = await db.run_sync(workload_engine.with_server_acwr, current_user, data)
+    await analyzer.load_tiers(db, [current_user])
+    report = await analyzer.process_metrics(current_user, data, locale)
+    await db.run_sync(biometric_store.save_report, current_user, data, report)
+    return report_response(report, compact)
 
-@router.post("/analyze/video", response_model=AnalysisResponse)
+@router.post("/analyze/video", response_model=AnalysisResponse, openapi_extra=multipart_openapi())
 async def analyze_video_upload(
-    file: UploadFile = File(...), 
-    current_user: User = Depends(deps.get_current_user)
+    request: Request,
+    locale: Optional[str] = None,
+    compact: bool = False,
+    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_db)
 ):
     """
     AI Vision Endpoint:
-    1. Receives a video file.
+    1. Receives a video file (multipart field "file").
     2. Runs YOLOv8 Pose Estimation (Valgus, Hip, Foot Strike).
     3. Feeds that data into the Digital Twin.
     4. Returns the Injury Risk Report.
+
+    For long clips prefer /analyze/video/jobs, which returns immediately.
     """
-    # 1. Save the video temporarily
-    temp_filename = f"temp_{file.filename}"
-    with open(temp_filename, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    try:
-        # 2. Run AI Vision (Get Dictionary of results)
-        vision_results = vision_model.analyze_video(temp_filename)
-        
-        # 3. Feed data into Digital Twin Logic
-        # Extract new metrics
-        detected_valgus = vision_results["valgus"]
-        detected_hip = vision_results["hip_rotation"]
-        detected_strike = vision_results["foot_strike"]
-
-        ai_data = AnalysisInput(
-            mechanics=MechanicsInput(
-                knee_valgus_angle=detected_valgus,
-                hip_internal_rotation=detected_hip,    # <--- NEW
-                foot_strike_pattern=detected_strike,   # <--- NEW
-                head_forward_angle=0.0 
-            ),
-            load_metrics=LoadInput(acwr=1.0) # Default load
+    # 1. Save the video once to a unique temp file, as the body arrives
+    video, _ = await ingest_multipart(request)
+
+    with video:
+        report = await _analyze_ingested(video, current_user, db, locale)
+    return report_response(report, compact)
+
+@router.post("/analyze/video/stream", response_model=AnalysisResponse)
+async def analyze_video_stream(
+    request: Request,
+    filename: Optional[str] = None,
+    locale: Optional[str] = None,
+    compact: bool = False,
+    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """
+    Same as /analyze/video, but the raw video bytes are the request body
+    (Content-Type: application/octet-stream), for clients that don't
+    speak multipart. Written to disk as it arrives, like the form upload.
+    """
+    size_hint = request.headers.get("content-length")
+    video = await ingest_stream(
+        request.stream(),
+        filename=filename,
+        size_hint=int(size_hint) if size_hint else None,
+    )
+
+    with video:
+        report = await _analyze_ingested(video, current_user, db, locale)
+    return report_response(report, compact)
+
+@router.post(
+    "/analyze/video/players",
+    response_model=PlayersAnalysisResponse,
+    openapi_extra=multipart_openapi(athlete_ids={"type": "array", "items": {"type": "integer"}}),
+)
+async def analyze_video_players(
+    request: Request,
+    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """
+    Squad drill filmed with one camera: every athlete in frame gets a
+    persistent track id and their own valgus / hip / foot strike results,
+    from a single inference pass over the clip.
+
+    Coaches may send athlete_ids (their athletes, left to right as they
+    appear in the clip): the longest tracks are matched to them by position
+    and each athlete gets a stored report, as if uploaded separately.
+    """
+    # 1. Save the clip, then check the athletes before paying for inference
+    video, fields = await ingest_multipart(request)
+    with video:
+        try:
+            athlete_ids = [int(value) for value in fields.get("athlete_ids", [])]
+        except ValueError:
+            raise HTTPException(status_code=422, detail="athlete_ids must be integers")
+        members = {}
+        if athlete_ids:
+            if current_user.role not in ("coach", "admin") or current_user.organization_id is None:
+                raise HTTPException(status_code=403, detail="Only coaches can analyze clips for other users")
+            members = await db.run_sync(_squad_members, current_user.organization_id, athlete_ids)
+
+        # 2. One pass over the clip for everybody (cached like single-athlete results)
+        cache_key = vision_cache.make_key(video.sha256, f"{vision_model.version}|players")
+        results = await vision_cache.aget(cache_key)
+        if results is None:
+            if vision_pool is not None:
+                results = await vision_pool.analyze_players(video.path)
+            else:
+                results = await run_in_threadpool(vision_model.analyze_players, video.path)
+            await vision_cache.aput(cache_key, results)
+    if not athlete_ids:
+        return results
+
+    # 3. Longest tracks -> athletes, left to right
+    players = results["players"]
+    if len(players) < len(athlete_ids):
+        raise HTTPException(
+            status_code=422, detail=f"Found {len(players)} athletes in the clip, expected {len(athlete_ids)}",
+        )
+    chosen = sorted(players, key=lambda p: p["frames_seen"], reverse=True)[:len(athlete_ids)]
+    chosen.sort(key=lambda p: p["centre"][0])
+    users = [members[uid] for uid in athlete_ids]
+    inputs = [analyzer.input_from_vision(player) for player in chosen]
+    reports = await db.run_sync(_squad_reports, current_user.organization_id, users, inputs)
+
+    # Copies: the cached results must not pick up this request's reports
+    by_track = {player["track_id"]: (user.id, report) for player, user, report in zip(chosen, users, reports)}
+    players = [
+        {**player, "user_id": by_track[player["track_id"]][0], "report": by_track[player["track_id"]][1]}
+        if player["track_id"] in by_track else player
+        for player in players
+    ]
+    return {"frames": results["frames"], "players": players}
+
+async def _analyze_ingested(video: IngestedVideo, user: User, db: AsyncSession, locale: Optional[str] = None):
+    # 2. Run AI Vision off the event loop, unless we've seen this exact clip before
+    cache_key = vision_cache.make_key(video.sha256, vision_model.version)
+    vision_results = await vision_cache.aget(cache_key)
+    track = None
+    if vision_results is None:
+        keep_track = track_store is not None
+        if vision_pool is not None:
+            vision_results = await vision_pool.analyze(video.path, keep_track=keep_track)
+        else:
+            vision_results = await run_in_threadpool(vision_model.analyze_video, video.path, keep_track=keep_track)
+        track = vision_results.pop("track", None)
+        await vision_cache.aput(cache_key, vision_results)
+
+    # 3. Feed data into Digital Twin Logic
+    ai_data = analyzer.input_from_vision(vision_results)
+    ai_data = await db.run_sync(workload_engine.with_server_acwr, user, ai_data)
+
+    # 4. Get the Prescription/Report from the Brain
+    await analyzer.load_tiers(db, [user])
+    report = await analyzer.process_metrics(user, ai_data, locale)
+
+    # 5. Keep it in the athlete's history, with the raw keypoints for later re-scoring
+    stored_track = None
+    if track_store is not None:
+        stored_track = await run_in_threadpool(
+            track_store.store, video.sha256, vision_model.extractor_version, vision_results, track,
         )
-        
-        # 4. Get the Prescription/Report from the Brain
-        report = await analyzer.process_metrics(current_user, ai_data)
-        return report
+    await db.run_sync(biometric_store.save_report, user, ai_data, report, stored_track)
+    return report
+
+@router.get("/codes", response_model=CodeCatalogueResponse)
+def report_codes(
+    locale: Optional[str] = None,
+    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_sync_db)
+):
+    """
+    What each report code means under your organization's rules: alert,
+    recommendation and points per code, per report type. Fetch it once and
+    ask for ?compact=true reports.
+    """
+    rule_engine.load_tiers(db, [current_user.organization_id])
+    return {"locale": locale, "profiles": rule_engine.catalogue(current_user.organization_id, locale)}
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def vision_cache_stats(current_user: User = Depends(deps.get_current_user)):
+    """
+    Hit/miss counters for the video result cache.
+    """
+    return await run_in_threadpool(vision_cache.stats)
+
+# === SQUAD ===
+
+@router.post("/squad/analyze", response_model=SquadAnalysisResponse)
+def analyze_squad(
+    data: SquadAnalysisInput,
+    locale: Optional[str] = None,
+    compact: bool = False,
+    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_sync_db)
+):
+    """
+    Coach Endpoint: one call returns the reports for a whole squad.
+    Athletes must belong to the coach's organization; ACWR comes from the
+    server-side workload history where there is enough of it.
+    """
+    if current_user.role not in ("coach", "admin") or current_user.organization_id is None:
+        raise HTTPException(status_code=403, detail="Squad analysis is only available to coaches")
+    if len(data.athletes) > settings.SQUAD_MAX_ATHLETES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.SQUAD_MAX_ATHLETES} athletes per request")
+
+    # 1. One query for every athlete (and the organization check)
+    ids = [athlete.user_id for athlete in data.athletes]
+    members = _squad_members(db, current_user.organization_id, ids)
+
+    # 2. + 3. Server ACWR and the rules for the whole squad
+    users = [members[uid] for uid in ids]
+    reports = _squad_reports(db, current_user.organization_id, users, [athlete.data for athlete in data.athletes], locale)
+    return reports_response(reports, compact)
+
+def _squad_members(db: Session, organization_id: int, ids) -> dict:
+    """id -> User for the requested athletes; 403 unless they all belong to the organization."""
+    members = {
+        user.id: user
+        for user in db.query(User).filter(User.id.in_(ids), User.organization_id == organization_id)
+    }
+    missing = set(ids) - members.keys()
+    if missing:
+        raise HTTPException(status_code=403, detail=f"Users not in your organization: {sorted(missing)}")
+    return members
+
+def _squad_reports(db: Session, organization_id: int, users, inputs, locale: Optional[str] = None) -> list:
+    """Server ACWR for the whole squad in one pass, vectorized rules over the batch, then one bulk write."""
+    squad_ids, state = workload_engine.squad_acwr(db, organization_id)
+    squad_acwr = dict(zip(squad_ids, state.ratios(settings.ACWR_METHOD)))
+    acwr = np.array([squad_acwr.get(user.id, np.nan) for user in users])
+    rule_engine.load_tiers(db, [organization_id])
+    reports = analyzer.build_reports(users, inputs, acwr, locale)
+
+    effective_acwr = [
+        float(value) if not np.isnan(value) else (item.load_metrics.acwr if item.load_metrics else None)
+        for value, item in zip(acwr, inputs)
+    ]
+    biometric_store.save_reports(db, organization_id, reports, effective_acwr)
+    return reports
+
+# === WEARABLE DATA ===
+
+@router.post("/biometrics/bulk", response_model=BulkInsertResponse, status_code=status.HTTP_201_CREATED)
+def bulk_ingest_biometrics(
+    data: BulkBiometricsInput,
+    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_sync_db)
+):
+    """
+    Bulk wearable sync (steps, sleep, VO2 max, ACWR): thousands of rows per call.
+    Rows default to the caller; coaches/admins may upload for their organization.
+    """
+    if len(data.rows) > settings.BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ROWS} rows per request")
+
+    rows = [row.model_dump() for row in data.rows]
+    for row in rows:
+        if row["user_id"] is None:
+            row["user_id"] = current_user.id
+
+    # One query to authorize every distinct target user
+    others = {row["user_id"] for row in rows} - {current_user.id}
+    if others:
+        if current_user.role not in ("coach", "admin") or current_user.organization_id is None:
+            raise HTTPException(status_code=403, detail="Only coaches can upload data for other users")
+        squad = db.query(User.id).filter(
+            User.id.in_(others),
+            User.organization_id == current_user.organization_id
+        ).count()
+        if squad != len(others):
+            raise HTTPException(status_code=403, detail="Some users are not in your organization")
+
+    # Every target user is the caller or in the caller's organization (checked above)
+    organizations = {row["user_id"]: current_user.organization_id for row in rows}
+    inserted = biometric_store.bulk_insert(db, rows, organizations)
+    if current_user.organization_id is not None:
+        workload_engine.invalidate(current_user.organization_id) # Rows may be back-dated
+    return {"inserted": inserted}
+
+@router.get("/squad/acwr", response_model=SquadWorkloadResponse)
+def squad_workload(
+    method: Optional[str] = None,
+    as_of: Optional[date] = None,
+    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_sync_db)
+):
+    """
+    Server-computed ACWR for every athlete in the coach's organization.
+    """
+    if current_user.role not in ("coach", "admin") or current_user.organization_id is None:
+        raise HTTPException(status_code=403, detail="Squad workload is only available to coaches")
+    method = method or settings.ACWR_METHOD
+    if method not in ("rolling", "ewma"):
+        raise HTTPException(status_code=422, detail="method must be 'rolling' or 'ewma'")
+
+    as_of = as_of or utc_today()
+    user_ids, state = workload_engine.squad_acwr(db, current_user.organization_id, as_of)
+    ratios = state.ratios(method)
+    acute, chronic = state.loads(method)
+
+    names = dict(db.query(User.id, User.full_name).filter(User.id.in_(user_ids)).all())
+    return {
+        "organization_id": current_user.organization_id,
+        "as_of": as_of,
+        "method": method,
+        "athletes": [
+            {
+                "user_id": user_id,
+                "full_name": names.get(user_id),
+                "acwr": None if np.isnan(ratios[i]) else float(ratios[i]),
+                "acute_load": float(acute[i]),
+                "chronic_load": float(chronic[i]),
+            }
+            for i, user_id in enumerate(user_ids)
+        ],
+    }
 
+# === HISTORY ===
+
+@router.get("/history", response_model=HistoryResponse)
+def history(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user_id: Optional[int] = None,
+    organization: bool = False,
+    resolution: str = "auto",
+    max_points: Optional[int] = Query(None, ge=1, le=5000),
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_sync_db)
+):
+    """
+    Biometric history from the daily/weekly rollups, downsampled to at most
+    `max_points` buckets ("auto") and paginated with `next_cursor`. Defaults
+    to your own last 90 days; coaches can read any athlete of their
+    organization (`user_id`) or the organization as a whole. `resolution=raw`
+    pages through individual logs (one athlete only).
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=89)
+    if start > end:
+        raise HTTPException(status_code=422, detail="start must not be after end")
+
+    # 1. Whose history
+    is_coach = current_user.role in ("coach", "admin") and current_user.organization_id is not None
+    if organization or (user_id is not None and user_id != current_user.id):
+        if not is_coach:
+            raise HTTPException(status_code=403, detail="Only coaches can read other athletes' history")
+    if organization:
+        scope, scope_id = "org", current_user.organization_id
+    elif user_id is not None and user_id != current_user.id:
+        athlete = db.query(User.organization_id).filter(User.id == user_id).scalar()
+        if athlete != current_user.organization_id:
+            raise HTTPException(status_code=404, detail="Athlete not found in your organization")
+        scope, scope_id = "user", user_id
+    else:
+        scope, scope_id = "user", current_user.id
+
+    # 2. Rollups (or raw logs)
+    try:
+        if resolution == "raw":
+            if scope != "user":
+                raise ValueError("raw resolution is per athlete")
+            return rollups.read_raw(db, scope_id, start, end, limit, cursor)
+        return rollups.read_series(db, scope, scope_id, start, end, resolution, max_points, limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@router.get("/team/summary", response_model=TeamSummaryResponse)
+def team_summary(
+    days: int = Query(7, ge=1, le=366),
+    end: Optional[date] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_sync_db)
+):
+    """
+    Per-athlete averages over the last `days` days for the coach's
+    organization, from the daily rollups. Paginated by athlete id.
+    """
+    if current_user.role not in ("coach", "admin") or current_user.organization_id is None:
+        raise HTTPException(status_code=403, detail="Team summary is only available to coaches")
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=422, detail="invalid cursor")
+    end = end or datetime.now(timezone.utc).date()
+    start = end - timedelta(days=days - 1)
+    return rollups.read_team(db, current_user.organization_id, start, end, limit, int(cursor) if cursor else None)
+
+# === LIVE STREAM ===
+
+@router.websocket("/analyze/live")
+async def live_analysis(
+    websocket: WebSocket,
+    token: str = Query(...),
+    fps: float = Query(30.0, gt=0, le=240),
+):
+    """
+    Pitch-side camera feed. Send each frame as one binary message (JPEG/PNG).
+    Pushes back JSON messages:
+      - {"type": "metrics", ...}: rolling valgus/hip/foot strike over the last
+        LIVE_WINDOW_SECONDS, after every processed batch
+      - {"type": "report", ...}: the AnalysisService report, whenever its alerts change
+      - {"type": "summary", ...}: the whole-session report, after the client sends the text "end"
+      - {"type": "error", ...}: processing failed; the socket is closed (1011) right after
+    Frames that arrive while the model is busy are dropped (oldest first).
+    The token goes in the query string because browsers can't set headers on WebSockets.
+    """
+    # 1. Auth + server-side ACWR once per session
+    async with AsyncSessionLocal() as db:
+        user = await deps.resolve_user(token, db)
+        if user is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        load = (await db.run_sync(workload_engine.with_server_acwr, user, AnalysisInput())).load_metrics
+        await analyzer.load_tiers(db, [user]) # Kept (even stale) for the whole session
+
+    await websocket.accept()
+    session = LiveSession(vision_model, fps=fps)
+    processor = asyncio.create_task(_live_processor(websocket, session, user, load))
+
+    # 2. Read frames as fast as they come; the processor consumes them in batches
+    ended = disconnected = False
+    try:
+        while not processor.done(): # A failed processor ends the session
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                disconnected = True
+                break
+            if message.get("bytes"):
+                session.push(message["bytes"])
+            elif message.get("text") == "end":
+                ended = True
+                break
     finally:
-        # Cleanup: Delete the video file to save space
-        if os.path.exists(temp_filename):
-            os.remove(temp_filename)
\ No newline at end of file
+        failure = await _stop(processor)
+
+    if failure is not None:
+        logger.error("Live analysis failed for user %s", user.id, exc_info=failure)
+        if not disconnected:
+            await websocket.send_json({"type": "error", "detail": "Live analysis failed"})
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        ended = False
+
+    # 3. Keep the whole session in the athlete's history (the processor has stopped: the tracker is ours)
+    report = None
+    if session.with_pose:
+        vision_results = session.session_summary()
+        data = _live_input(vision_results, load)
+        report = analyzer.build_report(user, data)
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(biometric_store.save_report, user, data, report)
+    if ended:
+        await websocket.send_json({"type": "summary", "received": session.received,
+                                   "dropped": session.dropped, "report": report})
+        await websocket.close()
+
+async def _stop(task: asyncio.Task) -> Optional[BaseException]:
+    """Cancels `task` and waits for it; returns what it failed with (None if it was just cancelled)."""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling(): # We're being cancelled ourselves
+            raise
+    except Exception as exc:
+        return exc
+    return None
+
+async def _live_processor(websocket: WebSocket, session: LiveSession, user: User, load):
+    last_alerts = None
+    while True:
+        batch = await session.next_batch(settings.VISION_BATCH_SIZE)
+        work = asyncio.ensure_future(run_in_threadpool(session.process, batch))
+        try:
+            rolling = await asyncio.shield(work)
+        except asyncio.CancelledError:
+            # The thread can't be interrupted: finish the batch before anyone reads the tracker
+            await asyncio.wait([work])
+            raise
+        newest_frame, received_at, _ = batch[-1]
+        await websocket.send_json({
+            "type": "metrics",
+            "frame": newest_frame,
+            "latency_ms": (time.perf_counter() - received_at) * 1000,
+            "received": session.received,
+            "dropped": session.dropped,
+            **rolling,
+        })
+
+        report = analyzer.build_report(user, _live_input(rolling, load))
+        if report["alerts"] != last_alerts:
+            last_alerts = report["alerts"]
+            await websocket.send_json({"type": "report", "frame": newest_frame, **report})
+
+def _live_input(vision_results: dict, load) -> AnalysisInput:
+    data = analyzer.input_from_vision(vision_results)
+    return data.model_copy(update={"load_metrics": load}) if load is not None else data
+
+# === BACKGROUND JOBS ===
+
+JOB_FAILED = "Job failed"
+
+def _job_id(user: User) -> str:
+    """
+    Job ids carry their owner: "<user id>-<uuid4>". They are assigned here,
+    at submission, so the owner can't be forged and the uuid can't be guessed.
+    """
+    return f"{user.id}-{uuid.uuid4()}"
+
+def _owned_job(job_id: str, user: User) -> AsyncResult:
+    """The job, or 404 unless `user` submitted it (checked before any state is revealed)."""
+    if job_id.partition("-")[0] != str(user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return AsyncResult(job_id, app=celery_app)
+
+@router.post(
+    "/analyze/video/jobs",
+    response_model=JobSubmitResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=multipart_openapi(),
+)
+async def submit_video_job(
+    request: Request,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Queues a video for analysis on the Celery worker and returns a job id right away.
+    Poll /jobs/{job_id} for status and the final report.
+    """
+    # The worker owns (and deletes) the file from here on
+    video, _ = await ingest_multipart(request, directory=settings.JOB_UPLOAD_DIR)
+    job = await run_in_threadpool(
+        analyze_video_task.apply_async, (current_user.id, video.path, video.sha256), task_id=_job_id(current_user),
+    )
+    return {"job_id": job.id, "status": job.status}
+
+@router.post("/tracks/rescore", response_model=RescoreSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_rescore(
+    user_id: Optional[int] = None,
+    current_user: User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_sync_db)
+):
+    """
+    Admin: re-scores every stored keypoint track (or one user's) with the
+    current scoring code and rules, without re-running the model. The tracks
+    are split into RESCORE_BATCH_SIZE chunks, one Celery job each, so the
+    workers share the archive.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Re-scoring is only available to admins")
+    if track_store is None:
+        raise HTTPException(status_code=409, detail="Keypoint tracks are not being stored (TRACK_STORE_DIR)")
+    query = db.query(KeypointTrack.id).order_by(KeypointTrack.id)
+    if user_id is not None:
+        query = query.filter(KeypointTrack.user_id == user_id)
+    track_ids = [track_id for track_id, in query.all()]
+
+    size = settings.RESCORE_BATCH_SIZE
+    jobs = [
+        rescore_tracks_task.apply_async((track_ids[start:start + size],), task_id=_job_id(current_user))
+        for start in range(0, len(track_ids), size)
+    ]
+    return {"tracks": len(track_ids), "job_ids": [job.id for job in jobs]}
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: str,
+    compact: bool = False,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Returns the job state, plus the report once it has finished.
+    """
+    job = _owned_job(job_id, current_user)
+    response = {"job_id": job_id, "status": job.status}
+
+    if job.successful():
+        report = job.result
+        if isinstance(report, dict) and report.get("user_id") == current_user.id: # Re-score jobs have no report
+            response["report"] = report_body(report, compact)
+    elif job.failed():
+        response["error"] = JOB_FAILED # The exception stays in the worker's log
+    return FastJSONResponse(response)
+
+@router.get("/jobs/{job_id}/result", response_model=AnalysisResponse)
+async def get_job_result(
+    job_id: str,
+    compact: bool = False,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Returns only the finished report (409 while the job is still running).
+    """
+    job = _owned_job(job_id, current_user)
+    if job.failed():
+        raise HTTPException(status_code=500, detail=JOB_FAILED)
+    if not job.successful():
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+    report = job.result
+    if not isinstance(report, dict) or report.get("user_id") != current_user.id: # Also hides non-report jobs
+        raise HTTPException(status_code=404, detail="Job not found")
+    return report_response(report, compact)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
-from app.core import security
+from app.core import auth_cache, security
 from app.models.user import User, UserRole
 from pydantic import BaseModel
 
@@ -15,34 +16,56 @@ class UserCreate(BaseModel):
     full_name: str
     role: UserRole = UserRole.PUBLIC # Default to Public
 
+async def _find_user(db: AsyncSession, email: str):
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    # End the read transaction so the pooled connection isn't held while bcrypt runs
+    if user is not None:
+        db.expunge(user)
+    await db.rollback()
+    return user
+
 @router.post("/signup")
-def signup(user_in: UserCreate, db: Session = Depends(deps.get_db)):
+async def signup(user_in: UserCreate, db: AsyncSession = Depends(deps.get_db)):
     # 1. Check if user exists
-    user = db.query(User).filter(User.email == user_in.email).first()
+    user = await _find_user(db, user_in.email)
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # 2. Create new user
+    # 2. Create new user (bcrypt runs on the hashing pool, not the request threadpool)
     new_user = User(
         email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=await security.password_hasher.hash(user_in.password),
         full_name=user_in.full_name,
         role=user_in.role.value  # <--- CHANGE THIS: Add .value
     )
     db.add(new_user)
-    db.commit()
+    await db.commit()
     return {"msg": "User created successfully"}
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_db)
 ):
     # 1. Find user
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    user = await _find_user(db, form_data.username)
+    if not user or not await security.password_hasher.verify(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    # 2. Upgrade the hash if BCRYPT_ROUNDS changed since it was stored
+    if security.needs_rehash(user.hashed_password):
+        new_hash = await security.password_hasher.hash(form_data.password)
+        await db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+        await db.commit()
+        auth_cache.invalidate_user(user.email)  # Bulk UPDATE skips the ORM listener
     
-    # 2. Create Token
+    # 3. Create Token
     access_token = security.create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/cache/stats")
+def auth_cache_stats(current_user: User = Depends(deps.get_current_user)):
+    """
+    Hit/miss counters for the token and user caches behind get_current_user.
+    """
+    return auth_cache.stats()
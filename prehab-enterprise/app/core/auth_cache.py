@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from sqlalchemy import event, inspect
+from app.core.config import settings
+from app.models.user import User
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + min(self.ttl, ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._data),
+            }
+
+
+# === AUTH CACHES ===
+# token -> decoded JWT payload (never outlives the token's own "exp")
+token_cache = TTLCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+# email -> column snapshot of the User row
+user_cache = TTLCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+USER_COLUMNS = ("id", "email", "hashed_password", "full_name", "role", "organization_id")
+
+
+def remember_user(user: User):
+    user_cache.put(user.email, {column: getattr(user, column) for column in USER_COLUMNS})
+
+
+def cached_user(email: str) -> Optional[User]:
+    """
+    Returns a fresh transient User built from the cached columns, so requests
+    never share an ORM instance. Relationships are not loaded on these.
+    """
+    snapshot = user_cache.get(email)
+    return User(**snapshot) if snapshot is not None else None
+
+
+def invalidate_user(email: str):
+    user_cache.pop(email)
+
+
+def stats() -> dict:
+    return {"enabled": settings.AUTH_CACHE_ENABLED, "tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
+# Any ORM update/delete of a User in this process drops its cached snapshot.
+# Other replicas pick the change up within AUTH_CACHE_TTL_SECONDS.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_user(target.email)
+    # The email itself may have been changed
+    for old_email in inspect(target).attrs.email.history.deleted or ():
+        invalidate_user(old_email)
@@ -0,0 +1,111 @@
+from typing import Optional
+import numpy as np
+from app.core.config import settings
+
+# === COCO-17 KEYPOINT INDICES (YOLOv8 Pose layout) ===
+L_EAR, R_EAR = 3, 4
+L_SHOULDER, R_SHOULDER = 5, 6
+L_HIP, R_HIP = 11, 12
+L_KNEE, R_KNEE = 13, 14
+L_ANKLE, R_ANKLE = 15, 16
+
+# Per-side joint chains, rows = (left, right)
+SIDES = np.array([
+    [L_EAR, L_SHOULDER, L_HIP, L_KNEE, L_ANKLE],
+    [R_EAR, R_SHOULDER, R_HIP, R_KNEE, R_ANKLE],
+])
+
+# Column order of the (frames, metrics) matrices returned by compute_joint_metrics
+METRICS = (
+    "valgus_left", "valgus_right",  # |180 - hip/knee/ankle angle| in degrees
+    "hip_left", "hip_right",        # knee deviation from the hip-ankle midline / leg length
+    "shin_left", "shin_right",      # shin angle vs vertical in degrees
+    "trunk_lean",                   # shoulder-hip line vs vertical in degrees (signed)
+    "head_forward",                 # ear-shoulder line vs the trunk line in degrees (0 = stacked)
+)
+COLUMN = {name: i for i, name in enumerate(METRICS)}
+
+
+def _angle_between(v1: np.ndarray, v2: np.ndarray, default: float = np.nan) -> np.ndarray:
+    """Angle in degrees between two arrays of 2-D vectors (`default` where one has zero length)."""
+    mag = np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1)
+    dot = np.sum(v1 * v2, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_angle = np.clip(dot / mag, -1.0, 1.0)
+    return np.where(mag == 0, default, np.degrees(np.arccos(cos_angle)))
+
+
+def _combine_sides(values: np.ndarray, weights: np.ndarray):
+    """Confidence-weighted average of the left/right estimates of one metric, per frame."""
+    total = weights.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        combined = (np.where(weights > 0, values, 0.0) * weights).sum(axis=1) / total
+    return combined, np.where(total > 0, weights.max(axis=1), 0.0)
+
+
+def compute_joint_metrics(kpts: np.ndarray, min_conf: Optional[float] = None) -> dict:
+    """
+    All joint metrics for a batch of frames in one vectorized pass.
+
+    kpts: (N, 17, 3) array of [x, y, conf] keypoints (one person per frame).
+    A joint counts only if its confidence is >= min_conf and it isn't YOLO's
+    (0, 0) "not found" marker. Returns:
+        - "values":  (N, len(METRICS)) float64, NaN where a metric isn't measurable
+        - "weights": same shape, the lowest confidence of the joints behind each value (0 = masked)
+    """
+    min_conf = settings.VISION_MIN_KEYPOINT_CONF if min_conf is None else min_conf
+    kpts = np.asarray(kpts, dtype=np.float64)
+    if kpts.size == 0:
+        empty = np.empty((0, len(METRICS)), dtype=np.float64)
+        return {"values": empty, "weights": empty.copy()}
+
+    xy = kpts[..., :2]
+    conf = kpts[..., 2] if kpts.shape[-1] > 2 else np.ones(kpts.shape[:2])
+
+    # 1. Confidence mask (missing joints get weight 0)
+    conf = np.where((conf >= min_conf) & np.any(xy != 0, axis=-1), conf, 0.0)
+
+    # 2. Gather both sides at once: (N, 2 sides, 5 joints, xy)
+    side_xy = xy[:, SIDES]
+    side_conf = conf[:, SIDES]
+    ear, shoulder, hip, knee, ankle = (side_xy[:, :, j] for j in range(5))
+    c_ear, c_shoulder, c_hip, c_knee, c_ankle = (side_conf[:, :, j] for j in range(5))
+
+    # 3. LEGS (normalized by leg length)
+    leg_length = np.linalg.norm(hip - ankle, axis=-1)
+    leg_w = np.where(leg_length > 0, np.minimum(np.minimum(c_hip, c_knee), c_ankle), 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        midpoint_x = (hip[..., 0] + ankle[..., 0]) / 2
+        hip_dev = (knee[..., 0] - midpoint_x) / leg_length
+
+    # Knee angle (180 = straight leg)
+    valgus = np.abs(180 - _angle_between(hip - knee, ankle - knee, default=180.0))
+
+    # Foot strike (shin angle, undefined when the shin is horizontal)
+    dx = knee[..., 0] - ankle[..., 0]
+    dy = knee[..., 1] - ankle[..., 1]
+    shin = np.degrees(np.arctan2(dx, dy))
+    shin_w = np.where(dy != 0, leg_w, 0.0)
+
+    # 4. TRUNK (image y grows downwards, so "up" is -y)
+    trunk = shoulder - hip
+    trunk_w = np.where(np.linalg.norm(trunk, axis=-1) > 0, np.minimum(c_shoulder, c_hip), 0.0)
+    lean = np.degrees(np.arctan2(trunk[..., 0], -trunk[..., 1]))
+
+    # 5. HEAD (forward head = ear drifting ahead of the trunk line)
+    head = _angle_between(ear - shoulder, trunk)
+    head_w = np.where(np.isnan(head), 0.0, np.minimum(c_ear, trunk_w))
+
+    lean, lean_w = _combine_sides(lean, trunk_w)
+    head, head_w = _combine_sides(head, head_w)
+
+    values = np.column_stack([
+        valgus[:, 0], valgus[:, 1], hip_dev[:, 0], hip_dev[:, 1], shin[:, 0], shin[:, 1], lean, head,
+    ])
+    weights = np.column_stack([
+        leg_w[:, 0], leg_w[:, 1], leg_w[:, 0], leg_w[:, 1], shin_w[:, 0], shin_w[:, 1], lean_w, head_w,
+    ])
+    values[weights == 0] = np.nan
+    return {"values": values, "weights": weights}
+
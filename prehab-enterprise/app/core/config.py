@@ -6,12 +6,115 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    # Auth caches (decoded tokens + resolved users, per process)
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL_SECONDS: int = 60     # Max staleness of role/org changes across replicas
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_SIZE: int = 10000
+
+    # Password hashing (bcrypt runs on its own bounded pool)
+    BCRYPT_ROUNDS: int = 12          # Changing this rehashes users transparently on their next login
+    BCRYPT_WORKERS: int = 4          # Concurrent hashes (~1 per core you can spare)
+    BCRYPT_MAX_PENDING: int = 64     # Queued hashes beyond this get a 429
     
+    # Observability: GET /metrics (Prometheus text format) + request/DB/vision instrumentation
+    METRICS_ENABLED: bool = False  # Off = instrumentation is a no-op and /metrics is 404
+
     # Database
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # None = DATABASE_URL with its async driver (asyncpg / aiosqlite)
+    # (on SQLite aiosqlite is slower than the sync driver: see bench_db_concurrency)
+    # Connection pool (applied per engine; the API process has a sync and an async engine)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30     # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800   # Reconnect after this many seconds (stay under server/proxy idle timeouts)
 
     # Redis / Celery (This was missing!)
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
+    CELERY_RESULT_BACKEND: str = "redis://localhost:6379/1"
+    # Tests/dev without Redis: CELERY_BROKER_URL=memory:// CELERY_RESULT_BACKEND=cache+memory://
+    # and CELERY_TASK_ALWAYS_EAGER=true to run jobs in-process.
+    CELERY_TASK_ALWAYS_EAGER: bool = False
+    JOB_UPLOAD_DIR: str = "uploads"  # Must be shared between API and worker hosts
+
+    # AI Vision
+    VISION_MODEL_NAME: str = "yolov8n-pose.pt"
+    # Inference runtime: "pytorch" | "onnx" (ONNX Runtime) | "openvino". Non-PyTorch models are
+    # exported from VISION_MODEL_NAME once and cached in VISION_MODEL_CACHE_DIR.
+    VISION_BACKEND: str = "pytorch"
+    VISION_INT8: bool = False               # onnx: dynamic weight quantization, openvino: NNCF calibration (not pytorch)
+    VISION_INT8_CALIBRATION_DATA: str = "coco8-pose.yaml"  # Dataset yaml for OpenVINO INT8 calibration
+    VISION_MODEL_CACHE_DIR: str = "model_cache"
+    VISION_WARMUP_ON_STARTUP: bool = False  # Load the model in the background at startup (else on first video)
+    VISION_BATCH_SIZE: int = 16   # Frames per YOLO call (1 = legacy per-frame loop)
+    VISION_FRAME_STRIDE: int = 3  # Process every Nth frame ("stride" mode)
+    # Frame sampling: "stride" | "fps" | "budget" | "motion" (see app/core/sampling.py)
+    VISION_SAMPLING_MODE: str = "stride"
+    VISION_TARGET_SAMPLE_FPS: float = 10.0  # "fps"/"motion": samples per second of video
+    VISION_MAX_FRAMES: Optional[int] = None # Hard cap on inferred frames per clip (all modes)
+    VISION_MOTION_THRESHOLD: float = 0.02   # Leg-lengths moved per frame that counts as "fast"
+    VISION_MOTION_BATCH_SIZE: int = 2       # "motion": frames per YOLO call (feedback lags one batch)
+    VISION_MIN_KEYPOINT_CONF: float = 0.3   # Joints below this confidence are treated as missing
+    # Preprocessing before the model (app/core/roi.py)
+    VISION_DECODE_MAX_SIDE: Optional[int] = None # Downscale decoded frames to this long side (None = as decoded)
+    VISION_ROI: bool = False                # Infer on a crop around the athlete's last box (single-athlete clips)
+    VISION_ROI_IMGSZ: int = 320             # Model input size for crops (whole frames keep the model default)
+    VISION_ROI_PADDING: float = 0.5         # Fraction of the box's long side added per side of the crop
+    VISION_ROI_MIN_SIDE: int = 192          # Crops are never smaller than this (original pixels)
+    VISION_ROI_REDETECT_EVERY: int = 30     # Sampled frames between whole-frame re-detections
+    # Temporal stage (app/core/gait.py): keypoint smoothing + stride segmentation
+    VISION_SMOOTHING: str = "none"          # "one_euro" | "none" (at 10 samples/s One-Euro lags the ankle: see bench_gait)
+    VISION_ONE_EURO_MIN_CUTOFF: float = 1.0 # Hz; lower = smoother when joints are slow
+    VISION_ONE_EURO_BETA: float = 0.1       # Per px/s; higher = less lag when joints move fast
+    VISION_MAX_STRIDES: int = 200           # Per-stride summaries kept per clip (most recent)
+    # Multi-athlete clips (app/core/tracking.py, POST /analyze/video/players)
+    VISION_MAX_PLAYERS: int = 12                # People kept per frame (most confident first)
+    VISION_TRACK_IOU: float = 0.2               # Min box overlap with a track's predicted box to continue it
+    VISION_TRACK_MAX_GAP_SECONDS: float = 1.0   # Unseen longer than this = track closed (re-entry gets a new id)
+    VISION_MIN_TRACK_SECONDS: float = 2.0       # Shorter tracks (passers-by, flicker) are not reported
+    # Process pool (0 = run inference in the API process)
+    VISION_POOL_WORKERS: int = 0
+    VISION_SEGMENT_MIN_FRAMES: int = 900    # Clips shorter than 2x this are not split
+
+    # Live stream analysis (WebSocket /analyze/live)
+    LIVE_MAX_PENDING_FRAMES: int = 8    # Frames waiting for the model; older ones are dropped beyond this
+    LIVE_WINDOW_SECONDS: float = 5.0    # Rolling window for the pushed metrics
+
+    # Video Uploads
+    MAX_UPLOAD_MB: int = 1024
+    VIDEO_IN_MEMORY_MAX_MB: int = 64     # Smaller clips are spooled to tmpfs (/dev/shm)
+    VIDEO_TMP_DIR: Optional[str] = None  # None = system temp dir
+
+    # Risk rules (app/core/risk_rules.py)
+    RISK_RULES_PATH: Optional[str] = None    # JSON overlay on the built-in rules (per tier / organization)
+    RISK_RULES_RELOAD_SECONDS: float = 5.0   # How often each worker checks the file for changes
+    RISK_RULES_TIER_TTL_SECONDS: int = 300   # Cache of organization -> subscription tier
+
+    # Squad batch analysis
+    SQUAD_MAX_ATHLETES: int = 2000
+
+    # Bulk wearable ingestion
+    BULK_MAX_ROWS: int = 50000
+    BULK_INSERT_BATCH_SIZE: int = 1000
+
+    # Workload (ACWR) engine
+    ACWR_METHOD: str = "rolling"     # "rolling" (7:28 coupled averages) | "ewma"
+    ACWR_HISTORY_DAYS: int = 90      # Days of history used to seed a squad's state
+
+    # Vision Result Cache (keyed by video sha256 + model/config version)
+    VISION_CACHE_MAX_ENTRIES: int = 1024
+    VISION_CACHE_PATH: Optional[str] = None  # SQLite file for the persistent tier (None = memory only)
+    VISION_CACHE_DISK_MAX_MB: int = 256
+
+    # Keypoint tracks (raw pose keypoints per analyzed video, for re-scoring without re-inference)
+    TRACK_STORE_DIR: Optional[str] = "tracks"  # None = don't keep keypoints. Must be shared by API and worker hosts
+    RESCORE_BATCH_SIZE: int = 200              # Tracks per DB round trip / commit in the re-score job
+
+    # History (daily/weekly rollups of BiometricLog)
+    HISTORY_MAX_POINTS: int = 366    # "auto" resolution picks the finest buckets that fit in this many points
+    HISTORY_PAGE_SIZE: int = 500     # Points (buckets, logs or athletes) per page
 
     class Config:
         case_sensitive = True
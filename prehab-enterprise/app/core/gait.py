@@ -0,0 +1,334 @@
+import math
+from collections import deque
+from typing import List, Optional
+import numpy as np
+from app.core.config import settings
+from app.core.biomechanics import COLUMN, METRICS, L_ANKLE, L_HIP, R_ANKLE, R_HIP, compute_joint_metrics
+
+# Metrics that get a streaming 85th percentile (the rest only need weighted means)
+QUANTILE_METRICS = ("valgus_left", "valgus_right")
+FEET = {"left": (L_HIP, L_ANKLE), "right": (R_HIP, R_ANKLE)}
+
+
+# === 1. ONLINE SMOOTHING ===
+
+class OneEuroFilter:
+    """
+    One-Euro filter (Casiez et al. 2012) over a whole keypoint array at once:
+    heavy smoothing while a joint is slow, less lag when it moves fast.
+    Each joint keeps its own state and restarts after a gap longer than `reset_after` seconds.
+    """
+
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 0.01, d_cutoff: float = 1.0, reset_after: float = 0.5):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset_after = reset_after
+        self._x = None  # (joints, 2) last filtered position
+        self._dx = None # (joints, 2) last filtered velocity
+        self._t = None  # (joints,) time each joint was last seen
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, t: float, xy: np.ndarray, seen: np.ndarray) -> np.ndarray:
+        """Filters one frame. xy: (joints, 2); seen: (joints,) bool. Unseen joints pass through unchanged."""
+        if self._x is None:
+            self._x = xy.copy()
+            self._dx = np.zeros_like(xy)
+            self._t = np.where(seen, t, -np.inf)
+            return xy
+
+        dt = t - self._t
+        fresh = seen & ~(dt <= self.reset_after)  # First sighting or long gap: restart from the raw point
+        dt = np.maximum(np.where(np.isfinite(dt), dt, 1.0), 1e-3)[:, None]
+
+        dx = (xy - self._x) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        dx_hat = a_d * dx + (1 - a_d) * self._dx
+        cutoff = self.min_cutoff + self.beta * np.linalg.norm(dx_hat, axis=1, keepdims=True)
+        a = self._alpha(cutoff, dt)
+        x_hat = a * xy + (1 - a) * self._x
+
+        x_hat[fresh] = xy[fresh]
+        dx_hat[fresh] = 0.0
+        update = seen[:, None]
+        self._x = np.where(update, x_hat, self._x)
+        self._dx = np.where(update, dx_hat, self._dx)
+        self._t = np.where(seen, t, self._t)
+        return np.where(update, x_hat, xy)
+
+
+# === 2. STREAMING STATISTICS ===
+
+class P2Quantile:
+    """
+    P-squared streaming quantile estimator (Jain & Chlamtac 1985):
+    five markers, O(1) memory and time per observation.
+    """
+
+    def __init__(self, q: float):
+        self.q = q
+        self.count = 0
+        self._heights: List[float] = []
+        self._pos = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self._desired = [1.0, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5.0]
+        self._step = [0.0, q / 2, q, (1 + q) / 2, 1.0]
+
+    def add(self, x: float):
+        self.count += 1
+        h = self._heights
+        if len(h) < 5:
+            h.append(x)
+            h.sort()
+            return
+
+        # 1. Find the cell x falls in (stretching the extremes if needed)
+        if x < h[0]:
+            h[0], k = x, 0
+        elif x >= h[4]:
+            h[4], k = x, 3
+        else:
+            k = next(i for i in range(4) if h[i] <= x < h[i + 1])
+
+        pos, desired = self._pos, self._desired
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            desired[i] += self._step[i]
+
+        # 2. Nudge the three middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                # Piecewise-parabolic prediction, linear if it would break monotonicity
+                candidate = h[i] + d / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + d) * (h[i + 1] - h[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - d) * (h[i] - h[i - 1]) / (pos[i] - pos[i - 1])
+                )
+                if not h[i - 1] < candidate < h[i + 1]:
+                    candidate = h[i] + d * (h[i + d] - h[i]) / (pos[i + d] - pos[i])
+                h[i] = candidate
+                pos[i] += d
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self._heights:
+            return None
+        if self.count <= 5:
+            return float(np.percentile(self._heights, self.q * 100))
+        return self._heights[2]
+
+
+class StreamingMetrics:
+    """
+    Clip-level aggregates of the per-frame joint metrics without keeping the
+    frames: confidence-weighted sums per metric plus P² 85th percentiles.
+    """
+
+    def __init__(self, quantile: float = 0.85):
+        m = len(METRICS)
+        self.count = np.zeros(m)
+        self.weight = np.zeros(m)
+        self.weighted_sum = np.zeros(m)
+        self.weighted_abs = np.zeros(m)
+        self.quantiles = {name: P2Quantile(quantile) for name in QUANTILE_METRICS}
+
+    def update(self, values: np.ndarray, weights: np.ndarray):
+        valid = ~np.isnan(values)
+        v = np.where(valid, values, 0.0)
+        w = np.where(valid, weights, 0.0)
+        self.count += valid.sum(axis=0)
+        self.weight += w.sum(axis=0)
+        self.weighted_sum += (w * v).sum(axis=0)
+        self.weighted_abs += (w * np.abs(v)).sum(axis=0)
+        for name, estimator in self.quantiles.items():
+            column = values[:, COLUMN[name]]
+            for x in column[~np.isnan(column)].tolist():
+                estimator.add(x)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count.tolist(),
+            "weight": self.weight.tolist(),
+            "weighted_sum": self.weighted_sum.tolist(),
+            "weighted_abs": self.weighted_abs.tolist(),
+            "q85": {name: est.value for name, est in self.quantiles.items()},
+        }
+
+    @staticmethod
+    def merge(parts: List[dict]) -> dict:
+        """
+        Combines to_dict() outputs of consecutive segments. Sums are exact; the
+        85th percentiles are count-weighted averages of the segment estimates.
+        """
+        merged = {key: np.sum([p[key] for p in parts], axis=0).tolist() if parts else [0.0] * len(METRICS)
+                  for key in ("count", "weight", "weighted_sum", "weighted_abs")}
+        merged["q85"] = {}
+        for name in QUANTILE_METRICS:
+            pairs = [(p["q85"][name], p["count"][COLUMN[name]]) for p in parts if p["q85"][name] is not None]
+            total = sum(n for _, n in pairs)
+            merged["q85"][name] = sum(v * n for v, n in pairs) / total if total else None
+        return merged
+
+
+def window_summary(values: np.ndarray, weights: np.ndarray) -> dict:
+    """
+    StreamingMetrics.to_dict() equivalent for a small in-memory window of
+    frames (live analysis), with exact percentiles instead of P² estimates.
+    """
+    stats = StreamingMetrics()
+    stats.quantiles = {}
+    stats.update(values, weights)
+    summary = stats.to_dict()
+    for name in QUANTILE_METRICS:
+        column = values[:, COLUMN[name]]
+        column = column[~np.isnan(column)]
+        summary["q85"][name] = float(np.percentile(column, 85)) if len(column) else None
+    return summary
+
+
+# === 3. GAIT CYCLES ===
+
+class GaitTracker:
+    """
+    Streaming temporal stage between YOLO and scoring. Per sampled frame it
+    smooths the keypoints, computes the joint metrics, updates the clip
+    aggregates and looks for foot contacts (ankle at its lowest image point).
+    Contact to next contact of the same foot is one stride, summarised on the
+    spot. Memory is bounded: a ring buffer of the current stride per foot and
+    the last VISION_MAX_STRIDES stride summaries.
+    """
+
+    def __init__(
+        self,
+        video_fps: float,
+        smoothing: Optional[str] = None,
+        min_stride_seconds: float = 0.4,
+        max_stride_seconds: float = 2.5,
+        contact_prominence: float = 0.04,
+        max_strides: Optional[int] = None,
+    ):
+        self.fps = video_fps if video_fps and video_fps > 0 else 30.0
+        smoothing = smoothing or settings.VISION_SMOOTHING
+        self.filter = OneEuroFilter(
+            settings.VISION_ONE_EURO_MIN_CUTOFF, settings.VISION_ONE_EURO_BETA
+        ) if smoothing == "one_euro" else None
+        self.min_stride_seconds = min_stride_seconds
+        self.max_stride_seconds = max_stride_seconds
+        self.contact_prominence = contact_prominence # Fraction of leg length the ankle must rise between contacts
+
+        self.metrics = StreamingMetrics()
+        self.strides = deque(maxlen=max_strides or settings.VISION_MAX_STRIDES)
+        self.stride_count = 0
+        self.stride_seconds = P2Quantile(0.5)
+        # Per foot: last two ankle heights, highest point since contact, last contact, rows of the open stride
+        max_rows = int(max_stride_seconds * self.fps) + 2
+        self._feet = {
+            foot: {"y": deque(maxlen=2), "top": math.inf, "contact": None, "rows": deque(maxlen=max_rows)}
+            for foot in FEET
+        }
+
+    def update(self, frame_indices: List[int], kpts: np.ndarray) -> Optional[dict]:
+        """
+        Feeds one inference batch (frames in order). kpts: (B, 17, 3).
+        Returns the batch's compute_joint_metrics() output (after smoothing).
+        """
+        if len(frame_indices) == 0:
+            return None
+        kpts, seen = self.smooth(frame_indices, kpts)
+        joint = compute_joint_metrics(kpts)
+        self.ingest(frame_indices, kpts, seen, joint)
+        return joint
+
+    def smooth(self, frame_indices: List[int], kpts: np.ndarray):
+        """Visibility mask + One-Euro smoothing of one batch. Returns (smoothed float64 copy, seen)."""
+        kpts = np.array(kpts, dtype=np.float64)
+        seen = (kpts[..., 2] >= settings.VISION_MIN_KEYPOINT_CONF) & np.any(kpts[..., :2] != 0, axis=-1)
+        if self.filter is not None:
+            for i, frame_index in enumerate(frame_indices):
+                kpts[i, :, :2] = self.filter(frame_index / self.fps, kpts[i, :, :2], seen[i])
+        return kpts, seen
+
+    def ingest(self, frame_indices: List[int], kpts: np.ndarray, seen: np.ndarray, joint: dict):
+        """Aggregates + stride detection for smoothed keypoints and their compute_joint_metrics() rows."""
+        self.metrics.update(joint["values"], joint["weights"])
+        for i, frame_index in enumerate(frame_indices):
+            for foot, (hip, ankle) in FEET.items():
+                if seen[i, hip] and seen[i, ankle]:
+                    leg = abs(kpts[i, ankle, 1] - kpts[i, hip, 1])
+                    self._step_foot(foot, frame_index, kpts[i, ankle, 1], leg, joint["values"][i])
+
+    def _step_foot(self, foot: str, frame_index: int, ankle_y: float, leg_length: float, row: np.ndarray):
+        state = self._feet[foot]
+        rows, ys = state["rows"], state["y"]
+        rows.append(row)
+
+        # Contact = the previous sample was a local maximum of ankle y (image y points down)
+        if len(ys) == 2 and ys[1][1] >= ys[0][1] and ys[1][1] > ankle_y:
+            peak_frame, peak_y = ys[1]
+            last = state["contact"]
+            since = (peak_frame - last) / self.fps if last is not None else math.inf
+            risen = peak_y - state["top"] > self.contact_prominence * leg_length
+            if since >= self.min_stride_seconds and (risen or last is None):
+                if last is not None and since <= self.max_stride_seconds:
+                    # rows = [previous contact, ..., peak, current]; the stride ends just before the peak
+                    self._close_stride(foot, last, peak_frame, list(rows)[:-2])
+                kept = list(rows)[-2:]
+                rows.clear()
+                rows.extend(kept)
+                state["contact"] = peak_frame
+                state["top"] = peak_y
+
+        state["top"] = min(state["top"], ankle_y)
+        ys.append((frame_index, ankle_y))
+        # Too long without a contact: not a stride, start over
+        if state["contact"] is not None and (frame_index - state["contact"]) / self.fps > self.max_stride_seconds:
+            state["contact"] = None
+            rows.clear()
+
+    def _close_stride(self, foot: str, start: int, end: int, rows: List[np.ndarray]):
+        side = np.array(rows) if rows else np.empty((0, len(METRICS)))
+
+        def stat(name, fn):
+            column = side[:, COLUMN[name]] if len(side) else np.empty(0)
+            column = column[~np.isnan(column)]
+            return float(fn(column)) if len(column) else None
+
+        duration = (end - start) / self.fps
+        self.stride_count += 1
+        self.stride_seconds.add(duration)
+        self.strides.append({
+            "foot": foot,
+            "start_frame": start,
+            "end_frame": end,
+            "duration": duration,
+            "valgus_peak": stat(f"valgus_{foot}", np.max),
+            "hip_deviation": stat(f"hip_{foot}", lambda c: np.mean(np.abs(c))),
+            "shin_at_contact": stat(f"shin_{foot}", lambda c: c[0]),
+            "trunk_lean": stat("trunk_lean", lambda c: np.mean(np.abs(c))),
+        })
+
+    def summary(self) -> dict:
+        return {
+            "metrics": self.metrics.to_dict(),
+            "strides": list(self.strides),
+            "stride_count": self.stride_count,
+            "stride_seconds_median": self.stride_seconds.value,
+        }
+
+    @staticmethod
+    def merge(parts: List[dict]) -> dict:
+        """Combines summary() outputs of consecutive clip segments (strides across a cut are lost)."""
+        strides = [s for p in parts for s in p["strides"]][-settings.VISION_MAX_STRIDES:]
+        counted = [(p["stride_seconds_median"], p["stride_count"]) for p in parts if p["stride_seconds_median"] is not None]
+        total = sum(n for _, n in counted)
+        return {
+            "metrics": StreamingMetrics.merge([p["metrics"] for p in parts]),
+            "strides": strides,
+            "stride_count": sum(p["stride_count"] for p in parts),
+            "stride_seconds_median": sum(v * n for v, n in counted) / total if total else None,
+        }
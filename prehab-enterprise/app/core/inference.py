@@ -0,0 +1,124 @@
+import abc
+import fcntl
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from app.core.config import settings
+
+
+class InferenceBackend(abc.ABC):
+    """
+    One way of running the pose model. Every backend ends up as an artifact
+    that ultralytics' YOLO() can load (it handles pre/post-processing for
+    .pt, .onnx and *_openvino_model/ alike).
+    """
+
+    name: str
+
+    def __init__(self, weights: str, int8: bool = False, cache_dir: str = "model_cache"):
+        self.weights = weights
+        self.int8 = int8
+        self.cache_dir = Path(cache_dir)
+
+    @property
+    def artifact(self) -> Path:
+        return Path(self.weights)
+
+    @abc.abstractmethod
+    def model_path(self) -> str:
+        """Path to hand to YOLO()."""
+
+
+class PyTorchBackend(InferenceBackend):
+    """The .pt weights as they are (no INT8 variant)."""
+
+    name = "pytorch"
+
+    def model_path(self) -> str:
+        return str(self.artifact)
+
+
+class ExportedBackend(InferenceBackend):
+    """Exported once from the .pt weights and cached on disk."""
+
+    @abc.abstractmethod
+    def export(self, target: Path):
+        """Writes this backend's artifact to `target`."""
+
+    def model_path(self) -> str:
+        """Exports on first use (one process at a time)."""
+        if self.artifact.exists():
+            return str(self.artifact)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with _export_lock(self.cache_dir / f".{self.artifact.name}.lock"):
+            if not self.artifact.exists():  # Another worker may have finished it while we waited
+                self.export(self.artifact)
+        return str(self.artifact)
+
+    def _yolo_export(self, **kwargs) -> Path:
+        from ultralytics import YOLO
+        return Path(YOLO(self.weights).export(**kwargs))
+
+
+class OnnxBackend(ExportedBackend):
+    """ONNX Runtime (CPU). INT8 = dynamic weight quantization of the exported graph."""
+
+    name = "onnx"
+
+    @property
+    def artifact(self) -> Path:
+        suffix = "-int8" if self.int8 else ""
+        return self.cache_dir / f"{Path(self.weights).stem}{suffix}.onnx"
+
+    def export(self, target: Path):
+        exported = self._yolo_export(format="onnx", dynamic=True, simplify=True)
+        if self.int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            tmp = target.with_suffix(".tmp.onnx")
+            quantize_dynamic(str(exported), str(tmp), weight_type=QuantType.QUInt8)
+            os.replace(tmp, target)
+        else:
+            shutil.move(str(exported), target)
+
+
+class OpenVinoBackend(ExportedBackend):
+    """OpenVINO IR (CPU). INT8 = post-training quantization by ultralytics/NNCF on calibration data."""
+
+    name = "openvino"
+
+    @property
+    def artifact(self) -> Path:
+        suffix = "_int8" if self.int8 else ""
+        return self.cache_dir / f"{Path(self.weights).stem}{suffix}_openvino_model"
+
+    def export(self, target: Path):
+        kwargs = {"format": "openvino", "dynamic": True}
+        if self.int8:
+            kwargs.update(int8=True, data=settings.VISION_INT8_CALIBRATION_DATA)
+        exported = self._yolo_export(**kwargs)
+        shutil.move(str(exported), target)
+
+
+BACKENDS = {backend.name: backend for backend in (PyTorchBackend, OnnxBackend, OpenVinoBackend)}
+
+
+def get_backend(name: str = None, int8: bool = None) -> InferenceBackend:
+    name = name or settings.VISION_BACKEND
+    int8 = settings.VISION_INT8 if int8 is None else int8
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {tuple(BACKENDS)}")
+    if int8 and not issubclass(BACKENDS[name], ExportedBackend):
+        raise ValueError(f"INT8 needs an exported backend (onnx or openvino), not '{name}'")
+    return BACKENDS[name](settings.VISION_MODEL_NAME, int8=int8, cache_dir=settings.VISION_MODEL_CACHE_DIR)
+
+
+@contextmanager
+def _export_lock(path: Path):
+    """Cross-process lock so pool workers starting together export the model only once."""
+    with open(path, "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
@@ -0,0 +1,246 @@
+import bisect
+import threading
+import time
+from typing import Dict, List, Tuple
+from app.core.config import settings
+
+# Everything below is a no-op unless METRICS_ENABLED is set (checked per call,
+# so the only cost when scraping is off is one global lookup)
+ENABLED = settings.METRICS_ENABLED
+
+# Seconds; covers DB round trips (ms) up to long clips (minutes)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _label_text(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels: tuple, value) -> List[str]:
+        return [f"{self.name}{self._label_text(labels)} {value}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, *labels):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Fixed buckets; stores per-bucket counts and makes them cumulative on render."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labels):
+        """`with histogram.time("label"):` observes the block's wall time."""
+        return _Timer(self, labels) if ENABLED else _NOOP
+
+    def _samples(self, labels: tuple, state) -> List[str]:
+        counts, total, count = state
+        lines, cumulative = [], 0
+        for bound, bucket in zip((*self.buckets, "+Inf"), counts):
+            cumulative += bucket
+            le = 'le="%s"' % bound
+            lines.append(f"{self.name}_bucket{self._label_text(labels, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(labels)} {total}")
+        lines.append(f"{self.name}_count{self._label_text(labels)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NOOP = _NoopTimer()
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# === METRICS ===
+http_request_seconds = Histogram(
+    "prehab_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"),
+)
+vision_stage_seconds = Histogram(
+    "prehab_vision_stage_seconds",
+    "Time per video analysis stage (upload_write, decode, preprocess, inference, extraction, scoring), summed per clip.",
+    ("stage",),
+)
+vision_frames = Counter(
+    "prehab_vision_frames_total", "Video frames by outcome (decoded, inferred, with_pose, cropped, retried, skipped).", ("kind",),
+)
+db_query_seconds = Histogram(
+    "prehab_db_query_duration_seconds", "SQL statement execution time.", ("engine", "operation"),
+)
+model_load_seconds = Gauge(
+    "prehab_vision_model_load_seconds", "Time the last pose model load took (incl. export).", ("backend",),
+)
+
+
+def record_vision(frames: dict, timings: dict):
+    """Counters + stage histograms for one analyzed clip (called once per clip, in the API/worker process)."""
+    if not ENABLED:
+        return
+    for kind in ("decoded", "inferred", "with_pose", "cropped", "retried"):
+        vision_frames.inc(frames.get(kind, 0), kind)
+    vision_frames.inc(max(0, frames.get("total", 0) - frames.get("decoded", 0)), "skipped")
+    for stage, seconds in timings.items():
+        vision_stage_seconds.observe(seconds, stage)
+
+
+# === SQLALCHEMY ===
+
+def instrument_engine(engine, name: str):
+    """Times every statement on a (sync) Engine via cursor events. Nothing is attached when disabled."""
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        db_query_seconds.observe(elapsed, name, operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            db_query_seconds.observe(time.perf_counter() - starts.pop(), name, "ERROR")
+
+
+# === ASGI ===
+
+class MetricsMiddleware:
+    """
+    Per-route latency histogram. Labels use the route template
+    (/api/v1/analytics/jobs/{job_id}), never the raw path, so cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_seconds.observe(
+                time.perf_counter() - start, scope["method"], _route_template(scope), str(status["code"]),
+            )
+
+
+def _route_template(scope) -> str:
+    """
+    Full template of the matched route. Routes of included routers only know
+    their own path (/jobs/{job_id}), so the router prefix is recovered from
+    the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return "unmatched"
+    try:
+        concrete = template.format(**{k: str(v) for k, v in scope.get("path_params", {}).items()})
+    except (KeyError, IndexError, ValueError):
+        return template
+    path = scope["path"]
+    return path[: -len(concrete)] + template if concrete and path.endswith(concrete) else template
@@ -0,0 +1,506 @@
+import copy
+import hashlib
+import json
+import operator
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+# === DEFAULT RULE SET ===
+# RISK_RULES_PATH (JSON) is overlaid on this. Shape:
+#   "labels":   global thresholds VisionEngine uses to label raw clip metrics
+#   "roles":    user role -> profile (anything else gets "default_profile")
+#   "profiles": report_type, base_score and the ordered rules of each report
+#   "tiers" / "organizations": partial rule sets overlaid for an organization's
+#       subscription tier, then for the organization itself (keyed by id).
+#       Rules are merged by "id": same id = update fields, new id = appended,
+#       {"id": ..., "enabled": false} = removed.
+#   "locales": locale -> rule id -> {"alert", "recommendation"} translations
+#       (missing = the rule's own text). Reports carry the fired rule ids as "codes".
+# Alerts/recommendations may use "{value}" for the rule's threshold.
+DEFAULT_RULES = {
+    "labels": {
+        # Knee deviating > 4% of leg length (SENSITIVITY SETTING: lower = more sensitive)
+        "hip_internal_rotation": {"field": "hip_ratio", "op": ">", "value": 0.04,
+                                  "then": "Excessive Internal Rotation", "else": "Normal"},
+        "foot_strike_pattern": {"field": "shin_angle", "op": ">", "value": -5,
+                                "then": "Midfoot/Forefoot", "else": "Heel Strike (Overstride)"},
+    },
+    "roles": {"athlete": "pro", "coach": "pro"},
+    "default_profile": "common",
+    "profiles": {
+        # B2B: High Performance & Injury Risk (0-100 Risk Scale)
+        "pro": {
+            "report_type": "B2B_ATHLETE_ADVANCED",
+            "base_score": 0,
+            "rules": [
+                {"id": "acwr_spike", "field": "acwr", "op": ">", "value": 1.3, "points": 40,
+                 "alert": "CRITICAL: ACWR > {value} (High Injury Risk)",
+                 "recommendation": "Reduce training load by 40% immediately."},
+                {"id": "knee_valgus", "field": "knee_valgus_angle", "op": ">", "value": 15, "points": 30,
+                 "alert": "Biomechanics: Hazardous Knee Valgus detected",
+                 "recommendation": "Rx: Banded Clamshells & Glute Bridges"},
+                {"id": "hip_rotation", "field": "hip_internal_rotation", "op": "==",
+                 "value": "Excessive Internal Rotation", "points": 25,
+                 "alert": "Hip Mechanics: Lack of external rotator control",
+                 "recommendation": "Rx: Monster Walks (Band around knees)"},
+                {"id": "overstride", "field": "foot_strike_pattern", "op": "==",
+                 "value": "Heel Strike (Overstride)", "points": 15,
+                 "alert": "Running Form: Overstriding detected (High Braking Force)",
+                 "recommendation": "Rx: Increase Cadence by 5% to fix landing"},
+            ],
+        },
+        # B2C: Wellness & Lifestyle (0-100 Health Scale)
+        "common": {
+            "report_type": "B2C_WELLNESS_REPORT",
+            "base_score": 100,
+            "rules": [
+                {"id": "text_neck", "field": "head_forward_angle", "op": ">", "value": 20, "points": -15,
+                 "alert": "Detected 'Text Neck' posture.",
+                 "recommendation": "Do Chin Tucks: 3 sets of 10"},
+                {"id": "lower_back_pain", "field": "pain_areas", "op": "contains", "value": "Lower Back",
+                 "points": -20, "alert": "Lower back pain reported.",
+                 "recommendation": "Do Cat-Cow Stretches"},
+            ],
+        },
+    },
+    "tiers": {},
+    "organizations": {},
+    "locales": {},
+}
+
+# === FIELDS (AnalysisInput `d` -> value; None = not measured, never fires a rule) ===
+# (part of the input, attribute, default when the part is there but the value isn't)
+FIELD_PATHS = {
+    "acwr": ("load_metrics", "acwr", 0.0),
+    "sprint_distance": ("load_metrics", "sprint_distance", 0.0),
+    "knee_valgus_angle": ("mechanics", "knee_valgus_angle", 0.0),
+    "head_forward_angle": ("mechanics", "head_forward_angle", 0.0),
+    "hip_internal_rotation": ("mechanics", "hip_internal_rotation", None),
+    "foot_strike_pattern": ("mechanics", "foot_strike_pattern", None),
+    "steps": ("daily_stats", "steps", None),
+    "pain_areas": ("daily_stats", "pain_areas", None),
+}
+NUMERIC_FIELDS = {"acwr", "sprint_distance", "knee_valgus_angle", "head_forward_angle", "steps"}
+
+
+def _field_getter(part: str, attr: str, default):
+    def get(d):
+        section = getattr(d, part)
+        if section is None:
+            return None
+        value = getattr(section, attr)
+        return value if default is None else (value or default)
+    return get
+
+
+FIELDS = {name: _field_getter(*path) for name, path in FIELD_PATHS.items()}
+
+OPS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne,
+    "in": lambda field, value: field in value,
+    "contains": lambda field, value: value in field,
+}
+
+
+def columns_from_inputs(inputs: list, fields: List[str]) -> Dict[str, np.ndarray]:
+    """
+    AnalysisInputs -> {field: column}. Numeric fields become float64 (NaN =
+    missing), the rest object arrays (None = missing). Each input part
+    (mechanics, load_metrics, ...) is read once per row.
+    """
+    parts: Dict[str, list] = {}
+    columns = {}
+    for field in fields:
+        part, attr, default = FIELD_PATHS[field]
+        if part not in parts:
+            parts[part] = list(map(operator.attrgetter(part), inputs))
+        get = operator.attrgetter(attr)
+        if default is None:
+            values = [None if section is None else get(section) for section in parts[part]]
+        else:
+            values = [None if section is None else (get(section) or default) for section in parts[part]]
+        if field in NUMERIC_FIELDS:
+            columns[field] = np.array(values, dtype=float) # None -> NaN
+        else:
+            columns[field] = np.empty(len(values), dtype=object)
+            columns[field][:] = values # Slice assignment: list values (pain_areas) stay single cells
+    return columns
+
+
+def _vector_op(op: str, column: np.ndarray, value) -> np.ndarray:
+    """Rule check over a whole column; missing values never fire."""
+    if column.dtype == object:
+        present = np.not_equal(column, None)
+    else:
+        present = ~np.isnan(column)
+    if op == "in":
+        return np.fromiter((v in value for v in column), bool, len(column))
+    if op == "contains":
+        return np.fromiter((v is not None and value in v for v in column), bool, len(column))
+    with np.errstate(invalid="ignore"):
+        return present & np.asarray(OPS[op](column, value), dtype=bool)
+
+
+# === COMPILED RULES ===
+
+class CompiledProfile:
+    """
+    One report profile, compiled once per rule-set version. Every input
+    reduces to a bitmask of fired rules: the rules checked in turn for a
+    single input, one vectorized comparison per rule over the columns of a
+    batch. Score, alerts and recommendations are then looked up per distinct
+    bitmask.
+    """
+
+    def __init__(self, name: str, spec: dict, locales: Optional[dict] = None):
+        self.name = name
+        self.report_type = spec["report_type"]
+        self.base_score = spec.get("base_score", 0)
+        rules = spec.get("rules", [])
+        if len(rules) > 62:
+            raise ValueError(f"Profile '{name}': at most 62 rules (hit bitmasks are int64)")
+        for rule in rules:
+            if rule.get("field") not in FIELDS:
+                raise ValueError(f"Rule '{rule.get('id')}' ({name}): unknown field '{rule.get('field')}'")
+            if rule.get("op") not in OPS:
+                raise ValueError(f"Rule '{rule.get('id')}' ({name}): unknown op '{rule.get('op')}'")
+        self.checks = [(rule["field"], rule["op"], OPS[rule["op"]], rule["value"]) for rule in rules]
+        self.fields = list(dict.fromkeys(rule["field"] for rule in rules))
+        self.points = np.array([rule.get("points", 0) for rule in rules], dtype=np.int64)
+        self.codes = [rule["id"] for rule in rules]
+        # Code catalogue: locale -> (alerts, recommendations), texts resolved once (None = the rules' own text)
+        self.catalogue = {None: self._texts(rules, {})}
+        for locale, texts in (locales or {}).items():
+            self.catalogue[locale] = self._texts(rules, texts)
+        # A report is fully determined by its hit bitmask
+        self._bits = 1 << np.arange(len(rules), dtype=np.int64)
+        self._getters = [(field, FIELDS[field]) for field in self.fields]
+        self._outcomes: Dict[Tuple[int, Optional[str]], Tuple[int, List[str], List[str], List[str]]] = {}
+
+    @staticmethod
+    def _texts(rules: list, translations: dict) -> Tuple[List[str], List[str]]:
+        alerts, recommendations = [], []
+        for rule in rules:
+            texts = {**rule, **translations.get(rule["id"], {})}
+            alerts.append(sys.intern(texts.get("alert", "").format(value=rule["value"])))
+            recommendations.append(sys.intern(texts.get("recommendation", "").format(value=rule["value"])))
+        return alerts, recommendations
+
+    def outcome(self, mask: int, locale: Optional[str] = None) -> Tuple[int, List[str], List[str], List[str]]:
+        """
+        (score, codes, alerts, recommendations) for a hit bitmask, memoized
+        per locale (there are few distinct ones). Unknown locales get the
+        rules' own text. Shared between reports: copy before mutating.
+        """
+        if locale not in self.catalogue:
+            locale = None
+        cached = self._outcomes.get((mask, locale))
+        if cached is None:
+            fired = [i for i in range(len(self.checks)) if mask >> i & 1]
+            score = self.base_score + sum(int(self.points[i]) for i in fired)
+            alerts, recommendations = self.catalogue[locale]
+            cached = (
+                min(max(score, 0), 100), [self.codes[i] for i in fired],
+                [alerts[i] for i in fired], [recommendations[i] for i in fired],
+            )
+            if len(self._outcomes) < 4096:
+                self._outcomes[(mask, locale)] = cached
+        return cached
+
+    def describe(self, locale: Optional[str] = None) -> Dict[str, dict]:
+        """code -> {"alert", "recommendation", "points"} in a locale (see outcome())."""
+        alerts, recommendations = self.catalogue.get(locale, self.catalogue[None])
+        return {
+            code: {"alert": alert, "recommendation": recommendation, "points": int(points)}
+            for code, alert, recommendation, points in zip(self.codes, alerts, recommendations, self.points)
+        }
+
+    def hit_mask(self, data) -> int:
+        """Scalar path: bitmask of the rules one AnalysisInput fires (missing/NaN values never fire)."""
+        values = {field: get(data) for field, get in self._getters}
+        mask = 0
+        for j, (field, _, check, value) in enumerate(self.checks):
+            v = values[field]
+            if v is not None and v == v and check(v, value):
+                mask |= 1 << j
+        return mask
+
+    def evaluate(self, data, locale: Optional[str] = None) -> Tuple[int, List[str], List[str], List[str]]:
+        """Scalar path: (score, codes, alerts, recommendations) for one AnalysisInput."""
+        score, codes, alerts, recommendations = self.outcome(self.hit_mask(data), locale)
+        return score, list(codes), list(alerts), list(recommendations)
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], n: int) -> np.ndarray:
+        """
+        Columnar path: {field: column} (see columns_from_inputs) for n rows ->
+        one hit bitmask per row (see outcome()). Every rule is one vectorized check.
+        """
+        masks = np.zeros(n, dtype=np.int64)
+        for j, (field, op, _, value) in enumerate(self.checks):
+            masks |= np.where(_vector_op(op, columns[field], value), self._bits[j], 0)
+        return masks
+
+
+class CompiledRuleSet:
+    def __init__(self, spec: dict):
+        locales = spec.get("locales", {})
+        self.profiles = {name: CompiledProfile(name, profile, locales) for name, profile in spec["profiles"].items()}
+        self.roles = dict(spec.get("roles", {}))
+        self.default_profile = spec.get("default_profile", "common")
+        for profile in [*self.roles.values(), self.default_profile]:
+            if profile not in self.profiles:
+                raise ValueError(f"Unknown profile '{profile}'")
+
+    def profile_for(self, role: Optional[str]) -> CompiledProfile:
+        return self.profiles[self.roles.get(role, self.default_profile)]
+
+    def evaluate(self, user, data, locale: Optional[str] = None) -> dict:
+        profile = self.profile_for(user.role)
+        score, codes, alerts, recommendations = profile.evaluate(data, locale)
+        return {
+            "user_id": user.id,
+            "report_type": profile.report_type,
+            "score": score,
+            "codes": codes,
+            "alerts": alerts,
+            "recommendations": recommendations,
+        }
+
+    def catalogue(self, locale: Optional[str] = None) -> Dict[str, Dict[str, dict]]:
+        """report_type -> code -> texts, for every profile (what compact reports' codes stand for)."""
+        return {profile.report_type: profile.describe(locale) for profile in self.profiles.values()}
+
+
+def _overlay(base: dict, patch: dict) -> dict:
+    merged = copy.deepcopy(base)
+    for key, value in patch.items():
+        if key == "profiles":
+            for name, profile in value.items():
+                merged["profiles"][name] = _overlay_profile(merged["profiles"].get(name, {}), profile)
+        elif key in ("labels", "roles", "tiers", "organizations"):
+            merged[key] = {**merged.get(key, {}), **copy.deepcopy(value)}
+        elif key == "locales":
+            locales = merged.setdefault("locales", {})
+            for locale, texts in value.items():
+                locales[locale] = {**locales.get(locale, {}), **copy.deepcopy(texts)}
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def _overlay_profile(base: dict, patch: dict) -> dict:
+    profile = {**base, **{k: v for k, v in patch.items() if k != "rules"}}
+    rules = {rule["id"]: dict(rule) for rule in base.get("rules", [])}  # Keeps report order
+    for rule in patch.get("rules", []):
+        if rule.get("enabled", True) is False:
+            rules.pop(rule["id"], None)
+        else:
+            rules[rule["id"]] = {**rules.get(rule["id"], {}), **rule}
+    profile["rules"] = [{k: v for k, v in rule.items() if k != "enabled"} for rule in rules.values()]
+    return profile
+
+
+# === ENGINE (per process, hot-reloaded) ===
+
+class RuleEngine:
+    """
+    Holds the compiled rule sets. Workers check RISK_RULES_PATH's mtime at most
+    every `reload_seconds` and recompile on change, so edits apply without a
+    restart. A file that fails to parse/compile is ignored (the previous rules
+    stay active) and reported in stats().
+
+    Tier overlays need each organization's subscription_tier. evaluate() never
+    queries for it: callers look tiers up on their own session first with
+    load_tiers() (a no-op without tier overlays or while the cached tier is
+    fresh).
+    """
+
+    def __init__(self, path: Optional[str] = None, reload_seconds: float = 5.0):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.error: Optional[str] = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._mtime = None
+        self.tier_misses = 0
+        self._tiers: Dict[int, Tuple[str, float]] = {} # organization_id -> (tier, looked up at)
+        self._install(self._read()) # Fail fast on a broken file at startup
+
+    def _read(self) -> dict:
+        if not self.path:
+            return copy.deepcopy(DEFAULT_RULES)
+        self._mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path) as handle:
+            return _overlay(DEFAULT_RULES, json.load(handle))
+
+    def _install(self, spec: dict):
+        base = CompiledRuleSet(spec)  # Validates the whole file before swapping anything
+        labels = {name: dict(label, check=OPS[label["op"]]) for name, label in spec["labels"].items()}
+        # Compile each overlay once so a bad tier/organization entry is rejected with the file
+        for scope in ("tiers", "organizations"):
+            for patch in spec.get(scope, {}).values():
+                CompiledRuleSet(_overlay(spec, patch))
+        has_overlays = bool(spec.get("tiers") or spec.get("organizations"))
+        labels_version = hashlib.sha1(json.dumps(spec["labels"], sort_keys=True).encode()).hexdigest()[:8]
+        # One assignment: a concurrent _ruleset_for() sees either the old rules or the new ones, never a mix
+        self._rules: Tuple[dict, CompiledRuleSet, Dict[Tuple[int, Optional[str]], CompiledRuleSet]] = (spec, base, {})
+        self.spec, self.base, self.labels = spec, base, labels
+        self.has_overlays, self.labels_version = has_overlays, labels_version
+
+    def _maybe_reload(self):
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_seconds:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_seconds:
+                return
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime_ns == self._mtime:
+                    return
+                self._install(self._read())
+                self.reloads += 1
+                self.error = None
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                self.error = f"{type(exc).__name__}: {exc}"
+
+    def ruleset_for(self, organization_id: Optional[int]) -> CompiledRuleSet:
+        """Default rules, then the organization's tier overlay, then its own overlay."""
+        self._maybe_reload()
+        return self._ruleset_for(organization_id)
+
+    def _ruleset_for(self, organization_id: Optional[int]) -> CompiledRuleSet:
+        base_spec, base, resolved = self._rules
+        if organization_id is None or not (base_spec.get("tiers") or base_spec.get("organizations")):
+            return base
+        tier = self._tier(organization_id) if base_spec.get("tiers") else None
+        key = (organization_id, tier)
+        ruleset = resolved.get(key)
+        if ruleset is None:
+            spec = base_spec
+            if tier in spec.get("tiers", {}):
+                spec = _overlay(spec, spec["tiers"][tier])
+            if str(organization_id) in base_spec.get("organizations", {}):
+                spec = _overlay(spec, base_spec["organizations"][str(organization_id)])
+            ruleset = base if spec is base_spec else CompiledRuleSet(spec)
+            resolved[key] = ruleset
+        return ruleset
+
+    # === ORGANIZATION TIERS (looked up by the caller, see load_tiers) ===
+
+    def missing_tiers(self, organization_ids) -> List[int]:
+        """Organizations whose tier the rules need and isn't cached (or is older than RISK_RULES_TIER_TTL_SECONDS)."""
+        if not self._rules[0].get("tiers"):
+            return []
+        expired = time.monotonic() - settings.RISK_RULES_TIER_TTL_SECONDS
+        return [
+            org for org in set(organization_ids)
+            if org is not None and self._tiers.get(org, ("", -np.inf))[1] < expired
+        ]
+
+    def load_tiers(self, db: Session, organization_ids) -> None:
+        """
+        Caches the subscription tiers of these organizations with the caller's
+        session (sync; async callers go through AsyncSession.run_sync). Call it
+        before evaluate()/evaluate_batch()/catalogue().
+        """
+        missing = self.missing_tiers(organization_ids)
+        if not missing:
+            return
+        from app.models.user import Organization
+
+        found = dict(db.query(Organization.id, Organization.subscription_tier).filter(Organization.id.in_(missing)))
+        now = time.monotonic()
+        for org in missing:
+            self._tiers[org] = (found.get(org) or "", now)
+
+    def _tier(self, organization_id: int) -> Optional[str]:
+        """Cached tier, stale included (refreshed by load_tiers); never loaded = no tier overlay."""
+        cached = self._tiers.get(organization_id)
+        if cached is None:
+            self.tier_misses += 1
+            return None
+        return cached[0] or None
+
+    def label(self, name: str, value: float) -> str:
+        """Global label thresholds for raw vision metrics (hip_internal_rotation, foot_strike_pattern)."""
+        self._maybe_reload()
+        label = self.labels[name]
+        return label["then"] if label["check"](value, label["value"]) else label["else"]
+
+    # === REPORTS ===
+
+    def evaluate(self, user, data, locale: Optional[str] = None) -> dict:
+        self._maybe_reload()
+        ruleset = self._ruleset_for(user.organization_id) if self.has_overlays else self.base
+        return ruleset.evaluate(user, data, locale)
+
+    def catalogue(self, organization_id: Optional[int], locale: Optional[str] = None) -> Dict[str, Dict[str, dict]]:
+        """The code catalogue of an organization's rules: report_type -> code -> alert/recommendation/points."""
+        self._maybe_reload()
+        return self._ruleset_for(organization_id).catalogue(locale)
+
+    def evaluate_batch(self, users: list, inputs: list, overrides: Optional[Dict[str, np.ndarray]] = None,
+                       locale: Optional[str] = None) -> List[dict]:
+        """
+        Reports for many users at once. Users are grouped by (rule set, profile)
+        (normally one group per role for a squad); each group's inputs become
+        columns, every rule runs once over them (CompiledProfile.evaluate_columns)
+        and the reports are built per distinct bitmask.
+        Produces exactly what evaluate() would for each user.
+        `overrides` replaces numeric columns (e.g. server-side ACWR; NaN = keep the input's value).
+        `locale` picks the texts from the code catalogue (see CompiledProfile.outcome).
+        """
+        self._maybe_reload()
+        # 1. Rows per (organization, role), then per profile (ORM attributes read once each)
+        roles = [user.role for user in users]
+        orgs = [user.organization_id for user in users] if self.has_overlays else [None] * len(users)
+        by_key: Dict[Tuple[Optional[int], Optional[str]], List[int]] = {}
+        for i, key in enumerate(zip(orgs, roles)):
+            by_key.setdefault(key, []).append(i)
+        groups: Dict[int, Tuple[CompiledProfile, List[int]]] = {}
+        for (organization_id, role), rows in by_key.items():
+            profile = self._ruleset_for(organization_id).profile_for(role)
+            groups.setdefault(id(profile), (profile, []))[1].extend(rows)
+
+        # 2. Each rule once over the group's columns, then one report per row from its bitmask
+        user_ids = [user.id for user in users]
+        reports: List[Optional[dict]] = [None] * len(users)
+        for profile, rows in groups.values():
+            columns = columns_from_inputs([inputs[i] for i in rows], profile.fields)
+            for field, override in (overrides or {}).items():
+                if field in columns:
+                    override = override[rows]
+                    columns[field] = np.where(np.isnan(override), columns[field], override)
+            masks = profile.evaluate_columns(columns, len(rows)).tolist()
+            outcomes = {mask: profile.outcome(mask, locale) for mask in set(masks)}
+            report_type = profile.report_type
+            for mask, i in zip(masks, rows):
+                score, codes, alerts, recommendations = outcomes[mask]
+                reports[i] = {
+                    "user_id": user_ids[i],
+                    "report_type": report_type,
+                    "score": score,
+                    "codes": list(codes),
+                    "alerts": list(alerts),
+                    "recommendations": list(recommendations),
+                }
+        return reports
+
+    def stats(self) -> dict:
+        return {"path": self.path, "reloads": self.reloads, "error": self.error,
+                "labels_version": self.labels_version, "tier_misses": self.tier_misses,
+                "tiers": sorted(self.spec.get("tiers", {})), "organizations": sorted(self.spec.get("organizations", {}))}
+
+
+rule_engine = RuleEngine(settings.RISK_RULES_PATH, settings.RISK_RULES_RELOAD_SECONDS)
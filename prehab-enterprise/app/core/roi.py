@@ -0,0 +1,168 @@
+from typing import Dict, Optional
+import numpy as np
+from app.core.config import settings
+from app.core.tracking import keypoint_boxes
+
+
+def shrink(image: np.ndarray, long_side: int):
+    """
+    Resizes so the long side is long_side, with the interpolation YOLO's own
+    letterbox uses (INTER_LINEAR): at max_side = imgsz the model gets the
+    same pixels it would have made itself. (INTER_AREA antialiases better
+    but costs ~10x more on 4K.) Returns (image, x scale, y scale).
+    """
+    import cv2
+
+    height, width = image.shape[:2]
+    target = long_side / max(height, width)
+    size = (max(1, round(width * target)), max(1, round(height * target)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_LINEAR), size[0] / width, size[1] / height
+
+
+class RoiCropper:
+    """
+    Shrinks what YOLO sees, per clip, right after each frame is decoded:
+
+    - Downscale: frames whose long side is over max_side are resized (shrink)
+      before they are batched, so full-resolution 1080p/4K frames are never
+      held or letterboxed by the model.
+    - ROI (crop=True): once the athlete has been found, the next frames are
+      cut to a square around their predicted box (last box + velocity, padded)
+      from the full-resolution frame and inferred at imgsz. Every
+      redetect_every sampled frames, and until someone is found, a whole
+      (downscaled) frame is inferred instead.
+
+    A crop with nobody in it, or whose person runs into a crop edge that is
+    not the image edge, is re-inferred on the whole frame (retry_image), so
+    a lost athlete costs one extra inference instead of missing frames.
+    Keypoints always come back in the original frame's pixels (restore), so
+    metrics don't depend on any of this.
+    """
+
+    def __init__(
+        self,
+        crop: bool = False,
+        max_side: Optional[int] = None,
+        padding: float = 0.5,
+        min_side: int = 192,
+        redetect_every: int = 30,
+        imgsz: int = 320,
+    ):
+        self.crop = crop
+        self.max_side = max_side
+        self.padding = padding
+        self.min_side = min_side
+        self.redetect_every = max(1, redetect_every)
+        self.imgsz = imgsz
+
+        self.box = None                 # Athlete's last x1, y1, x2, y2 (original pixels)
+        self.velocity = np.zeros(4)     # Box change per frame
+        self.last_frame = None
+        self.since_full = 0             # Crops since the last whole-frame inference
+        self.cropped = 0
+        self.retries = 0
+        # frame_index -> (x scale, y scale, x1, y1, x2, y2, full frame if cropped else None)
+        self._pending: Dict[int, tuple] = {}
+
+    @classmethod
+    def from_settings(cls, crop: Optional[bool] = None):
+        return cls(
+            crop=settings.VISION_ROI if crop is None else crop,
+            max_side=settings.VISION_DECODE_MAX_SIDE,
+            padding=settings.VISION_ROI_PADDING,
+            min_side=settings.VISION_ROI_MIN_SIDE,
+            redetect_every=settings.VISION_ROI_REDETECT_EVERY,
+            imgsz=settings.VISION_ROI_IMGSZ,
+        )
+
+    def downscale(self, frame: np.ndarray):
+        """(image, x scale, y scale) with the long side at most max_side."""
+        if not self.max_side or max(frame.shape[:2]) <= self.max_side:
+            return frame, 1.0, 1.0
+        return shrink(frame, self.max_side)
+
+    def prepare(self, frame_index: int, frame: np.ndarray) -> np.ndarray:
+        """Model input for a freshly decoded frame (crop or downscaled whole frame)."""
+        height, width = frame.shape[:2]
+        if self.crop and self.box is not None and self.since_full < self.redetect_every:
+            # 1. Where the athlete should be by now, padded for the unknown
+            gap = frame_index - self.last_frame
+            box = self.box + self.velocity * gap
+            centre = (box[:2] + box[2:]) / 2
+            reach = np.abs(self.velocity[:2]).max() * gap
+            side = max(self.min_side, (box[2:] - box[:2]).max() * (1 + 2 * self.padding) + 2 * reach)
+            side = int(min(side, width, height))
+            # 2. Square crop, pushed back inside the frame rather than shrunk
+            x1 = int(np.clip(round(centre[0] - side / 2), 0, width - side))
+            y1 = int(np.clip(round(centre[1] - side / 2), 0, height - side))
+            crop, scale_x, scale_y = frame[y1:y1 + side, x1:x1 + side], 1.0, 1.0
+            if side > self.imgsz:
+                crop, scale_x, scale_y = shrink(crop, self.imgsz)
+            self.since_full += 1
+            self.cropped += 1
+            self._pending[frame_index] = (scale_x, scale_y, x1, y1, x1 + side, y1 + side, frame)
+            return np.ascontiguousarray(crop)
+
+        self.since_full = 0
+        image, scale_x, scale_y = self.downscale(frame)
+        self._pending[frame_index] = (scale_x, scale_y, 0, 0, width, height, None)
+        return image
+
+    def is_crop(self, frame_index: int) -> bool:
+        return self._pending[frame_index][-1] is not None
+
+    def restore(self, frame_index: int, people: Optional[np.ndarray]):
+        """
+        Maps a frame's (P, 17, 3) detections back to original pixels. Returns
+        None for a crop that lost the athlete (see retry_image), else the people.
+        """
+        scale_x, scale_y, x1, y1, x2, y2, frame = self._pending.pop(frame_index)
+        if people is not None:
+            people = people.copy()
+            missing = np.all(people[..., :2] == 0, axis=-1) # Undetected joints stay at (0, 0)
+            people[..., :2] = people[..., :2] / np.array([scale_x, scale_y]) + np.array([x1, y1])
+            people[missing, :2] = 0
+        if frame is None:
+            if people is None or not len(people):
+                self.box = None # Nobody in the whole frame: keep looking at whole frames
+            return people
+        if people is None or not len(people):
+            return self._lost(frame_index, frame)
+        box, valid = keypoint_boxes(people[:1])
+        height, width = frame.shape[:2]
+        clipped = (
+            (x1 > 0 and box[0, 0] < x1) or (y1 > 0 and box[0, 1] < y1)
+            or (x2 < width and box[0, 2] > x2) or (y2 < height and box[0, 3] > y2)
+        )
+        if not valid[0] or clipped:
+            return self._lost(frame_index, frame)
+        return people
+
+    def _lost(self, frame_index: int, frame: np.ndarray):
+        self.cropped -= 1
+        self.retries += 1
+        self.since_full = self.redetect_every # Next frames wait for a whole-frame detection
+        self._pending[frame_index] = frame
+        return None
+
+    def retry_image(self, frame_index: int) -> np.ndarray:
+        """Whole (downscaled) frame for a crop restore() gave up on; restore() it again afterwards."""
+        frame = self._pending.pop(frame_index)
+        image, scale_x, scale_y = self.downscale(frame)
+        self._pending[frame_index] = (scale_x, scale_y, 0, 0, frame.shape[1], frame.shape[0], None)
+        return image
+
+    def observe(self, frame_index: int, person: Optional[np.ndarray]):
+        """Feeds back the athlete (first person) of each inferred frame, in frame order."""
+        if not self.crop or person is None:
+            return
+        boxes, valid = keypoint_boxes(person[None])
+        if not valid[0]:
+            return
+        if self.box is not None and frame_index > self.last_frame:
+            step = (boxes[0] - self.box) / (frame_index - self.last_frame)
+            self.velocity = 0.5 * self.velocity + 0.5 * step
+        else:
+            self.velocity = np.zeros(4)
+        self.box = boxes[0]
+        self.last_frame = frame_index
@@ -0,0 +1,127 @@
+import math
+from typing import Optional
+import numpy as np
+from app.core.config import settings
+from app.core.biomechanics import R_HIP, R_KNEE, R_ANKLE
+
+SAMPLING_MODES = ("stride", "fps", "budget", "motion")
+
+# Joints whose movement drives motion-aware sampling (hips, knees, ankles)
+MOTION_JOINTS = [11, 12, 13, 14, 15, 16]
+
+
+class FrameSampler:
+    """
+    Decides which frames of a clip get decoded and sent to YOLO.
+
+    - "stride": every Nth frame (legacy behaviour).
+    - "fps":    a fixed number of samples per second of video, whatever the camera FPS.
+    - "budget": at most max_frames samples, spread evenly over the clip.
+    - "motion": starts at the "fps" rate, then samples densely while the legs
+                move fast (contact / toe-off) and sparsely during slow phases.
+
+    max_frames is a hard cap in every mode. Frames that are not sampled should
+    only be grab()'ed, never retrieve()'d, so they are never fully decoded.
+
+    Motion feedback (observe) only arrives once a batch has been inferred,
+    so the sampler reacts up to one batch late. At VISION_BATCH_SIZE (16) and
+    10 samples/s that is ~1.6 s, longer than a stride. Motion mode therefore
+    runs VISION_MOTION_BATCH_SIZE (2) frames per call, a ~0.2 s lag, and pays
+    for it in smaller YOLO batches.
+    """
+
+    def __init__(
+        self,
+        mode: str = "stride",
+        video_fps: float = 30.0,
+        total_frames: int = 0,
+        stride: int = 3,
+        target_fps: float = 10.0,
+        max_frames: Optional[int] = None,
+        motion_threshold: float = 0.02,
+    ):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode '{mode}', expected one of {SAMPLING_MODES}")
+        self.mode = mode
+        self.max_frames = max_frames
+        self.motion_threshold = motion_threshold
+        video_fps = video_fps if video_fps and video_fps > 0 else 30.0
+
+        if mode == "stride":
+            interval = stride
+        elif mode == "budget" and max_frames and total_frames > 0:
+            interval = math.ceil(total_frames / max_frames)
+        else:
+            interval = round(video_fps / target_fps) if target_fps > 0 else stride
+
+        self.base_interval = max(1, interval)
+        self.interval = self.base_interval
+        # Motion mode can go 4x denser or 4x sparser than the base rate
+        self.min_interval = max(1, self.base_interval // 4)
+        self.max_interval = self.base_interval * 4
+
+        self.sampled = 0
+        self._next = self.base_interval # 1-based frame index of the next sample
+        self._last_kpts = None
+        self._last_index = None
+
+    @classmethod
+    def from_settings(cls, video_fps: float, total_frames: int):
+        return cls(
+            mode=settings.VISION_SAMPLING_MODE,
+            video_fps=video_fps,
+            total_frames=total_frames,
+            stride=settings.VISION_FRAME_STRIDE,
+            target_fps=settings.VISION_TARGET_SAMPLE_FPS,
+            max_frames=settings.VISION_MAX_FRAMES,
+            motion_threshold=settings.VISION_MOTION_THRESHOLD,
+        )
+
+    def restrict_to(self, start_frame: int, end_frame: int, total_frames: int):
+        """
+        Limits the sampler to frames (start_frame, end_frame] of a longer clip
+        so parallel segments sample exactly the frames a single pass would.
+        """
+        self._next = math.ceil((start_frame + 1) / self.base_interval) * self.base_interval
+        if self.max_frames is not None and total_frames > 0:
+            share = (end_frame - start_frame) / total_frames
+            self.max_frames = max(1, math.ceil(self.max_frames * share))
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_frames is not None and self.sampled >= self.max_frames
+
+    def should_sample(self, frame_index: int) -> bool:
+        """frame_index is 1-based, matching the legacy `frame_count % 3` loop."""
+        if self.exhausted or frame_index < self._next:
+            return False
+        self.sampled += 1
+        self._next = frame_index + self.interval
+        return True
+
+    def batch_size(self, batch_size: int) -> int:
+        """Frames per inference call: capped in motion mode so observe() isn't a stride behind."""
+        return min(batch_size, max(1, settings.VISION_MOTION_BATCH_SIZE)) if self.mode == "motion" else batch_size
+
+    def observe(self, frame_index: int, kpts: np.ndarray):
+        """
+        Feeds back the keypoints of an inferred frame (motion mode only).
+        Motion = mean leg-joint displacement per frame, normalised by leg length.
+        """
+        if self.mode != "motion":
+            return
+        if self._last_kpts is not None and frame_index > self._last_index:
+            leg_length = np.linalg.norm(kpts[R_HIP, :2] - kpts[R_ANKLE, :2])
+            if leg_length > 0 and np.all(kpts[[R_HIP, R_KNEE, R_ANKLE], :2] != 0):
+                step = kpts[MOTION_JOINTS, :2] - self._last_kpts[MOTION_JOINTS, :2]
+                motion = np.mean(np.linalg.norm(step, axis=1)) / leg_length
+                motion /= frame_index - self._last_index
+
+                if motion > self.motion_threshold:
+                    self.interval = max(self.min_interval, self.interval // 2)
+                else:
+                    self.interval = min(self.max_interval, self.interval * 2)
+                # Re-plan the next sample with the new interval
+                self._next = min(self._next, frame_index + self.interval)
+        self._last_kpts = kpts
+        self._last_index = frame_index
@@ -1,3 +1,6 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt
@@ -8,8 +11,8 @@ from app.core.config import settings
 def get_password_hash(password: str) -> str:
     # Convert string to bytes
     pwd_bytes = password.encode('utf-8')
-    # Generate salt and hash
-    salt = bcrypt.gensalt()
+    # Generate salt and hash (cost from BCRYPT_ROUNDS)
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(pwd_bytes, salt)
     return hashed.decode('utf-8') # Return as string for database
 
@@ -29,4 +32,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+
+# === 4. Non-blocking Hashing ===
+class HashingQueueFull(Exception):
+    """Raised when too many hash/verify calls are already waiting (mapped to 429)."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on its own small thread pool so a login burst can't eat the
+    shared request threadpool. bcrypt releases the GIL, so workers hash in
+    parallel. At most `workers + max_pending` calls are admitted at once;
+    anything beyond that fails fast with HashingQueueFull.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingQueueFull()
+        try:
+            return await asyncio.wrap_future(self.executor.submit(fn, *args))
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.BCRYPT_WORKERS, settings.BCRYPT_MAX_PENDING)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the stored hash was made with a different cost than BCRYPT_ROUNDS ("$2b$12$...")."""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
@@ -0,0 +1,178 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.biomechanics import compute_joint_metrics
+from app.core.gait import GaitTracker
+
+# A person's box needs at least this many visible joints
+MIN_BOX_JOINTS = 4
+BOX_PADDING = 0.1 # Fraction of box size added per side, so fast movers still overlap between samples
+
+
+def keypoint_boxes(people: np.ndarray, min_conf: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (P, 17, 3) keypoints -> (P, 4) padded x1, y1, x2, y2 boxes around the
+    visible joints, plus a (P,) mask of people with enough joints to box.
+    """
+    min_conf = settings.VISION_MIN_KEYPOINT_CONF if min_conf is None else min_conf
+    seen = (people[..., 2] >= min_conf) & np.any(people[..., :2] != 0, axis=-1)
+    x, y = people[..., 0], people[..., 1]
+    boxes = np.stack([
+        np.where(seen, x, np.inf).min(axis=1), np.where(seen, y, np.inf).min(axis=1),
+        np.where(seen, x, -np.inf).max(axis=1), np.where(seen, y, -np.inf).max(axis=1),
+    ], axis=1)
+    valid = seen.sum(axis=1) >= MIN_BOX_JOINTS
+    boxes[~valid] = 0.0
+    pad = (boxes[:, 2:] - boxes[:, :2]) * BOX_PADDING
+    boxes[:, :2] -= pad
+    boxes[:, 2:] += pad
+    return boxes, valid
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (T, 4) and (P, 4) boxes -> (T, P)."""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iou = inter / (area_a[:, None] + area_b[None, :] - inter)
+    return np.nan_to_num(iou)
+
+
+# === 1. IDENTITIES ===
+
+class PersonTracker:
+    """
+    Persistent ids for the people in a clip, from pose detections alone (no
+    appearance model). Each sampled frame's people are matched to the live
+    tracks by IoU between their keypoint boxes and each track's predicted
+    box (constant velocity), best pair first. Unmatched people open new
+    tracks; a track unseen for max_gap_seconds is closed, so someone who
+    leaves and comes back gets a new id.
+    """
+
+    def __init__(self, fps: float, iou_threshold: Optional[float] = None, max_gap_seconds: Optional[float] = None):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.iou_threshold = settings.VISION_TRACK_IOU if iou_threshold is None else iou_threshold
+        self.max_gap = (settings.VISION_TRACK_MAX_GAP_SECONDS if max_gap_seconds is None else max_gap_seconds) * self.fps
+        self.next_id = 1
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4))
+        self.velocity = np.empty((0, 4)) # Box change per frame
+        self.last_frame = np.empty(0, dtype=np.int64)
+
+    def update(self, frame_index: int, people: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Assigns ids to one frame's (P, 17, 3) people. Returns (ids, boxes);
+        id -1 = too few visible joints to track.
+        """
+        # 1. Forget tracks that have been gone too long
+        alive = frame_index - self.last_frame <= self.max_gap
+        self.ids, self.boxes = self.ids[alive], self.boxes[alive]
+        self.velocity, self.last_frame = self.velocity[alive], self.last_frame[alive]
+
+        boxes, valid = keypoint_boxes(people)
+        ids = np.full(len(people), -1, dtype=np.int64)
+        if not len(people):
+            return ids, boxes
+
+        # 2. Greedy matching on IoU with where each track should be by now
+        gap = (frame_index - self.last_frame)[:, None]
+        iou = box_iou(self.boxes + self.velocity * gap, boxes)
+        iou[:, ~valid] = 0.0
+        matched_tracks = set()
+        for flat in np.argsort(iou, axis=None)[::-1]:
+            t, p = divmod(int(flat), len(people))
+            if iou[t, p] < self.iou_threshold:
+                break
+            if t in matched_tracks or ids[p] != -1:
+                continue
+            matched_tracks.add(t)
+            ids[p] = self.ids[t]
+            step = (boxes[p] - self.boxes[t]) / gap[t]
+            self.velocity[t] = 0.5 * self.velocity[t] + 0.5 * step
+            self.boxes[t] = boxes[p]
+            self.last_frame[t] = frame_index
+
+        # 3. Everyone else with a usable box starts a track
+        new = np.flatnonzero(valid & (ids == -1))
+        if len(new):
+            ids[new] = np.arange(self.next_id, self.next_id + len(new))
+            self.next_id += len(new)
+            self.ids = np.concatenate([self.ids, ids[new]])
+            self.boxes = np.concatenate([self.boxes, boxes[new]])
+            self.velocity = np.concatenate([self.velocity, np.zeros((len(new), 4))])
+            self.last_frame = np.concatenate([self.last_frame, np.full(len(new), frame_index)])
+        return ids, boxes
+
+
+# === 2. PER-ATHLETE GAIT ===
+
+class PlayerTracker:
+    """
+    Multi-athlete version of GaitTracker: one GaitTracker per PersonTracker
+    id. Per inference batch every person is smoothed by their own track's
+    filter, then the joint metrics of all people in the batch come from a
+    single compute_joint_metrics call and are routed back to their tracks.
+    """
+
+    def __init__(self, video_fps: float):
+        self.fps = video_fps if video_fps and video_fps > 0 else 30.0
+        self.people = PersonTracker(self.fps)
+        self.trackers: Dict[int, GaitTracker] = {}
+        self.seen: Dict[int, dict] = {} # track id -> first/last frame, frames, summed box centre
+
+    def update(self, frame_indices: List[int], people: List[np.ndarray]) -> int:
+        """Feeds one inference batch: people[i] is a (P_i, 17, 3) array for frame_indices[i]. Returns people tracked."""
+        # 1. Identities, frame by frame (in order)
+        rows: Dict[int, Tuple[list, list]] = {}
+        for frame_index, persons in zip(frame_indices, people):
+            ids, boxes = self.people.update(frame_index, persons)
+            for track_id, kpts, box in zip(ids.tolist(), persons, boxes):
+                if track_id < 0:
+                    continue
+                frames, track_kpts = rows.setdefault(track_id, ([], []))
+                frames.append(frame_index)
+                track_kpts.append(kpts)
+                seen = self.seen.setdefault(track_id, {"first_frame": frame_index, "frames": 0, "centre": np.zeros(2)})
+                seen["last_frame"] = frame_index
+                seen["frames"] += 1
+                seen["centre"] += (box[:2] + box[2:]) / 2
+        if not rows:
+            return 0
+
+        # 2. Per-track smoothing, then one vectorized metrics pass for everybody
+        smoothed = []
+        for track_id, (frames, kpts) in rows.items():
+            tracker = self.trackers.get(track_id)
+            if tracker is None:
+                tracker = self.trackers[track_id] = GaitTracker(self.fps)
+            smoothed.append((tracker, frames, *tracker.smooth(frames, np.stack(kpts))))
+        joint = compute_joint_metrics(np.concatenate([kpts for _, _, kpts, _ in smoothed]))
+
+        # 3. Route the rows back to each athlete's aggregates / stride detection
+        offset = 0
+        for tracker, frames, kpts, seen in smoothed:
+            end = offset + len(frames)
+            tracker.ingest(frames, kpts, seen, {"values": joint["values"][offset:end], "weights": joint["weights"][offset:end]})
+            offset = end
+        return offset
+
+    def summaries(self, min_frames: int = 1) -> List[dict]:
+        """Per-track GaitTracker summaries (tracks seen in >= min_frames samples), in id order."""
+        players = []
+        for track_id in sorted(self.trackers):
+            seen = self.seen[track_id]
+            if seen["frames"] < min_frames:
+                continue
+            players.append({
+                "track_id": track_id,
+                "first_frame": seen["first_frame"],
+                "last_frame": seen["last_frame"],
+                "frames_seen": seen["frames"],
+                "centre": (seen["centre"] / seen["frames"]).tolist(),
+                "summary": self.trackers[track_id].summary(),
+            })
+        return players
@@ -1,12 +1,88 @@
-import cv2
-import math
+import threading
+import time
 import numpy as np
-from ultralytics import YOLO
+from typing import Optional
+from app.core import metrics
+from app.core.config import settings
+from app.core.biomechanics import COLUMN
+from app.core.gait import GaitTracker
+from app.core.inference import get_backend
+from app.core.risk_rules import rule_engine
+from app.core.roi import RoiCropper
+from app.core.sampling import FrameSampler
+from app.core.tracking import PlayerTracker
 
 class VisionEngine:
-    def __init__(self):
-        # Load YOLOv8 Pose Model
-        self.model = YOLO('yolov8n-pose.pt') 
+    """
+    Pose pipeline around YOLOv8. Constructing one is cheap: cv2, ultralytics
+    and torch are only imported, and the weights only loaded, on first use
+    (or when load() is called from a warmup hook). The runtime (PyTorch,
+    ONNX Runtime, OpenVINO, optionally INT8) comes from VISION_BACKEND /
+    VISION_INT8 unless passed in.
+    """
+
+    def __init__(self, backend: Optional[str] = None, int8: Optional[bool] = None):
+        self.backend = get_backend(backend, int8)
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        """Loads the YOLOv8 Pose Model (idempotent and thread-safe). Exports it first if the backend needs it."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    from ultralytics import YOLO
+                    self._model = YOLO(self.backend.model_path(), task="pose")
+                    self.load_seconds = time.perf_counter() - start
+                    metrics.model_load_seconds.set(self.load_seconds, self.backend.artifact.name)
+        return self._model
+
+    @property
+    def model(self):
+        return self.load()
+
+    @property
+    def extractor_version(self) -> str:
+        """
+        Identifies everything that changes the raw keypoints for a given video
+        (model, runtime, frame sampling, downscaling/ROI). Stored tracks are keyed by it.
+        """
+        sampling = (
+            f"{settings.VISION_SAMPLING_MODE}/{settings.VISION_FRAME_STRIDE}/"
+            f"{settings.VISION_TARGET_SAMPLE_FPS}/{settings.VISION_MAX_FRAMES}/{settings.VISION_MOTION_THRESHOLD}"
+        )
+        if settings.VISION_SAMPLING_MODE == "motion": # Batch size decides when motion feedback lands
+            sampling += f"/mb{settings.VISION_MOTION_BATCH_SIZE}"
+        backend = f"{self.backend.name}{'-int8' if self.backend.int8 else ''}"
+        version = f"{settings.VISION_MODEL_NAME}|{backend}|{sampling}"
+        if settings.VISION_DECODE_MAX_SIDE:
+            version += f"|max{settings.VISION_DECODE_MAX_SIDE}"
+        if settings.VISION_ROI:
+            version += (
+                f"|roi{settings.VISION_ROI_IMGSZ}/{settings.VISION_ROI_PADDING}/"
+                f"{settings.VISION_ROI_MIN_SIDE}/{settings.VISION_ROI_REDETECT_EVERY}"
+            )
+        return version
+
+    @staticmethod
+    def scoring_version() -> str:
+        """
+        Everything between the keypoints and the report. Bump the suffix
+        whenever the metric/scoring code changes.
+        """
+        smoothing = f"{settings.VISION_SMOOTHING}/{settings.VISION_ONE_EURO_MIN_CUTOFF}/{settings.VISION_ONE_EURO_BETA}"
+        return f"{settings.VISION_MIN_KEYPOINT_CONF}|{smoothing}|{rule_engine.labels_version}|v4"
+
+    @property
+    def version(self) -> str:
+        """Identifies everything that changes the output for a given video."""
+        return f"{self.extractor_version}|{self.scoring_version()}"
 
     def calculate_angle(self, p1, p2, p3):
         """Calculates angle between 3 points (p1-p2-p3)"""
@@ -22,93 +98,355 @@ class VisionEngine:
         cos_angle = dot_prod / (mag1 * mag2)
         return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
 
-    def analyze_video(self, video_path: str):
+    def analyze_video(self, video_path: str, batch_size: Optional[int] = None, keep_track: bool = False):
+        """
+        Runs pose estimation on the frames chosen by the FrameSampler, in
+        fixed-size batches, and scores the clip. With keep_track the report
+        also carries the raw keypoints under "track" (see extract_metrics);
+        pop it before caching/returning the report.
+        """
+        extracted = self.extract_metrics(video_path, batch_size=batch_size, keep_track=keep_track)
+        report = self.score_extracted(extracted)
+        if keep_track:
+            report["track"] = extracted["track"]
+        return report
+
+    def extract_metrics(
+        self,
+        video_path: str,
+        batch_size: Optional[int] = None,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        keep_track: bool = False,
+    ) -> dict:
+        """
+        Streams frames (start_frame, end_frame] of a clip through a GaitTracker
+        one inference batch at a time, so memory doesn't grow with clip length.
+        Returns the tracker summary (clip aggregates + per-stride metrics).
+        Segments of one clip can be merged with merge_metrics.
+        keep_track also returns the raw keypoints of every frame with a person
+        as float32 (~200 bytes/frame) under "track", for re-scoring later.
+        """
+        batch_size = max(1, batch_size or settings.VISION_BATCH_SIZE)
+        cap, sampler, video_fps, end_frame = self._open_clip(video_path, start_frame, end_frame)
+        roi = RoiCropper.from_settings()
+        tracker = GaitTracker(video_fps)
+        frames = {"total": 0, "decoded": 0, "inferred": 0, "with_pose": 0, "sampling": sampler.mode}
+        timings = {"decode": 0.0, "preprocess": 0.0, "inference": 0.0, "extraction": 0.0} # Seconds per stage, whole clip
+        track = ([], []) if keep_track else None # Frame indices, float32 (B, 17, 3) keypoint batches
+
+        for batch in self._batches(cap, sampler, batch_size, start_frame, end_frame, frames, timings, roi):
+            frames["with_pose"] += self._track_batch(batch, sampler, tracker, timings, track, roi)
+            frames["inferred"] += len(batch)
+        frames["cropped"], frames["retried"] = roi.cropped, roi.retries
+
+        extracted = {"summary": tracker.summary(), "frames": frames, "timings": timings}
+        if track is not None:
+            extracted["track"] = {
+                "fps": video_fps,
+                "frames": np.array(track[0], dtype=np.int32),
+                "keypoints": np.concatenate(track[1]) if track[1] else np.empty((0, 17, 3), np.float32),
+            }
+        return extracted
+
+    def analyze_players(self, video_path: str, batch_size: Optional[int] = None) -> dict:
+        """
+        Multi-athlete version of analyze_video(): everyone in frame gets a
+        persistent track id (app/core/tracking.py) and their own valgus / hip /
+        foot strike report, all from one inference pass over the clip.
+        """
+        return self.score_players(self.extract_players(video_path, batch_size=batch_size))
+
+    def extract_players(self, video_path: str, batch_size: Optional[int] = None) -> dict:
+        """
+        Streams the whole clip through a PlayerTracker (one GaitTracker per
+        track id). Clips are never split into segments here: ids would not
+        carry across the cut. Tracks seen for less than VISION_MIN_TRACK_SECONDS
+        are dropped.
+        """
+        batch_size = max(1, batch_size or settings.VISION_BATCH_SIZE)
+        cap, sampler, video_fps, _ = self._open_clip(video_path)
+        roi = RoiCropper.from_settings(crop=False) # One crop can't follow a squad: downscaling only
+        tracker = PlayerTracker(video_fps)
+        frames = {"total": 0, "decoded": 0, "inferred": 0, "with_pose": 0, "people": 0, "sampling": sampler.mode}
+        timings = {"decode": 0.0, "preprocess": 0.0, "inference": 0.0, "extraction": 0.0}
+
+        for batch in self._batches(cap, sampler, batch_size, 0, None, frames, timings, roi):
+            start = time.perf_counter()
+            indices, people = self._infer_people(batch, sampler, roi)
+            inferred = time.perf_counter()
+            frames["people"] += tracker.update(indices, people)
+            timings["inference"] += inferred - start
+            timings["extraction"] += time.perf_counter() - inferred
+            frames["inferred"] += len(batch)
+            frames["with_pose"] += len(indices)
+
+        # VISION_MIN_TRACK_SECONDS in sampled frames
+        sampled_per_second = tracker.fps * frames["decoded"] / frames["total"] if frames["total"] else tracker.fps
+        min_frames = max(1, int(settings.VISION_MIN_TRACK_SECONDS * sampled_per_second))
+        frames["tracks"] = tracker.people.next_id - 1
+        return {"players": tracker.summaries(min_frames), "frames": frames, "timings": timings}
+
+    @staticmethod
+    def score_players(extracted: dict) -> dict:
+        """Per-player reports from extract_players() output (same fields as score_extracted(), minus "frames")."""
+        start = time.perf_counter()
+        players = []
+        for player in extracted["players"]:
+            report = VisionEngine.score_extracted({"summary": player["summary"], "frames": None}, record=False)
+            del report["frames"]
+            players.append({**{key: value for key, value in player.items() if key != "summary"}, **report})
+        metrics.record_vision(
+            extracted["frames"], {**extracted.get("timings", {}), "scoring": time.perf_counter() - start},
+        )
+        return {"frames": extracted["frames"], "players": players}
+
+    def _open_clip(self, video_path: str, start_frame: int = 0, end_frame: Optional[int] = None):
+        """Opens a clip at start_frame with its FrameSampler. Returns (cap, sampler, video_fps, end_frame)."""
+        import cv2
+
         cap = cv2.VideoCapture(video_path)
-        
-        valgus_angles = []
-        shin_angles = []
-        hip_deviations = [] # Normalized deviation
-        
-        frame_count = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret: break
-            
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        video_fps = cap.get(cv2.CAP_PROP_FPS)
+        sampler = FrameSampler.from_settings(
+            video_fps=video_fps,
+            total_frames=total_frames,
+        )
+        if start_frame or end_frame is not None:
+            end_frame = end_frame if end_frame is not None else total_frames
+            sampler.restrict_to(start_frame, end_frame, total_frames)
+            if start_frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        return cap, sampler, video_fps, end_frame
+
+    def _batches(self, cap, sampler: FrameSampler, batch_size: int, start_frame: int,
+                 end_frame: Optional[int], frames: dict, timings: dict, roi: Optional[RoiCropper] = None):
+        """
+        Yields the sampled frames as lists of (frame_index, frame), batch_size
+        at a time, counting frames["total"/"decoded"] and the decode time.
+        Each batch is processed before the next one is read, so the sampler
+        can react to what it saw (motion mode) and the RoiCropper can crop
+        around where the athlete was last seen. With a roi the frames are its
+        model inputs (crops / downscaled frames, timed as "preprocess").
+        Releases the capture at the end.
+        """
+        batch_size = sampler.batch_size(batch_size)
+        batch = [] # (frame_index, frame) pairs waiting for inference
+        frame_count = start_frame
+        while cap.isOpened() and not sampler.exhausted:
+            if end_frame is not None and frame_count >= end_frame: break
+
+            # grab() only advances the stream; skipped frames are never decoded
+            start = time.perf_counter()
+            if not cap.grab(): break
+
             frame_count += 1
-            if frame_count % 3 != 0: # Process every 3rd frame (more samples = better accuracy)
+            if not sampler.should_sample(frame_count):
+                timings["decode"] += time.perf_counter() - start
                 continue
-            
-            results = self.model(frame, verbose=False)
-            
-            for result in results:
-                if result.keypoints and result.keypoints.data is not None:
-                    kpts = result.keypoints.data[0].cpu().numpy()
-                    if len(kpts) < 17: continue
-
-                    # === COORDINATES (Right Leg) ===
-                    # Hip(12), Knee(14), Ankle(16)
-                    r_hip = kpts[12][:2]
-                    r_knee = kpts[14][:2]
-                    r_ankle = kpts[16][:2]
-                    
-                    # Skip empty detections
-                    if np.any(r_hip == 0) or np.any(r_knee == 0) or np.any(r_ankle == 0):
-                        continue
-
-                    # 1. LEG LENGTH (For Normalization)
-                    # Distance from Hip to Ankle
-                    leg_length = np.linalg.norm(r_hip - r_ankle)
-                    if leg_length == 0: continue
-
-                    # 2. HIP INTERNAL ROTATION (Normalized)
-                    # Logic: Draw a line from Hip to Ankle. How far is the Knee from this line?
-                    # Start with Midpoint X
-                    midpoint_x = (r_hip[0] + r_ankle[0]) / 2
-                    
-                    # Deviation: Knee X position relative to the center line
-                    raw_deviation = r_knee[0] - midpoint_x 
-                    
-                    # Normalize: Deviation as a % of leg length
-                    # e.g., 0.05 means knee moved 5% of leg length inward
-                    normalized_deviation = raw_deviation / leg_length
-                    hip_deviations.append(normalized_deviation)
-
-                    # 3. KNEE VALGUS (Angle)
-                    angle = self.calculate_angle(r_hip, r_knee, r_ankle)
-                    valgus_angles.append(abs(180 - angle))
-
-                    # 4. FOOT STRIKE (Shin Angle)
-                    dx = r_knee[0] - r_ankle[0]
-                    dy = r_knee[1] - r_ankle[1]
-                    if dy != 0:
-                        shin_angles.append(math.degrees(math.atan2(dx, dy)))
 
+            ret, frame = cap.retrieve()
+            decoded = time.perf_counter()
+            timings["decode"] += decoded - start
+            if not ret: continue
+            if roi is not None:
+                frame = roi.prepare(frame_count, frame)
+                timings["preprocess"] += time.perf_counter() - decoded
+            frames["decoded"] += 1
+
+            batch.append((frame_count, frame))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
         cap.release()
+        frames["total"] = frame_count - start_frame
+
+    @staticmethod
+    def merge_metrics(parts) -> dict:
+        """Combines extract_metrics() outputs of consecutive segments, in order."""
+        merged = {"summary": GaitTracker.merge([p["summary"] for p in parts])}
+        merged["frames"] = {
+            key: sum(p["frames"][key] for p in parts)
+            for key in ("total", "decoded", "inferred", "with_pose", "cropped", "retried")
+        }
+        merged["frames"]["sampling"] = parts[0]["frames"]["sampling"] if parts else settings.VISION_SAMPLING_MODE
+        merged["frames"]["segments"] = len(parts)
+        # Segments run in parallel: these are summed stage times, not wall time
+        merged["timings"] = {
+            stage: sum(p.get("timings", {}).get(stage, 0.0) for p in parts)
+            for stage in ("decode", "preprocess", "inference", "extraction")
+        }
+        if parts and all("track" in p for p in parts):
+            merged["track"] = {
+                "fps": parts[0]["track"]["fps"],
+                "frames": np.concatenate([p["track"]["frames"] for p in parts]),
+                "keypoints": np.concatenate([p["track"]["keypoints"] for p in parts]),
+            }
+        return merged
+
+    @staticmethod
+    def score_track(frame_indices: np.ndarray, keypoints: np.ndarray, fps: float, frames: dict,
+                    batch_size: int = 4096) -> dict:
+        """
+        Re-scores a stored track (extract_metrics' "track") without the video
+        or the model: replays the keypoints through a fresh GaitTracker with
+        the current smoothing/metric/scoring code. `frames` are the original
+        frame counters, reported unchanged.
+        """
+        tracker = GaitTracker(fps)
+        for start in range(0, len(frame_indices), batch_size):
+            tracker.update(frame_indices[start:start + batch_size].tolist(), keypoints[start:start + batch_size])
+        return VisionEngine.score_extracted({"summary": tracker.summary(), "frames": frames}, record=False)
+
+    @staticmethod
+    def score_extracted(extracted: dict, record: bool = True) -> dict:
+        """
+        Clip report from extract_metrics()/merge_metrics() output. Also records
+        the clip's frame counters and stage timings (GET /metrics); pool
+        workers only extract, so each clip is recorded once, here.
+        """
+        start = time.perf_counter()
+        summary = extracted["summary"]
+        report = VisionEngine.score_metrics(summary["metrics"])
+        report["gait"] = {
+            "stride_count": summary["stride_count"],
+            "stride_seconds_median": summary["stride_seconds_median"],
+            "strides": summary["strides"],
+        }
+        report["frames"] = extracted["frames"]
+        if record:
+            metrics.record_vision(
+                extracted["frames"], {**extracted.get("timings", {}), "scoring": time.perf_counter() - start},
+            )
+        return report
+
+    def _detect(self, batch, roi: Optional[RoiCropper] = None) -> list:
+        """
+        Runs YOLO on a batch of (index, frame), returns one (P, 17, 3) array per
+        frame (most confident first, None = nobody) in original frame pixels.
+        With a roi, whole frames and crops go in separate calls (crops at the
+        smaller roi.imgsz) and crops that lost the athlete are re-run whole.
+        """
+        if roi is None:
+            return [self._people(result) for result in self.model([frame for _, frame in batch], verbose=False)]
 
+        crops = [i for i, (frame_index, _) in enumerate(batch) if roi.is_crop(frame_index)]
+        whole = [i for i in range(len(batch)) if not roi.is_crop(batch[i][0])]
+        people = [None] * len(batch)
+        for group, options in ((whole, {}), (crops, {"imgsz": roi.imgsz})):
+            if group:
+                results = self.model([batch[i][1] for i in group], verbose=False, **options)
+                for i, result in zip(group, results):
+                    people[i] = roi.restore(batch[i][0], self._people(result))
+
+        lost = [i for i in crops if people[i] is None]
+        if lost:
+            results = self.model([roi.retry_image(batch[i][0]) for i in lost], verbose=False)
+            for i, result in zip(lost, results):
+                people[i] = roi.restore(batch[i][0], self._people(result))
+        for (frame_index, _), persons in zip(batch, people):
+            roi.observe(frame_index, persons[0] if persons is not None and len(persons) else None)
+        return people
+
+    @staticmethod
+    def _people(result) -> Optional[np.ndarray]:
+        if result.keypoints and result.keypoints.data is not None:
+            persons = result.keypoints.data.cpu().numpy()
+            if persons.ndim == 3 and persons.shape[1] >= 17 and len(persons):
+                return persons
+        return None
+
+    def _infer_batch(self, batch, sampler: Optional[FrameSampler] = None, roi: Optional[RoiCropper] = None):
+        """
+        Runs YOLO on a batch of (index, frame), returns (frame_indices, keypoints)
+        for the frames with a person (first person per frame).
+        """
+        indices, kpts = [], []
+        for (frame_index, _), persons in zip(batch, self._detect(batch, roi)):
+            if persons is None: continue
+            person = persons[0]
+            indices.append(frame_index)
+            kpts.append(person)
+            if sampler is not None:
+                sampler.observe(frame_index, person)
+        return indices, kpts
+
+    def _infer_people(self, batch, sampler: Optional[FrameSampler] = None, roi: Optional[RoiCropper] = None):
+        """
+        Like _infer_batch(), but keeps everybody: returns (frame_indices, people)
+        with one (P, 17, 3) array per frame that has anyone in it (at most
+        VISION_MAX_PLAYERS, most confident first).
+        """
+        indices, people = [], []
+        for (frame_index, _), persons in zip(batch, self._detect(batch, roi)):
+            if persons is None: continue
+            persons = persons[:settings.VISION_MAX_PLAYERS]
+            indices.append(frame_index)
+            people.append(persons)
+            if sampler is not None:
+                sampler.observe(frame_index, persons[0])
+        return indices, people
+
+    def _track_batch(self, batch, sampler: FrameSampler, tracker: GaitTracker, timings: dict, track=None,
+                     roi: Optional[RoiCropper] = None) -> int:
+        start = time.perf_counter()
+        indices, kpts = self._infer_batch(batch, sampler, roi)
+        inferred = time.perf_counter()
+        if indices:
+            kpts = np.stack(kpts)
+            tracker.update(indices, kpts)
+            if track is not None:
+                track[0].extend(indices)
+                track[1].append(kpts.astype(np.float32))
+        timings["inference"] += inferred - start
+        timings["extraction"] += time.perf_counter() - inferred
+        return len(indices)
+
+    @staticmethod
+    def score_metrics(stats: dict):
+        """Turns the streamed clip aggregates (StreamingMetrics.to_dict) into the report (worse leg counts)."""
         # === INTELLIGENT SCORING ===
-        
-        # A. Valgus (Angle)
-        avg_valgus = float(np.percentile(valgus_angles, 85)) if valgus_angles else 0.0
+        def mean(name):
+            c = COLUMN[name]
+            return stats["weighted_abs"][c] / stats["weight"][c] if stats["weight"][c] > 0 else 0.0
+
+        # A. Valgus (Angle), streaming 85th percentile per leg
+        valgus_sides = [stats["q85"][name] or 0.0 for name in ("valgus_left", "valgus_right")]
+        avg_valgus = max(valgus_sides)
 
         # B. Hip Rotation (Normalized Ratio)
-        # Threshold: If knee deviates > 4% of leg length (0.04), it's an issue.
+        # Threshold (risk rules "labels"): knee deviation as a fraction of leg length.
         # Note: We use absolute value to catch both inward and outward, 
         # but internal rotation is usually the concern.
-        avg_hip_ratio = float(np.mean(np.abs(hip_deviations))) if hip_deviations else 0.0
-        
-        hip_status = "Normal"
-        if avg_hip_ratio > 0.04:  # SENSITIVITY SETTING (Lower = More Sensitive)
-            hip_status = "Excessive Internal Rotation"
+        hip_sides = [mean("hip_left"), mean("hip_right")]
+        avg_hip_ratio = max(hip_sides)
+        hip_status = rule_engine.label("hip_internal_rotation", avg_hip_ratio)
 
-        # C. Foot Strike
-        avg_shin = float(np.mean(shin_angles)) if shin_angles else 0.0
-        strike_type = "Midfoot/Forefoot" if avg_shin > -5 else "Heel Strike (Overstride)"
+        # C. Foot Strike (signed, both legs pooled)
+        shins = [COLUMN["shin_left"], COLUMN["shin_right"]]
+        shin_weight = sum(stats["weight"][c] for c in shins)
+        avg_shin = sum(stats["weighted_sum"][c] for c in shins) / shin_weight if shin_weight > 0 else 0.0
+        strike_type = rule_engine.label("foot_strike_pattern", avg_shin)
 
-        # DEBUGGING: Print hidden stats to terminal so you can see what happened
-        print(f"DEBUG STATS -> Valgus: {avg_valgus:.1f}, Hip Ratio: {avg_hip_ratio:.4f}, Shin: {avg_shin:.1f}")
+        # D. Posture (B2C "Text Neck" check uses head_forward_angle)
+        trunk_lean = mean("trunk_lean")
+        head_forward = mean("head_forward")
 
         return {
             "valgus": avg_valgus,
             "hip_rotation": hip_status,
-            "foot_strike": strike_type
-        }
\ No newline at end of file
+            "foot_strike": strike_type,
+            "head_forward_angle": head_forward,
+            "trunk_lean": trunk_lean,
+            "shin_angle": avg_shin,
+            "hip_ratio": avg_hip_ratio,
+            "bilateral": {
+                "valgus_left": valgus_sides[0],
+                "valgus_right": valgus_sides[1],
+                "hip_left": hip_sides[0],
+                "hip_right": hip_sides[1],
+            },
+        }
@@ -0,0 +1,103 @@
+import asyncio
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from app.core.config import settings
+
+# === WORKER PROCESS STATE ===
+# Each pool process loads its own YOLO model exactly once (in the initializer).
+_engine = None
+
+def _init_worker(threads_per_worker: int):
+    global _engine
+    # Must happen before torch/cv2 are imported, or every process grabs every core
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)
+    os.environ["MKL_NUM_THREADS"] = str(threads_per_worker)
+
+    import cv2
+    cv2.setNumThreads(threads_per_worker)
+    from app.core.vision_engine import VisionEngine
+    _engine = VisionEngine()
+    _engine.load()
+
+def _extract(video_path: str, start_frame: int, end_frame: Optional[int], keep_track: bool = False) -> dict:
+    return _engine.extract_metrics(video_path, start_frame=start_frame, end_frame=end_frame, keep_track=keep_track)
+
+def _extract_players(video_path: str) -> dict:
+    return _engine.extract_players(video_path)
+
+def _frame_count(video_path: str) -> int:
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return total
+
+
+class VisionPool:
+    """
+    Pool of worker processes, each holding one VisionEngine.
+
+    - analyze_many(): several videos at once, one per process.
+    - analyze(): one video; long clips are cut into time segments that run in
+      parallel, and the per-segment metric arrays are merged before scoring.
+    """
+
+    def __init__(self, workers: Optional[int] = None, segment_min_frames: Optional[int] = None):
+        self.workers = workers or settings.VISION_POOL_WORKERS or os.cpu_count() or 1
+        self.segment_min_frames = segment_min_frames or settings.VISION_SEGMENT_MIN_FRAMES
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            # spawn: never fork a parent that already has torch/threads loaded
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads,),
+        )
+
+    def segments(self, total_frames: int) -> List[tuple]:
+        """Splits [0, total_frames) into at most `workers` segments of >= segment_min_frames."""
+        count = min(self.workers, total_frames // self.segment_min_frames) if total_frames > 0 else 1
+        if count <= 1:
+            return [(0, None)]
+        size = math.ceil(total_frames / count)
+        bounds = [(start, min(start + size, total_frames)) for start in range(0, total_frames, size)]
+        return [(start, None if end == total_frames else end) for start, end in bounds]
+
+    async def analyze(self, video_path: str, keep_track: bool = False) -> dict:
+        """Same as VisionEngine.analyze_video(); segment tracks are concatenated in frame order."""
+        from app.core.vision_engine import VisionEngine
+
+        loop = asyncio.get_running_loop()
+        total_frames = await loop.run_in_executor(None, _frame_count, video_path)
+        parts = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, _extract, video_path, start, end, keep_track)
+            for start, end in self.segments(total_frames)
+        ])
+        merged = VisionEngine.merge_metrics(parts)
+        report = VisionEngine.score_extracted(merged)
+        if keep_track:
+            report["track"] = merged["track"]
+        return report
+
+    async def analyze_players(self, video_path: str) -> dict:
+        """VisionEngine.analyze_players() on one worker (track ids don't survive segment cuts)."""
+        from app.core.vision_engine import VisionEngine
+
+        loop = asyncio.get_running_loop()
+        extracted = await loop.run_in_executor(self._executor, _extract_players, video_path)
+        return VisionEngine.score_players(extracted)
+
+    async def analyze_many(self, video_paths: List[str]) -> List[dict]:
+        return await asyncio.gather(*[self.analyze(path) for path in video_paths])
+
+    def warmup(self):
+        """Starts the worker processes (and loads their models) ahead of the first request."""
+        futures = [self._executor.submit(os.getpid) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
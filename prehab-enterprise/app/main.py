@@ -1,8 +1,15 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core import metrics
 from app.core.config import settings
+from app.core.security import HashingQueueFull, password_hasher
 from app.api.v1.endpoints import auth, analytics
 from app.db.base_class import Base
-from app.db.session import engine
+from app.db.session import async_engine, engine
+from app.services.video_ingest import UploadSizeLimit
 
 # === CRITICAL FIX: Import ALL models here ===
 # This forces Python to "load" these files so SQLAlchemy knows they exist.
@@ -10,18 +17,94 @@ from app.models.user import User
 from app.models.metrics import BiometricLog 
 # ============================================
 
-# 1. Create Tables on Startup
-Base.metadata.create_all(bind=engine)
+# Background model warmup (only when VISION_WARMUP_ON_STARTUP is set)
+warmup = {"task": None, "error": None}
+
+async def _warmup_vision():
+    try:
+        await run_in_threadpool(analytics.vision_model.load)
+        if analytics.vision_pool is not None:
+            await run_in_threadpool(analytics.vision_pool.warmup)
+    except Exception as exc:
+        warmup["error"] = repr(exc)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 1. Create Tables on Startup (not on import, so importing app.main stays cheap)
+    await run_in_threadpool(Base.metadata.create_all, bind=engine)
+
+    # 2. Optionally load the vision model without blocking startup; /ready reports progress
+    if settings.VISION_WARMUP_ON_STARTUP:
+        warmup["task"] = asyncio.create_task(_warmup_vision())
+
+    yield
+
+    if warmup["task"] is not None:
+        warmup["task"].cancel()
+    # Stop the vision worker processes (if enabled) on shutdown
+    if analytics.vision_pool is not None:
+        analytics.vision_pool.shutdown()
+    password_hasher.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
-# 2. Register Routers
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+# Oversized uploads are refused from their Content-Length, before any of the body is read
+app.add_middleware(UploadSizeLimit)
+
+# 3. Register Routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["Authentication"])
 app.include_router(analytics.router, prefix=f"{settings.API_V1_STR}/analytics", tags=["Digital Twin Engine"])
 
+# Login/signup bursts beyond BCRYPT_MAX_PENDING: tell clients to back off instead of queueing forever
+@app.exception_handler(HashingQueueFull)
+async def hashing_queue_full(request: Request, exc: HashingQueueFull):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many concurrent logins, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 @app.get("/")
 def root():
-    return {"status": "Prehab System Secured & Ready"}
\ No newline at end of file
+    return {"status": "Prehab System Secured & Ready"}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape target (per process: scrape every replica/worker)."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+def ready(response: Response):
+    """
+    Readiness probe. With VISION_WARMUP_ON_STARTUP the replica reports 503
+    until the model is in memory; otherwise the model loads on first video.
+    """
+    vision = analytics.vision_model
+    if vision.is_loaded:
+        model_state = "loaded"
+    elif warmup["error"]:
+        model_state = "failed"
+    elif warmup["task"] is not None:
+        model_state = "loading"
+    else:
+        model_state = "lazy"
+
+    is_ready = model_state == "loaded" or not settings.VISION_WARMUP_ON_STARTUP
+    if not is_ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return {
+        "status": "ready" if is_ready else "starting",
+        "model": model_state,
+        "model_load_seconds": vision.load_seconds,
+        "error": warmup["error"],
+    }
@@ -1,24 +1,89 @@
-from sqlalchemy import Column, Integer, Float, JSON, ForeignKey, DateTime
+from sqlalchemy import Column, Date, Integer, Float, JSON, ForeignKey, DateTime, Index, String, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class BiometricLog(Base):
     __tablename__ = "biometric_logs"
+    __table_args__ = (
+        # Time-range reads are always "this user, between t1 and t2"
+        Index("ix_biometric_logs_user_id_timestamp", "user_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     
     # Shared Metrics
-    steps = Column(Integer, default=0)
+    steps = Column(Integer, nullable=True) # NULL = not reported (a report/sleep-only row), not zero steps
     sleep_hours = Column(Float, nullable=True)
     
     # B2B Specific
     vo2_max = Column(Float, nullable=True)
     acwr_ratio = Column(Float, nullable=True)
+    training_load = Column(Float, nullable=True) # Session load (e.g. sRPE x minutes), feeds server-side ACWR
     
     # AI Results
     ai_insights = Column(JSON, nullable=True)
 
-    user = relationship("User", back_populates="biometrics")
\ No newline at end of file
+    user = relationship("User", back_populates="biometrics")
+
+
+class KeypointTrack(Base):
+    """
+    Raw pose keypoints of one analyzed video (files in TRACK_STORE_DIR, see
+    app/services/track_store.py), linked to the report they produced so the
+    report can be re-scored without re-running the model.
+    """
+    __tablename__ = "keypoint_tracks"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    biometric_log_id = Column(Integer, ForeignKey("biometric_logs.id"), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    video_sha256 = Column(String(64), index=True)
+    extractor_version = Column(String)  # Model/runtime/sampling that produced the keypoints
+    path = Column(String)               # Relative to TRACK_STORE_DIR; shared by re-uploads of the same clip
+    frame_count = Column(Integer)       # Frames with a person (rows in the track)
+
+    scoring_version = Column(String)    # Scoring code the linked report was last computed with
+    rescored_at = Column(DateTime(timezone=True), nullable=True)
+
+    user = relationship("User")
+    biometric_log = relationship("BiometricLog")
+
+
+class BiometricRollup(Base):
+    """
+    Daily / weekly aggregates of BiometricLog per user and per organization,
+    kept up to date on every insert (app/services/rollups.py). Only sums and
+    counts (plus a max that never has to shrink), so buckets can be merged
+    exactly when a chart asks for coarser points.
+    """
+    __tablename__ = "biometric_rollups"
+    __table_args__ = (
+        # Upsert target and the only read path: one series, ordered by time
+        UniqueConstraint("scope", "scope_id", "period", "period_start", name="uq_biometric_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scope = Column(String(4), nullable=False)     # "user" | "org"
+    scope_id = Column(Integer, nullable=False)    # users.id / organizations.id
+    period = Column(String(4), nullable=False)    # "day" | "week" (ISO, Monday start)
+    period_start = Column(Date, nullable=False)   # UTC date
+
+    logs = Column(Integer, nullable=False, default=0)
+    steps_sum = Column(Float, nullable=False, default=0.0)
+    steps_n = Column(Integer, nullable=False, default=0)
+    sleep_sum = Column(Float, nullable=False, default=0.0)
+    sleep_n = Column(Integer, nullable=False, default=0)
+    load_sum = Column(Float, nullable=False, default=0.0)
+    load_n = Column(Integer, nullable=False, default=0)
+    acwr_sum = Column(Float, nullable=False, default=0.0)
+    acwr_n = Column(Integer, nullable=False, default=0)
+    acwr_max = Column(Float, nullable=True)
+    vo2_sum = Column(Float, nullable=False, default=0.0)
+    vo2_n = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)  # Report score (ai_insights["score"])
+    score_n = Column(Integer, nullable=False, default=0)
@@ -1,5 +1,6 @@
+from datetime import date, datetime
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 # === UPDATED INPUTS ===
 class MechanicsInput(BaseModel):
@@ -26,5 +27,137 @@ class AnalysisResponse(BaseModel):
     user_id: int
     report_type: str
     score: int
-    alerts: List[str]
-    recommendations: List[str]
\ No newline at end of file
+    codes: List[str] = []                            # Fired rule ids, see GET /codes
+    alerts: Optional[List[str]] = None               # Omitted with ?compact=true
+    recommendations: Optional[List[str]] = None
+
+class CodeText(BaseModel):
+    alert: str
+    recommendation: str
+    points: int
+
+class CodeCatalogueResponse(BaseModel):
+    locale: Optional[str] = None
+    profiles: Dict[str, Dict[str, CodeText]]         # report_type -> code -> texts
+
+# === SQUAD BATCH ANALYSIS ===
+class SquadAthleteInput(BaseModel):
+    user_id: int
+    data: AnalysisInput
+
+class SquadAnalysisInput(BaseModel):
+    athletes: List[SquadAthleteInput]
+
+class SquadAnalysisResponse(BaseModel):
+    reports: List[AnalysisResponse]
+
+# === MULTI-ATHLETE VIDEO ===
+class PlayerResult(BaseModel):
+    track_id: int
+    first_frame: int
+    last_frame: int
+    frames_seen: int
+    centre: List[float]                      # Mean box centre in pixels, to tell players apart
+    valgus: float
+    hip_rotation: str
+    foot_strike: str
+    head_forward_angle: float
+    trunk_lean: float
+    shin_angle: float
+    hip_ratio: float
+    bilateral: dict
+    gait: dict
+    user_id: Optional[int] = None            # Only when athlete_ids were sent
+    report: Optional[AnalysisResponse] = None
+
+class PlayersAnalysisResponse(BaseModel):
+    frames: dict
+    players: List[PlayerResult]
+
+# === WEARABLE BULK INGESTION ===
+class BiometricRow(BaseModel):
+    user_id: Optional[int] = None      # Defaults to the caller; coaches may target their squad
+    timestamp: Optional[datetime] = None
+    steps: Optional[int] = None        # Missing = not measured (doesn't count as 0 in the step averages)
+    sleep_hours: Optional[float] = None
+    vo2_max: Optional[float] = None
+    acwr_ratio: Optional[float] = None
+    training_load: Optional[float] = None
+
+class BulkBiometricsInput(BaseModel):
+    rows: List[BiometricRow]
+
+class BulkInsertResponse(BaseModel):
+    inserted: int
+
+# === WORKLOAD ===
+class AthleteWorkload(BaseModel):
+    user_id: int
+    full_name: Optional[str] = None
+    acwr: Optional[float] = None       # None until there are 28 days of history
+    acute_load: float
+    chronic_load: float
+
+class SquadWorkloadResponse(BaseModel):
+    organization_id: int
+    as_of: date
+    method: str
+    athletes: List[AthleteWorkload]
+
+# === HISTORY (ROLLUPS) ===
+class HistoryMetrics(BaseModel):
+    logs: int
+    steps: Optional[float] = None          # Means per log that had the value
+    sleep_hours: Optional[float] = None
+    training_load: Optional[float] = None
+    training_load_total: float = 0.0
+    acwr: Optional[float] = None
+    acwr_max: Optional[float] = None
+    vo2_max: Optional[float] = None
+    score: Optional[float] = None          # Report score (ai_insights)
+
+class HistoryPoint(HistoryMetrics):
+    start: date                            # Bucket start (raw: day of the log)
+    timestamp: Optional[datetime] = None   # Raw resolution only
+
+class HistoryResponse(BaseModel):
+    scope: str                             # "user" | "org"
+    scope_id: int
+    resolution: str                        # "day" | "week" | "raw"
+    bucket_days: int                       # Days per point (0 = raw logs)
+    points: List[HistoryPoint]
+    next_cursor: Optional[str] = None      # Pass back as ?cursor= for the next page
+
+class AthleteSummary(HistoryMetrics):
+    user_id: int
+    full_name: Optional[str] = None
+
+class TeamSummaryResponse(BaseModel):
+    organization_id: int
+    start: date
+    end: date
+    athletes: List[AthleteSummary]
+    next_cursor: Optional[str] = None
+
+# === BACKGROUND JOBS ===
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+class RescoreSubmitResponse(BaseModel):
+    tracks: int
+    job_ids: List[str]
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str  # PENDING / STARTED / SUCCESS / FAILURE
+    report: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+
+class CacheStatsResponse(BaseModel):
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    hit_rate: float
+    memory_entries: int
+    disk_entries: Optional[int] = None
@@ -1,77 +1,54 @@
+from typing import List, Optional
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.risk_rules import rule_engine
 from app.models.user import User
-from app.schemas.analytics import AnalysisInput
+from app.schemas.analytics import AnalysisInput, MechanicsInput, LoadInput
 
 class AnalysisService:
     
-    async def process_metrics(self, user: User, data: AnalysisInput):
+    async def load_tiers(self, db: AsyncSession, users: List[User]):
+        """Looks up the organization tiers the rules need on the request's session (usually nothing to do)."""
+        if rule_engine.missing_tiers(user.organization_id for user in users):
+            await db.run_sync(rule_engine.load_tiers, [user.organization_id for user in users])
+
+    async def process_metrics(self, user: User, data: AnalysisInput, locale: Optional[str] = None):
         """
         Master function: Routes to the correct analysis engine based on Role.
         """
-        if user.role == "athlete" or user.role == "coach":
-            return self._analyze_pro_athlete(user, data)
-        else:
-            return self._analyze_common_user(user, data)
-
-    def _analyze_pro_athlete(self, user, data):
-        # === B2B LOGIC: High Performance & Injury Risk ===
-        risk_score = 0
-        alerts = []
-        rehab_plan = []
-
-        # 1. Check Workload (ACWR)
-        if data.load_metrics and data.load_metrics.acwr > 1.3:
-            risk_score += 40
-            alerts.append("CRITICAL: ACWR > 1.3 (High Injury Risk)")
-            rehab_plan.append("Reduce training load by 40% immediately.")
-
-        # 2. Check Mechanics (Knee Valgus)
-        if data.mechanics and data.mechanics.knee_valgus_angle > 15:
-            risk_score += 30
-            alerts.append("Biomechanics: Hazardous Knee Valgus detected")
-            rehab_plan.append("Rx: Banded Clamshells & Glute Bridges")
-
-        # 3. Check Hip Rotation (NEW)
-        if data.mechanics and data.mechanics.hip_internal_rotation == "Excessive Internal Rotation":
-            risk_score += 25
-            alerts.append("Hip Mechanics: Lack of external rotator control")
-            rehab_plan.append("Rx: Monster Walks (Band around knees)")
-
-        # 4. Check Foot Strike (NEW)
-        if data.mechanics and data.mechanics.foot_strike_pattern == "Heel Strike (Overstride)":
-            risk_score += 15
-            alerts.append("Running Form: Overstriding detected (High Braking Force)")
-            rehab_plan.append("Rx: Increase Cadence by 5% to fix landing")
-
-        return {
-            "user_id": user.id,
-            "report_type": "B2B_ATHLETE_ADVANCED",
-            "score": min(risk_score, 100), # 0-100 Risk Scale
-            "alerts": alerts,
-            "recommendations": rehab_plan
-        }
+        return self.build_report(user, data, locale)
 
-    def _analyze_common_user(self, user, data):
-        # === B2C LOGIC: Wellness & Lifestyle ===
-        wellness_score = 100
-        tips = []
-        exercises = []
-
-        # 1. Posture Check
-        if data.mechanics and data.mechanics.head_forward_angle > 20:
-            wellness_score -= 15
-            tips.append("Detected 'Text Neck' posture.")
-            exercises.append("Do Chin Tucks: 3 sets of 10")
-
-        # 2. Pain Check
-        if data.daily_stats and "Lower Back" in data.daily_stats.pain_areas:
-            wellness_score -= 20
-            tips.append("Lower back pain reported.")
-            exercises.append("Do Cat-Cow Stretches")
-
-        return {
-            "user_id": user.id,
-            "report_type": "B2C_WELLNESS_REPORT",
-            "score": wellness_score, # 0-100 Health Scale
-            "alerts": tips,
-            "recommendations": exercises
-        }
\ No newline at end of file
+    def build_report(self, user: User, data: AnalysisInput, locale: Optional[str] = None):
+        """
+        Sync entry point (used by the Celery worker, which has no event loop).
+        The role picks the report profile (B2B risk / B2C wellness) and the
+        user's organization picks the rule set (see app/core/risk_rules.py).
+        Alerts/recommendations come in `locale` where the rules have it;
+        "codes" (the fired rule ids) are the same in every language.
+        """
+        return rule_engine.evaluate(user, data, locale)
+
+    @staticmethod
+    def input_from_vision(vision_results: dict) -> AnalysisInput:
+        """Maps VisionEngine output onto the Digital Twin input schema."""
+        return AnalysisInput(
+            mechanics=MechanicsInput(
+                knee_valgus_angle=vision_results["valgus"],
+                hip_internal_rotation=vision_results["hip_rotation"],
+                foot_strike_pattern=vision_results["foot_strike"],
+                head_forward_angle=vision_results["head_forward_angle"]
+            ),
+            load_metrics=LoadInput(acwr=1.0) # Default load
+        )
+
+    # === SQUAD BATCH ===
+
+    def build_reports(self, users: List[User], inputs: List[AnalysisInput], acwr: Optional[np.ndarray] = None,
+                      locale: Optional[str] = None):
+        """
+        Evaluates many athletes at once: inputs are turned into columns and
+        every rule is one vectorized comparison over the whole squad.
+        `acwr` (optional, NaN = unknown) overrides the client-supplied values.
+        Produces exactly what build_report() would for each user.
+        """
+        return rule_engine.evaluate_batch(users, inputs, {"acwr": acwr} if acwr is not None else None, locale)
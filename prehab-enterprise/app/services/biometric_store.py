@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.metrics import BiometricLog, KeypointTrack
+from app.models.user import User
+from app.schemas.analytics import AnalysisInput
+from app.services import rollups
+
+
+def save_report(db: Session, user: User, data: Optional[AnalysisInput], report: dict,
+                track: Optional[KeypointTrack] = None) -> BiometricLog:
+    """
+    Stores one Digital Twin report (plus the inputs that produced it) in BiometricLog.
+    `track` (TrackStore.store) links the clip's stored keypoints in the same transaction.
+    """
+    user_id = user.id
+    log = BiometricLog(user_id=user_id, timestamp=datetime.now(timezone.utc), ai_insights=report)
+    if data is not None:
+        if data.load_metrics is not None:
+            log.acwr_ratio = data.load_metrics.acwr
+        if data.daily_stats is not None:
+            log.steps = data.daily_stats.steps
+    db.add(log)
+    if track is not None:
+        track.user_id = user_id
+        track.biometric_log = log
+        db.add(track)
+    rollups.apply(db, [{
+        "user_id": user_id, "timestamp": log.timestamp, "ai_insights": report,
+        "acwr_ratio": log.acwr_ratio, "steps": log.steps,
+    }], {user_id: user.organization_id})
+    db.commit()
+    return log
+
+
+def save_reports(db: Session, organization_id: int, reports: List[dict], acwr: List[Optional[float]]) -> int:
+    """Batch version of save_report() for squad analysis (every athlete is in `organization_id`)."""
+    rows = [
+        {"user_id": report["user_id"], "timestamp": None, "ai_insights": report, "acwr_ratio": value}
+        for report, value in zip(reports, acwr)
+    ]
+    return bulk_insert(db, rows, {row["user_id"]: organization_id for row in rows})
+
+
+def bulk_insert(db: Session, rows: List[dict], organizations: Optional[Dict[int, Optional[int]]] = None) -> int:
+    """
+    Inserts wearable rows with one executemany per batch instead of per-row
+    ORM adds. Every row must have the same keys (see BiometricRow). The
+    rollups are updated in the same transaction; `organizations` (user_id ->
+    organization_id, see rollups.apply) spares them the users lookup.
+    """
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        if row.get("timestamp") is None:
+            row["timestamp"] = now
+
+    batch_size = settings.BULK_INSERT_BATCH_SIZE
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        db.execute(insert(BiometricLog), batch)
+        rollups.apply(db, batch, organizations)
+    db.commit()
+    return len(rows)
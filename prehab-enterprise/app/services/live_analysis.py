@@ -0,0 +1,97 @@
+import asyncio
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.biomechanics import METRICS
+from app.core.gait import GaitTracker, window_summary
+from app.core.vision_engine import VisionEngine
+
+# (frame_index, received_at, encoded image bytes)
+PendingFrame = Tuple[int, float, bytes]
+
+
+class LiveSession:
+    """
+    One live camera feed. The WebSocket reader push()es encoded frames as fast
+    as they arrive; a single consumer takes them in batches. At most
+    `max_pending` frames wait: when the model falls behind, the oldest are
+    dropped so latency stays bounded instead of growing with the backlog.
+    """
+
+    def __init__(self, engine: VisionEngine, fps: float, max_pending: Optional[int] = None,
+                 window_seconds: Optional[float] = None):
+        self.engine = engine
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.tracker = GaitTracker(self.fps)
+        self.max_pending = max_pending or settings.LIVE_MAX_PENDING_FRAMES
+        self.window_frames = int((window_seconds or settings.LIVE_WINDOW_SECONDS) * self.fps)
+        self.received = 0
+        self.dropped = 0
+        self.processed = 0
+        self.decoded = 0
+        self.with_pose = 0
+        self._pending: deque = deque()
+        self._arrived = asyncio.Event()
+        self._window: deque = deque() # (frame_index, values row, weights row) of the last window_frames
+
+    def push(self, data: bytes):
+        self.received += 1
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append((self.received, time.perf_counter(), data))
+        self._arrived.set()
+
+    async def next_batch(self, batch_size: int) -> List[PendingFrame]:
+        await self._arrived.wait()
+        batch = [self._pending.popleft() for _ in range(min(batch_size, len(self._pending)))]
+        if not self._pending:
+            self._arrived.clear()
+        return batch
+
+    def process(self, batch: List[PendingFrame]) -> dict:
+        """Decode + pose + temporal stage for one batch (blocking, run it off the event loop)."""
+        import cv2
+
+        frames = []
+        for frame_index, _, data in batch:
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append((frame_index, frame))
+        self.processed += len(batch)
+        self.decoded += len(frames)
+
+        if frames:
+            indices, kpts = self.engine._infer_batch(frames)
+            self.with_pose += len(indices)
+            joint = self.tracker.update(indices, np.stack(kpts)) if indices else None
+            if joint is not None:
+                self._window.extend(zip(indices, joint["values"], joint["weights"]))
+
+        # Rolling window: the last LIVE_WINDOW_SECONDS of the feed
+        newest = batch[-1][0]
+        while self._window and self._window[0][0] <= newest - self.window_frames:
+            self._window.popleft()
+        return self.rolling()
+
+    def rolling(self) -> dict:
+        if self._window:
+            values = np.array([row for _, row, _ in self._window])
+            weights = np.array([w for _, _, w in self._window])
+        else:
+            values = weights = np.empty((0, len(METRICS)))
+        report = VisionEngine.score_metrics(window_summary(values, weights))
+        report["stride_count"] = self.tracker.stride_count
+        report["last_stride"] = self.tracker.strides[-1] if self.tracker.strides else None
+        return report
+
+    def session_summary(self) -> dict:
+        """Whole-session report, same shape as VisionEngine.analyze_video()."""
+        extracted = {
+            "summary": self.tracker.summary(),
+            "frames": {"total": self.received, "decoded": self.decoded, "inferred": self.decoded,
+                       "with_pose": self.with_pose, "dropped": self.dropped, "sampling": "live"},
+        }
+        return VisionEngine.score_extracted(extracted)
@@ -0,0 +1,175 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+
+# Running totals for the disk tier, kept by triggers so every worker sharing the
+# file sees the same numbers without a SUM()/COUNT() scan
+_DISK_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS vision_results ("
+    " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+    " size INTEGER NOT NULL, last_access REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_vision_results_access ON vision_results (last_access)",
+    "CREATE TABLE IF NOT EXISTS vision_results_usage ("
+    " id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)",
+    # Seeds the totals once for a file written before they existed
+    "INSERT OR IGNORE INTO vision_results_usage (id, entries, bytes)"
+    " SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM vision_results",
+    "CREATE TRIGGER IF NOT EXISTS vision_results_ins AFTER INSERT ON vision_results BEGIN"
+    " UPDATE vision_results_usage SET entries = entries + 1, bytes = bytes + new.size; END",
+    "CREATE TRIGGER IF NOT EXISTS vision_results_upd AFTER UPDATE OF size ON vision_results BEGIN"
+    " UPDATE vision_results_usage SET bytes = bytes + new.size - old.size; END",
+    "CREATE TRIGGER IF NOT EXISTS vision_results_del AFTER DELETE ON vision_results BEGIN"
+    " UPDATE vision_results_usage SET entries = entries - 1, bytes = bytes - old.size; END",
+)
+
+
+class VisionResultCache:
+    """
+    Two-tier cache of VisionEngine results, keyed by content hash + model version.
+
+    Tier 1: in-process LRU (bounded by entry count).
+    Tier 2: optional SQLite file shared by every worker on the host,
+            evicted least-recently-used once it grows past max_disk_mb.
+
+    get()/put() block on SQLite; async handlers use aget()/aput(), which
+    answer from memory inline and send the disk tier to the threadpool.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None, max_disk_mb: int = 256):
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        self._memory = OrderedDict()
+        self._lock = threading.Lock() # Memory tier + counters
+        self._db_lock = threading.Lock() # SQLite connection (never held with _lock)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("BEGIN IMMEDIATE")
+            for statement in _DISK_SCHEMA:
+                self._db.execute(statement)
+            self._db.execute("COMMIT")
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_entries=settings.VISION_CACHE_MAX_ENTRIES,
+            path=settings.VISION_CACHE_PATH,
+            max_disk_mb=settings.VISION_CACHE_DISK_MAX_MB,
+        )
+
+    @staticmethod
+    def make_key(content_hash: str, version: str) -> str:
+        return f"{content_hash}:{version}"
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self._get_memory(key)
+        if value is not None or self._db is None:
+            return value
+        return self._get_disk(key)
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._remember(key, value)
+        if self._db is not None:
+            self._put_disk(key, value)
+
+    async def aget(self, key: str) -> Optional[dict]:
+        value = self._get_memory(key)
+        if value is not None or self._db is None:
+            return value
+        return await run_in_threadpool(self._get_disk, key)
+
+    async def aput(self, key: str, value: dict):
+        with self._lock:
+            self._remember(key, value)
+        if self._db is not None:
+            await run_in_threadpool(self._put_disk, key, value)
+
+    # --- Memory tier ---
+
+    def _get_memory(self, key: str) -> Optional[dict]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(self._memory[key])
+            if self._db is None:
+                self.misses += 1
+            return None
+
+    def _remember(self, key: str, value: dict):
+        self._memory[key] = dict(value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # --- Disk tier (blocking) ---
+
+    def _get_disk(self, key: str) -> Optional[dict]:
+        # 1. Look up and touch the row
+        with self._db_lock:
+            row = self._db.execute("SELECT value FROM vision_results WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._db.execute("UPDATE vision_results SET last_access = ? WHERE key = ?", (time.time(), key))
+        # 2. Promote hits into memory
+        with self._lock:
+            if not row:
+                self.misses += 1
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value)
+            self.disk_hits += 1
+            return dict(value)
+
+    def _put_disk(self, key: str, value: dict):
+        payload = json.dumps(value)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO vision_results (key, value, size, last_access) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size,"
+                " last_access = excluded.last_access",
+                (key, payload, len(payload), time.time()),
+            )
+            self._evict_disk()
+
+    def _evict_disk(self):
+        total = self._db.execute("SELECT bytes FROM vision_results_usage").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Walk oldest-first and drop rows until we are back under budget
+        excess = total - self.max_disk_bytes
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM vision_results ORDER BY last_access"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM vision_results WHERE key = ?", doomed)
+
+    def stats(self) -> dict:
+        disk_entries = None
+        if self._db is not None:
+            with self._db_lock:
+                disk_entries = self._db.execute("SELECT entries FROM vision_results_usage").fetchone()[0]
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
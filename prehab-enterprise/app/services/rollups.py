@@ -0,0 +1,370 @@
+import base64
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, bindparam, func, or_, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.metrics import BiometricLog, BiometricRollup
+from app.models.user import User
+
+PERIODS = {"day": 1, "week": 7}
+# API metric -> (sum column, count column, BiometricLog column; None = ai_insights["score"])
+METRICS = {
+    "steps": ("steps_sum", "steps_n", "steps"),
+    "sleep_hours": ("sleep_sum", "sleep_n", "sleep_hours"),
+    "training_load": ("load_sum", "load_n", "training_load"),
+    "acwr": ("acwr_sum", "acwr_n", "acwr_ratio"),
+    "vo2_max": ("vo2_sum", "vo2_n", "vo2_max"),
+    "score": ("score_sum", "score_n", None),
+}
+SUM_COLUMNS = ["logs"] + [column for sum_col, n_col, _ in METRICS.values() for column in (sum_col, n_col)]
+BUCKET_KEY = ("scope", "scope_id", "period", "period_start")
+
+
+def utc_day(timestamp: datetime) -> date:
+    """Naive timestamps are taken as UTC (that's what the server default stores)."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+def period_start(day: date, period: str) -> date:
+    return day - timedelta(days=day.weekday()) if period == "week" else day
+
+
+# === 1. WRITE PATH ===
+
+def _contribution(row: dict) -> dict:
+    """What one BiometricLog row adds to every bucket it falls in."""
+    insights = row.get("ai_insights")
+    values = {"logs": 1, "acwr_max": row.get("acwr_ratio")}
+    for sum_col, n_col, key in METRICS.values():
+        value = row.get(key) if key else (insights.get("score") if isinstance(insights, dict) else None)
+        values[sum_col] = float(value) if value is not None else 0.0
+        values[n_col] = int(value is not None)
+    return values
+
+
+def _merge(bucket: dict, values: dict):
+    for column in SUM_COLUMNS:
+        bucket[column] += values[column]
+    if values["acwr_max"] is not None and (bucket["acwr_max"] is None or values["acwr_max"] > bucket["acwr_max"]):
+        bucket["acwr_max"] = values["acwr_max"]
+
+
+def _organizations(db: Session, user_ids, known: Optional[Dict[int, Optional[int]]] = None) -> Dict[int, Optional[int]]:
+    """user_id -> organization_id: `known` as given, one query for the rest."""
+    orgs = dict(known or {})
+    unknown = set(user_ids) - orgs.keys()
+    if unknown:
+        orgs.update(db.query(User.id, User.organization_id).filter(User.id.in_(unknown)).all())
+    return orgs
+
+
+def apply(db: Session, rows: List[dict], organizations: Optional[Dict[int, Optional[int]]] = None):
+    """
+    Folds newly inserted BiometricLog rows (dicts with user_id, timestamp and
+    the metric columns) into the daily/weekly user and organization rollups,
+    inside the caller's transaction. Rows are pre-aggregated per bucket, so
+    a batch costs one upsert per touched bucket, not one per row.
+    `organizations` (user_id -> organization_id) saves the lookup for users
+    the caller has already loaded.
+    """
+    if not rows:
+        return
+    orgs = _organizations(db, {row["user_id"] for row in rows}, organizations)
+
+    buckets: Dict[tuple, dict] = {}
+    for row in rows:
+        values = _contribution(row)
+        day = utc_day(row["timestamp"])
+        scopes = [("user", row["user_id"])]
+        if orgs.get(row["user_id"]) is not None:
+            scopes.append(("org", orgs[row["user_id"]]))
+        for scope, scope_id in scopes:
+            for period in PERIODS:
+                key = (scope, scope_id, period, period_start(day, period))
+                if key in buckets:
+                    _merge(buckets[key], values)
+                else:
+                    buckets[key] = dict(values)
+    _upsert(db, buckets)
+
+
+def adjust_scores(db: Session, changes: List[Tuple[int, datetime, Optional[float], Optional[float]]]):
+    """Re-scored reports: (user_id, log timestamp, old score, new score) -> score sums/counts moved accordingly."""
+    rows = []
+    for user_id, timestamp, old, new in changes:
+        if old == new:
+            continue
+        delta = {column: 0 for column in SUM_COLUMNS}
+        delta["score_sum"] = (new or 0.0) - (old or 0.0)
+        delta["score_n"] = int(new is not None) - int(old is not None)
+        rows.append((user_id, timestamp, delta))
+    if not rows:
+        return
+    orgs = _organizations(db, {r[0] for r in rows})
+    buckets: Dict[tuple, dict] = {}
+    for user_id, timestamp, delta in rows:
+        day = utc_day(timestamp)
+        scopes = [("user", user_id)] + ([("org", orgs[user_id])] if orgs.get(user_id) is not None else [])
+        for scope, scope_id in scopes:
+            for period in PERIODS:
+                key = (scope, scope_id, period, period_start(day, period))
+                bucket = buckets.setdefault(key, {**{column: 0 for column in SUM_COLUMNS}, "acwr_max": None})
+                _merge(bucket, {**delta, "acwr_max": None})
+    _upsert(db, buckets)
+
+
+def _upsert(db: Session, buckets: Dict[tuple, dict]):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        greatest = func.greatest
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        greatest = func.max # Scalar max(a, b) in SQLite
+    else:
+        raise ValueError(f"Rollups need INSERT .. ON CONFLICT (PostgreSQL / SQLite), not {dialect}")
+
+    table = BiometricRollup.__table__
+    stmt = insert(table)
+    new = stmt.excluded
+    updates = {column: table.c[column] + new[column] for column in SUM_COLUMNS}
+    # NULL-safe max (SQLite's max() is NULL if either side is)
+    updates["acwr_max"] = greatest(
+        func.coalesce(table.c.acwr_max, new.acwr_max), func.coalesce(new.acwr_max, table.c.acwr_max),
+    )
+    stmt = stmt.on_conflict_do_update(index_elements=list(BUCKET_KEY), set_=updates)
+    # Sorted keys: concurrent writers lock buckets in the same order (no deadlocks on PostgreSQL)
+    records = [dict(zip(BUCKET_KEY, key), **values) for key, values in sorted(buckets.items())]
+    db.execute(stmt, records)
+
+
+def rebuild(db: Session, batch_size: int = 10000) -> int:
+    """Recomputes every rollup from biometric_logs (backfill after deploying, or repair). Returns rows read."""
+    db.query(BiometricRollup).delete()
+    columns = [BiometricLog.id, BiometricLog.user_id, BiometricLog.timestamp, BiometricLog.ai_insights]
+    columns += [getattr(BiometricLog, key) for _, _, key in METRICS.values() if key]
+    total, last_id = 0, 0
+    while True:
+        rows = db.execute(
+            select(*columns).where(BiometricLog.id > last_id).order_by(BiometricLog.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        apply(db, [dict(row) for row in rows if row["timestamp"] is not None and row["user_id"] is not None])
+        total += len(rows)
+    db.commit()
+    return total
+
+
+# === 2. READ PATH ===
+
+# Built once: these run on every dashboard refresh, and constructing a select
+# with a dozen aggregates costs more than SQLite takes to answer it
+_table = BiometricRollup.__table__
+_SERIES_QUERY = (
+    select(_table.c.period_start, _table.c.acwr_max, *[_table.c[column] for column in SUM_COLUMNS])
+    .where(
+        _table.c.scope == bindparam("scope"),
+        _table.c.scope_id == bindparam("scope_id"),
+        _table.c.period == bindparam("period"),
+        _table.c.period_start >= bindparam("first"),
+        _table.c.period_start <= bindparam("last"),
+    )
+    .order_by(_table.c.period_start)
+)
+_TEAM_QUERY = (
+    select(_table.c.scope_id, func.max(_table.c.acwr_max).label("acwr_max"),
+           *[func.sum(_table.c[column]).label(column) for column in SUM_COLUMNS])
+    .where(
+        _table.c.scope == "user",
+        _table.c.scope_id.in_(bindparam("user_ids", expanding=True)),
+        _table.c.period == bindparam("period"),
+        _table.c.period_start >= bindparam("first"),
+        _table.c.period_start <= bindparam("last"),
+    )
+    .group_by(_table.c.scope_id)
+)
+
+def resolution_for(start: date, end: date, max_points: int) -> Tuple[str, int]:
+    """Finest (period, bucket_days) that covers [start, end] in at most max_points buckets."""
+    days = (end - start).days + 1
+    if days <= max_points:
+        return "day", 1
+    weeks = math.ceil(days / 7)
+    return "week", 7 * max(1, math.ceil(weeks / max_points))
+
+
+def _point(start: date, sums: dict) -> dict:
+    point = {"start": start, "logs": int(sums["logs"])}
+    for name, (sum_col, n_col, _) in METRICS.items():
+        point[name] = sums[sum_col] / sums[n_col] if sums[n_col] else None
+    point["training_load_total"] = sums["load_sum"]
+    point["acwr_max"] = sums["acwr_max"]
+    return point
+
+
+def read_series(db: Session, scope: str, scope_id: int, start: date, end: date, resolution: str = "auto",
+                max_points: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None) -> dict:
+    """
+    One user's or organization's history between two dates (inclusive),
+    from the rollups only. "day"/"week" return those buckets as stored;
+    "auto" picks the finest that fits in max_points, merging whole weeks if
+    even weeks are too many. Week buckets are whole ISO weeks, so the first
+    and last ones can reach past `start` / `end`.
+
+    Pagination is keyset on time: a page covers `limit` buckets from the
+    cursor (a bucket start date), read with one index range scan. Empty
+    buckets are left out; next_cursor is None on the last page.
+    """
+    max_points = max_points or settings.HISTORY_MAX_POINTS
+    limit = limit or settings.HISTORY_PAGE_SIZE
+    if resolution == "auto":
+        period, bucket_days = resolution_for(start, end, max_points)
+    elif resolution in PERIODS:
+        period, bucket_days = resolution, PERIODS[resolution]
+    else:
+        raise ValueError("resolution must be 'auto', 'day', 'week' or 'raw'")
+
+    origin = period_start(start, period)
+    page_start = date.fromisoformat(cursor) if cursor else origin
+    if page_start < origin or (page_start - origin).days % bucket_days:
+        raise ValueError("cursor does not belong to this query")
+    page_end = page_start + timedelta(days=bucket_days * limit) # Exclusive
+
+    rows = db.execute(_SERIES_QUERY, {
+        "scope": scope, "scope_id": scope_id, "period": period,
+        "first": page_start, "last": min(page_end - timedelta(days=1), end),
+    }).mappings().all()
+
+    # Merge stored buckets into the requested bucket size
+    points, current, current_start = [], None, None
+    for row in rows:
+        bucket_start = origin + timedelta(days=(row["period_start"] - origin).days // bucket_days * bucket_days)
+        if bucket_start != current_start:
+            if current is not None:
+                points.append(_point(current_start, current))
+            current, current_start = dict(row), bucket_start
+        else:
+            _merge(current, row)
+    if current is not None:
+        points.append(_point(current_start, current))
+
+    return {
+        "scope": scope,
+        "scope_id": scope_id,
+        "resolution": period,
+        "bucket_days": bucket_days,
+        "points": points,
+        "next_cursor": page_end.isoformat() if page_end <= end else None,
+    }
+
+
+def read_raw(db: Session, user_id: int, start: date, end: date, limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> dict:
+    """
+    Individual logs of one user (drill-down), keyset-paginated on
+    (timestamp, id) over the (user_id, timestamp) index.
+    """
+    limit = limit or settings.HISTORY_PAGE_SIZE
+    query = select(BiometricLog).where(
+        BiometricLog.user_id == user_id,
+        BiometricLog.timestamp >= datetime.combine(start, datetime.min.time()),
+        BiometricLog.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+    )
+    if cursor:
+        last_timestamp, last_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            BiometricLog.timestamp > last_timestamp,
+            and_(BiometricLog.timestamp == last_timestamp, BiometricLog.id > last_id),
+        ))
+    logs = db.execute(query.order_by(BiometricLog.timestamp, BiometricLog.id).limit(limit)).scalars().all()
+
+    points = []
+    for log in logs:
+        point = {"start": utc_day(log.timestamp), "timestamp": log.timestamp, "logs": 1}
+        insights = log.ai_insights if isinstance(log.ai_insights, dict) else {}
+        for name, (_, _, key) in METRICS.items():
+            point[name] = getattr(log, key) if key else insights.get("score")
+        point["training_load_total"] = log.training_load or 0.0
+        point["acwr_max"] = log.acwr_ratio
+        points.append(point)
+    next_cursor = _encode_cursor(logs[-1].timestamp, logs[-1].id) if len(logs) == limit else None
+    return {"scope": "user", "scope_id": user_id, "resolution": "raw", "bucket_days": 0,
+            "points": points, "next_cursor": next_cursor}
+
+
+def _encode_cursor(timestamp: datetime, log_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{log_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def covering_buckets(start: date, end: date) -> list:
+    """
+    Fewest stored buckets that add up to exactly [start, end]: whole ISO weeks
+    from the weekly rollups, the leftover days at either end from the daily
+    ones. Returns (period, first bucket start, last bucket start) ranges.
+    """
+    first_monday = period_start(start + timedelta(days=6), "week")
+    last_monday = period_start(end + timedelta(days=1), "week") - timedelta(days=7) # Last week ending <= end
+    if first_monday > last_monday:
+        return [("day", start, end)]
+    ranges = [("week", first_monday, last_monday)]
+    if start < first_monday:
+        ranges.append(("day", start, first_monday - timedelta(days=1)))
+    if last_monday + timedelta(days=6) < end:
+        ranges.append(("day", last_monday + timedelta(days=7), end))
+    return ranges
+
+
+def read_team(db: Session, organization_id: int, start: date, end: date, limit: Optional[int] = None,
+              after_id: Optional[int] = None) -> dict:
+    """
+    Per-athlete aggregates over [start, end] for one page of an organization
+    (keyset on user id): one query for the page's users, then GROUP BYs over
+    the week/day rollups that cover the range.
+    """
+    limit = limit or settings.HISTORY_PAGE_SIZE
+    users = (
+        db.query(User.id, User.full_name)
+        .filter(User.organization_id == organization_id, User.id > (after_id or 0))
+        .order_by(User.id)
+        .limit(limit)
+        .all()
+    )
+    sums: Dict[int, dict] = {}
+    user_ids = [user_id for user_id, _ in users]
+    # One index range scan per covering range (an OR of them defeats the index in SQLite)
+    for period, first, last in covering_buckets(start, end) if users else []:
+        rows = db.execute(_TEAM_QUERY, {"user_ids": user_ids, "period": period, "first": first, "last": last}).mappings().all()
+        for row in rows:
+            if row["scope_id"] in sums:
+                _merge(sums[row["scope_id"]], row)
+            else:
+                sums[row["scope_id"]] = dict(row)
+
+    empty = {**{column: 0 for column in SUM_COLUMNS}, "acwr_max": None}
+    athletes = [
+        {"user_id": user_id, "full_name": full_name, **_point(start, sums.get(user_id, empty))}
+        for user_id, full_name in users
+    ]
+    for athlete in athletes:
+        del athlete["start"]
+    return {
+        "organization_id": organization_id,
+        "start": start,
+        "end": end,
+        "athletes": athletes,
+        "next_cursor": str(users[-1][0]) if len(users) == limit else None,
+    }
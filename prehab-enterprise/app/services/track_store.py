@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.risk_rules import rule_engine
+from app.core.vision_engine import VisionEngine
+from app.models.metrics import BiometricLog, KeypointTrack
+from app.models.user import User
+from app.schemas.analytics import LoadInput
+from app.services import rollups
+from app.services.analysis_service import AnalysisService
+
+
+class StoredTrack(NamedTuple):
+    frames: np.ndarray     # int32 (N,) frame index of each row
+    keypoints: np.ndarray  # float32 (N, 17, 3) x, y (frame pixels), confidence of the first person
+    meta: dict             # fps, original frame counters, extractor version
+
+
+class TrackStore:
+    """
+    Raw keypoints of analyzed clips on disk, one directory per (video
+    content, extractor version, storage format):
+
+        <root>/ab/<sha256>-<digest>/frames.npy     int32 (N,)
+                                   /keypoints.npy  float32 (N, 17, 3)
+                                   /meta.json
+
+    Plain .npy files, so re-scoring opens them as memory maps and only pages
+    in what it reads. Re-uploads of the same clip share one directory.
+    Keypoints are float32: float16 keeps ~11 significant bits whatever the
+    scale, i.e. 1-2 px steps at 1080p/4K, which moved shin angles by degrees.
+    (Tracks written as float16 before FORMAT still load; rows keep their path.)
+    """
+
+    FORMAT = "f32" # Part of the key, so re-uploads of float16-era clips get float32 files
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @classmethod
+    def from_settings(cls) -> Optional["TrackStore"]:
+        return cls(settings.TRACK_STORE_DIR) if settings.TRACK_STORE_DIR else None
+
+    @staticmethod
+    def key(sha256: str, extractor_version: str) -> str:
+        digest = hashlib.sha1(f"{extractor_version}|{TrackStore.FORMAT}".encode()).hexdigest()[:12]
+        return f"{sha256[:2]}/{sha256}-{digest}"
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.root, key, "meta.json"))
+
+    def write(self, key: str, track: dict, frames: dict, extractor_version: str) -> bool:
+        """
+        Writes a track (extract_metrics' "track") once. The files are staged in
+        a sibling directory and renamed into place, so readers never see a
+        partial track. Returns False if the track was already stored.
+        """
+        target = os.path.join(self.root, key)
+        if self.exists(key):
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(target))
+        try:
+            np.save(os.path.join(staging, "frames.npy"), np.asarray(track["frames"], dtype=np.int32))
+            np.save(os.path.join(staging, "keypoints.npy"), np.asarray(track["keypoints"], dtype=np.float32))
+            with open(os.path.join(staging, "meta.json"), "w") as handle:
+                json.dump({"fps": track["fps"], "frames": frames, "extractor_version": extractor_version}, handle)
+            os.rename(staging, target)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not self.exists(key): # Lost the race to another worker storing the same clip = fine
+                raise
+            return False
+        return True
+
+    def open(self, key: str) -> StoredTrack:
+        directory = os.path.join(self.root, key)
+        with open(os.path.join(directory, "meta.json")) as handle:
+            meta = json.load(handle)
+        return StoredTrack(
+            frames=np.load(os.path.join(directory, "frames.npy"), mmap_mode="r"),
+            keypoints=np.load(os.path.join(directory, "keypoints.npy"), mmap_mode="r"),
+            meta=meta,
+        )
+
+    def store(self, sha256: str, extractor_version: str, vision_results: dict,
+              track: Optional[dict]) -> Optional[KeypointTrack]:
+        """
+        Writes the keypoints of a freshly analyzed clip (blocking file I/O, keep
+        it off the event loop) and returns the (unsaved) row that links them to
+        the report; see biometric_store.save_report. `track` is None on a
+        result-cache hit: an earlier upload's files are linked if they exist.
+        """
+        key = self.key(sha256, extractor_version)
+        if track is not None:
+            self.write(key, track, vision_results["frames"], extractor_version)
+        elif not self.exists(key):
+            return None
+        return KeypointTrack(
+            video_sha256=sha256,
+            extractor_version=extractor_version,
+            path=key,
+            frame_count=vision_results["frames"]["with_pose"],
+            scoring_version=VisionEngine.scoring_version(),
+        )
+
+
+# === RE-SCORING ===
+
+def rescore_tracks(db: Session, store: TrackStore, track_ids: Optional[List[int]] = None,
+                   user_id: Optional[int] = None, batch_size: Optional[int] = None) -> dict:
+    """
+    Recomputes the reports linked to stored tracks with the current
+    smoothing/metric/scoring code and risk rules, straight from the keypoints
+    (no video, no model), and overwrites BiometricLog.ai_insights. The ACWR
+    stored with each report is kept. Tracks are read in id order, one batch
+    (rules evaluated together, one commit) at a time.
+    """
+    analyzer = AnalysisService()
+    batch_size = batch_size or settings.RESCORE_BATCH_SIZE
+    version = VisionEngine.scoring_version()
+    query = (
+        db.query(KeypointTrack, BiometricLog, User)
+        .join(BiometricLog, KeypointTrack.biometric_log_id == BiometricLog.id)
+        .join(User, KeypointTrack.user_id == User.id)
+    )
+    if track_ids is not None:
+        query = query.filter(KeypointTrack.id.in_(track_ids))
+    if user_id is not None:
+        query = query.filter(KeypointTrack.user_id == user_id)
+
+    counts = {"rescored": 0, "changed": 0, "missing": 0}
+    last_id = 0
+    while True:
+        rows = query.filter(KeypointTrack.id > last_id).order_by(KeypointTrack.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1][0].id
+
+        # 1. Keypoints -> vision metrics -> Digital Twin input, per track
+        users, inputs, targets = [], [], []
+        for track, log, user in rows:
+            try:
+                stored = store.open(track.path)
+            except FileNotFoundError:
+                counts["missing"] += 1
+                continue
+            vision_results = VisionEngine.score_track(
+                stored.frames, stored.keypoints, stored.meta["fps"], stored.meta["frames"],
+            )
+            data = analyzer.input_from_vision(vision_results)
+            if log.acwr_ratio is not None:
+                data = data.model_copy(update={"load_metrics": LoadInput(acwr=log.acwr_ratio)})
+            users.append(user)
+            inputs.append(data)
+            targets.append((track, log))
+
+        # 2. Rules for the whole batch at once, then one commit (score rollups follow)
+        now = datetime.now(timezone.utc)
+        score_changes = []
+        rule_engine.load_tiers(db, [user.organization_id for user in users])
+        for (track, log), report in zip(targets, analyzer.build_reports(users, inputs)):
+            counts["changed"] += report != log.ai_insights
+            score_changes.append((log.user_id, log.timestamp, _score(log.ai_insights), _score(report)))
+            log.ai_insights = report
+            track.scoring_version = version
+            track.rescored_at = now
+        rollups.adjust_scores(db, score_changes)
+        db.commit()
+        counts["rescored"] += len(targets)
+    return counts
+
+
+def _score(report) -> Optional[float]:
+    return report.get("score") if isinstance(report, dict) else None
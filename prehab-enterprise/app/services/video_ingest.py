@@ -0,0 +1,305 @@
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import python_multipart
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+from app.core import metrics
+from app.core.config import settings
+
+CHUNK_SIZE = 1024 * 1024 # 1 MB
+MULTIPART_SLACK = 1024 * 1024 # Boundaries + form fields around the file in a multipart body
+MAX_FORM_FIELD = 64 * 1024 # Plain (non-file) form fields are kept in memory
+
+# Linux tmpfs: small clips never touch a physical disk, but cv2 still gets a real path
+MEMORY_DIR = "/dev/shm"
+
+
+class IngestedVideo:
+    """
+    A video that has been written exactly once to a unique temp file.
+    Use as a context manager so the file is always removed afterwards.
+    sha256 is computed while streaming, so content-addressed lookups
+    never need to re-read the file.
+    """
+
+    def __init__(self, path: str, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def cleanup(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+def _too_large():
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Video exceeds the {settings.MAX_UPLOAD_MB} MB upload limit",
+    )
+
+
+def _temp_dir(size_hint: Optional[int], directory: Optional[str]) -> str:
+    """tmpfs for small clips when it's writable and has room for them (Docker caps /dev/shm at 64 MB)."""
+    if directory is None:
+        small = size_hint is not None and size_hint <= settings.VIDEO_IN_MEMORY_MAX_MB * 1024 * 1024
+        if small and os.access(MEMORY_DIR, os.W_OK) and shutil.disk_usage(MEMORY_DIR).free > 2 * size_hint:
+            return MEMORY_DIR
+        directory = settings.VIDEO_TMP_DIR # None = system temp dir
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+class _TempVideo:
+    """
+    Collision-free temp file being written (blocking: run off the event loop).
+    If tmpfs fills up mid-write (other uploads got there first), what was
+    written so far moves to disk and the write carries on there.
+    """
+
+    def __init__(self, filename: Optional[str], size_hint: Optional[int], directory: Optional[str]):
+        self.suffix = os.path.splitext(os.path.basename(filename or ""))[1] or ".mp4"
+        self.fallback = None if directory is not None else settings.VIDEO_TMP_DIR
+        self.digest = hashlib.sha256()
+        self.written = 0
+        self._open(_temp_dir(size_hint, directory))
+
+    def _open(self, directory: Optional[str]):
+        fd, self.path = tempfile.mkstemp(prefix="prehab_", suffix=self.suffix, dir=directory)
+        self.in_memory = directory == MEMORY_DIR
+        self._file = os.fdopen(fd, "wb", buffering=0) # Unbuffered: ENOSPC shows up on the write that hit it
+
+    def write(self, chunk: bytes):
+        self.digest.update(chunk)
+        self.written += len(chunk)
+        view = memoryview(chunk)
+        while view:
+            try:
+                view = view[self._file.write(view):]
+            except OSError as exc:
+                if exc.errno != errno.ENOSPC or not self.in_memory:
+                    raise
+                self._spill()
+
+    def _spill(self):
+        memory_path, memory_file = self.path, self._file
+        if self.fallback:
+            os.makedirs(self.fallback, exist_ok=True)
+        self._open(self.fallback)
+        memory_file.close()
+        with open(memory_path, "rb") as source:
+            shutil.copyfileobj(source, self._file, CHUNK_SIZE)
+        os.remove(memory_path)
+
+    def finish(self) -> IngestedVideo:
+        self._file.close()
+        return IngestedVideo(self.path, self.written, self.digest.hexdigest())
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _MultipartForm:
+    """
+    Callbacks for python-multipart's push parser. The parser is sync, so they
+    only collect: the video part's bytes wait in `pending` until
+    ingest_multipart writes them in the threadpool, plain fields go to `fields`.
+    """
+
+    def __init__(self, file_field: str):
+        self.file_field = file_field
+        self.filename: Optional[str] = None # Set once the video part's headers are in
+        self.fields: Dict[str, List[str]] = {}
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+        self._header_name = self._header_value = self._disposition = b""
+        self._name = ""
+        self._data: Optional[bytearray] = None # None while inside the video part
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def take(self) -> bytes:
+        chunk = b"".join(self.pending)
+        self.pending, self.pending_size = [], 0
+        return chunk
+
+    def on_part_begin(self):
+        self._disposition = b""
+        self._data = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options:
+            if self._name != self.file_field or self.filename is not None:
+                raise HTTPException(status_code=400, detail=f"Expected a single file, in the '{self.file_field}' field")
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self._data = None
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._data is None:
+            self.pending.append(data[start:end])
+            self.pending_size += end - start
+        elif len(self._data) + end - start > MAX_FORM_FIELD:
+            raise HTTPException(status_code=400, detail=f"Form field '{self._name}' is too large")
+        else:
+            self._data += data[start:end]
+
+    def on_part_end(self):
+        if self._data is not None:
+            self.fields.setdefault(self._name, []).append(self._data.decode("utf-8", "replace"))
+
+
+async def ingest_multipart(
+    request: Request,
+    file_field: str = "file",
+    directory: Optional[str] = None,
+) -> Tuple[IngestedVideo, Dict[str, List[str]]]:
+    """
+    Parses a multipart/form-data body as it arrives and writes the video part
+    straight into a unique temp file, enforcing MAX_UPLOAD_MB. Unlike an
+    UploadFile parameter there is no SpooledTemporaryFile in between, so the
+    bytes hit storage once. Returns the video and the other form fields.
+    """
+    max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
+    length = request.headers.get("content-length", "")
+    size_hint = int(length) if length.isdigit() else None
+    if size_hint is not None and size_hint > max_bytes + MULTIPART_SLACK:
+        raise _too_large()
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    if b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    form = _MultipartForm(file_field)
+    parser = python_multipart.MultipartParser(params[b"boundary"], form.callbacks())
+    video = None
+    try:
+        with metrics.vision_stage_seconds.time("upload_write"): # Includes waiting for the client
+            async for chunk in request.stream():
+                try:
+                    parser.write(chunk)
+                except MultipartParseError:
+                    raise HTTPException(status_code=400, detail="Malformed multipart body")
+                if video is None and form.filename is not None:
+                    video = await run_in_threadpool(_TempVideo, form.filename, size_hint, directory)
+                if video is not None and video.written + form.pending_size > max_bytes:
+                    raise _too_large()
+                if form.pending_size >= CHUNK_SIZE:
+                    await run_in_threadpool(video.write, form.take())
+            parser.finalize()
+            if video is None:
+                raise HTTPException(status_code=422, detail=f"Missing the '{file_field}' file")
+            if form.pending:
+                await run_in_threadpool(video.write, form.take())
+            return await run_in_threadpool(video.finish), form.fields
+    except BaseException:
+        if video is not None:
+            await run_in_threadpool(video.discard)
+        raise
+
+
+def multipart_openapi(file_field: str = "file", **fields) -> dict:
+    """openapi_extra for endpoints that read their own multipart body, so /docs still shows the form."""
+    schema = {
+        "type": "object",
+        "properties": {file_field: {"type": "string", "format": "binary"}, **fields},
+        "required": [file_field],
+    }
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": schema}}}}
+
+
+async def ingest_stream(
+    chunks: AsyncIterator[bytes],
+    filename: Optional[str] = None,
+    size_hint: Optional[int] = None,
+    directory: Optional[str] = None,
+) -> IngestedVideo:
+    """
+    Writes a raw request body to disk as it arrives.
+    Like ingest_multipart there is no intermediate spool file, so the
+    bytes hit storage once. ASGI chunks (~64 KB) are gathered into
+    CHUNK_SIZE writes, which run in the threadpool like every other file call.
+    """
+    max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
+    if size_hint is not None and size_hint > max_bytes:
+        raise _too_large()
+
+    video = await run_in_threadpool(_TempVideo, filename, size_hint, directory)
+    pending, pending_size = [], 0
+    try:
+        with metrics.vision_stage_seconds.time("upload_write"): # Includes waiting for the client
+            async for chunk in chunks:
+                if video.written + pending_size + len(chunk) > max_bytes:
+                    raise _too_large()
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= CHUNK_SIZE:
+                    await run_in_threadpool(video.write, b"".join(pending))
+                    pending, pending_size = [], 0
+            if pending:
+                await run_in_threadpool(video.write, b"".join(pending))
+            return await run_in_threadpool(video.finish)
+    except BaseException:
+        await run_in_threadpool(video.discard)
+        raise
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware: answers 413 to video uploads (multipart or raw
+    octet-stream) whose Content-Length is already over MAX_UPLOAD_MB, before
+    any of the body is read. Bodies without a length are still cut off
+    while they're written.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("POST", "PUT"):
+            headers = dict(scope["headers"])
+            length = headers.get(b"content-length", b"")
+            content_type = headers.get(b"content-type", b"")
+            is_upload = content_type.startswith((b"multipart/form-data", b"application/octet-stream"))
+            limit = settings.MAX_UPLOAD_MB * 1024 * 1024 + MULTIPART_SLACK
+            if is_upload and length.isdigit() and int(length) > limit:
+                exc = _too_large()
+                response = JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+                return await response(scope, receive, send)
+        await self.app(scope, receive, send)
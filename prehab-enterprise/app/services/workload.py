@@ -0,0 +1,317 @@
+import copy
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.metrics import BiometricLog, BiometricRollup
+from app.models.user import User
+from app.schemas.analytics import AnalysisInput, LoadInput
+from app.services.rollups import utc_day
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+# === VECTORIZED ACWR (rows = athletes, columns = consecutive days) ===
+
+def rolling_acwr(loads: np.ndarray, acute: int = ACUTE_DAYS, chronic: int = CHRONIC_DAYS):
+    """
+    Coupled rolling-average ACWR for every athlete and every day at once.
+    Returns (acwr, acute_mean, chronic_mean), each shaped like `loads`.
+    Days before a full chronic window (or with zero chronic load) are NaN.
+    """
+    loads = np.asarray(loads, dtype=np.float64)
+    cs = np.cumsum(np.pad(loads, ((0, 0), (1, 0))), axis=1)
+    days = loads.shape[1]
+
+    acute_mean = np.full(loads.shape, np.nan)
+    chronic_mean = np.full(loads.shape, np.nan)
+    if days >= acute:
+        acute_mean[:, acute - 1:] = (cs[:, acute:] - cs[:, :-acute]) / acute
+    if days >= chronic:
+        chronic_mean[:, chronic - 1:] = (cs[:, chronic:] - cs[:, :-chronic]) / chronic
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        acwr = np.where(chronic_mean > 0, acute_mean / chronic_mean, np.nan)
+    return acwr, acute_mean, chronic_mean
+
+
+def ewma_acwr(loads: np.ndarray, acute: int = ACUTE_DAYS, chronic: int = CHRONIC_DAYS):
+    """
+    Exponentially weighted ACWR (lambda = 2 / (N + 1), Williams et al. 2017).
+    One vector step per day across the whole squad. Returns (acwr, acute_ewma, chronic_ewma).
+    """
+    loads = np.asarray(loads, dtype=np.float64)
+    la, lc = 2 / (acute + 1), 2 / (chronic + 1)
+
+    acute_ewma = np.empty_like(loads)
+    chronic_ewma = np.empty_like(loads)
+    a = np.zeros(loads.shape[0])
+    c = np.zeros(loads.shape[0])
+    for day in range(loads.shape[1]):
+        a = la * loads[:, day] + (1 - la) * a
+        c = lc * loads[:, day] + (1 - lc) * c
+        acute_ewma[:, day] = a
+        chronic_ewma[:, day] = c
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        acwr = np.where(chronic_ewma > 0, acute_ewma / chronic_ewma, np.nan)
+    acwr[:, :chronic - 1] = np.nan # Not enough history to trust
+    return acwr, acute_ewma, chronic_ewma
+
+
+class AcwrState:
+    """
+    Incremental ACWR for a squad: advance() adds one day in O(athletes),
+    without touching the rest of the 28-day window.
+    Each athlete's ratio stays NaN until `chronic` days have passed since
+    their first logged day (the window is zero-padded before that, which
+    would make a new athlete's first week look like a huge spike).
+    """
+
+    def __init__(self, n_athletes: int, acute: int = ACUTE_DAYS, chronic: int = CHRONIC_DAYS):
+        self.acute, self.chronic = acute, chronic
+        self.window = np.zeros((n_athletes, chronic)) # Ring buffer of the last `chronic` days
+        self.acute_sum = np.zeros(n_athletes)
+        self.chronic_sum = np.zeros(n_athletes)
+        self.acute_ewma = np.zeros(n_athletes)
+        self.chronic_ewma = np.zeros(n_athletes)
+        self.started = np.full(n_athletes, np.inf) # Day index of each athlete's first log (inf = none yet)
+        self.days = 0
+
+    @classmethod
+    def from_history(cls, loads: np.ndarray, started: Optional[np.ndarray] = None, **kwargs):
+        """
+        `started`: first logged day per athlete as an index into `loads`'
+        columns (negative = before them, inf = never), see first_logged().
+        Without it, the first non-NaN day of `loads` counts.
+        """
+        state = cls(loads.shape[0], **kwargs)
+        if started is not None:
+            state.started = np.asarray(started, dtype=np.float64).copy()
+        for day in range(loads.shape[1]):
+            state.advance(loads[:, day])
+        return state
+
+    def advance(self, day_loads: np.ndarray):
+        """One more day; NaN = not logged (zero load that doesn't start the athlete's history)."""
+        day_loads = np.asarray(day_loads, dtype=np.float64)
+        self.started = np.where(np.isinf(self.started) & ~np.isnan(day_loads), self.days, self.started)
+        day_loads = np.nan_to_num(day_loads)
+        # Slot `days % chronic` still holds the day leaving the chronic window;
+        # the day leaving the acute window sits `acute` slots back (zeros early on).
+        slot = self.days % self.chronic
+        self.acute_sum += day_loads - self.window[:, (self.days - self.acute) % self.chronic]
+        self.chronic_sum += day_loads - self.window[:, slot]
+        self.window[:, slot] = day_loads
+
+        la, lc = 2 / (self.acute + 1), 2 / (self.chronic + 1)
+        self.acute_ewma = la * day_loads + (1 - la) * self.acute_ewma
+        self.chronic_ewma = lc * day_loads + (1 - lc) * self.chronic_ewma
+        self.days += 1
+
+    def take(self, rows) -> "AcwrState":
+        """A copy holding only these athletes (e.g. one athlete out of a cached squad)."""
+        state = AcwrState(len(rows), self.acute, self.chronic)
+        for name in ("window", "acute_sum", "chronic_sum", "acute_ewma", "chronic_ewma", "started"):
+            setattr(state, name, getattr(self, name)[rows])
+        state.days = self.days
+        return state
+
+    def loads(self, method: str = "rolling") -> Tuple[np.ndarray, np.ndarray]:
+        """Current (acute, chronic) load per athlete."""
+        if method == "ewma":
+            return self.acute_ewma, self.chronic_ewma
+        return self.acute_sum / self.acute, self.chronic_sum / self.chronic
+
+    def ratios(self, method: str = "rolling") -> np.ndarray:
+        if self.days < self.chronic:
+            return np.full(self.window.shape[0], np.nan)
+        acute, chronic = self.loads(method)
+        enough = self.days - self.started >= self.chronic # Days of real history, today included
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(enough & (chronic > 0), acute / chronic, np.nan)
+
+
+# === DATABASE SIDE ===
+
+def load_matrix(db: Session, user_ids: List[int], start: date, end: date, missing: float = 0.0) -> np.ndarray:
+    """
+    Daily training load per athlete for [start, end] as a (users, days) matrix.
+    One GROUP BY query; days without a log are `missing` (NaN tells AcwrState
+    when an athlete's history starts).
+    """
+    days = (end - start).days + 1
+    matrix = np.full((len(user_ids), max(days, 0)), missing)
+    if not user_ids or days <= 0:
+        return matrix
+
+    row_of = {user_id: i for i, user_id in enumerate(user_ids)}
+    day = func.date(BiometricLog.timestamp)
+    rows = (
+        db.query(BiometricLog.user_id, day, func.sum(BiometricLog.training_load))
+        .filter(
+            BiometricLog.user_id.in_(user_ids),
+            BiometricLog.training_load.isnot(None),
+            day >= start.isoformat(),
+            day <= end.isoformat(),
+        )
+        .group_by(BiometricLog.user_id, day)
+        .all()
+    )
+    for user_id, log_day, total in rows:
+        if isinstance(log_day, str):
+            log_day = date.fromisoformat(log_day)
+        matrix[row_of[user_id], (log_day - start).days] = total or 0.0
+    return matrix
+
+
+def first_logged(db: Session, user_ids: List[int], start: date) -> np.ndarray:
+    """Each athlete's first day with a training load, as a day index from `start` (inf = none)."""
+    started = np.full(len(user_ids), np.inf)
+    if not user_ids:
+        return started
+    row_of = {user_id: i for i, user_id in enumerate(user_ids)}
+    rows = (
+        db.query(BiometricLog.user_id, func.min(func.date(BiometricLog.timestamp)))
+        .filter(BiometricLog.user_id.in_(user_ids), BiometricLog.training_load.isnot(None))
+        .group_by(BiometricLog.user_id)
+        .all()
+    )
+    for user_id, first in rows:
+        if isinstance(first, str):
+            first = date.fromisoformat(first)
+        if first is not None:
+            started[row_of[user_id]] = (first - start).days
+    return started
+
+
+def load_stamp(db: Session, organization_id: int, last: date) -> Tuple[int, float]:
+    """
+    (logged loads, total load) of an organization up to `last`, from the daily
+    rollups: changes whenever a load is written for one of those days, by any
+    worker. One indexed range read.
+    """
+    table = BiometricRollup.__table__
+    count, total = (
+        db.query(func.coalesce(func.sum(table.c.load_n), 0), func.coalesce(func.sum(table.c.load_sum), 0.0))
+        .filter(
+            table.c.scope == "org",
+            table.c.scope_id == organization_id,
+            table.c.period == "day",
+            table.c.period_start <= last,
+        )
+        .one()
+    )
+    return int(count), float(total)
+
+
+def utc_today() -> date:
+    """Days are UTC everywhere (logs are bucketed with func.date() on UTC timestamps)."""
+    return utc_day(datetime.now(timezone.utc))
+
+
+class WorkloadEngine:
+    """
+    Server-side ACWR. Squad states are cached per organization up to the last
+    closed day and advanced day by day, so a new day only costs one
+    AcwrState.advance(); today's (still changing) loads are folded into a copy.
+    Single athletes of an organization are served from their squad's state.
+
+    The cache is per process. Each use compares the organization's load stamp
+    (load_stamp) with the one the state was built at, so loads back-dated
+    through another API or Celery worker rebuild it everywhere.
+    """
+
+    def __init__(self):
+        # organization_id -> (user_ids, last closed day, load stamp up to it, state)
+        self._squads: Dict[int, Tuple[List[int], date, Tuple[int, float], AcwrState]] = {}
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def invalidate(self, organization_id: Optional[int] = None):
+        """Drops this process' cached states at once (others catch up through the load stamp)."""
+        with self._lock:
+            if organization_id is None:
+                self._squads.clear()
+            else:
+                self._squads.pop(organization_id, None)
+
+    def athlete_acwr(self, db: Session, user: User, as_of: Optional[date] = None, method: Optional[str] = None):
+        as_of = as_of or utc_today()
+        method = method or settings.ACWR_METHOD
+        if user.organization_id is not None:
+            _, single = self._closed_state(db, user.organization_id, as_of, member=user.id)
+            if single is not None:
+                single.advance(load_matrix(db, [user.id], as_of, as_of, missing=np.nan)[:, 0])
+                ratio = single.ratios(method)[0]
+                return None if np.isnan(ratio) else float(ratio)
+
+        # No organization: straight from the logs
+        # EWMA needs a longer run-in than the 28-day rolling window
+        days = CHRONIC_DAYS if method == "rolling" else max(CHRONIC_DAYS, settings.ACWR_HISTORY_DAYS)
+        start = as_of - timedelta(days=days - 1)
+        loads = load_matrix(db, [user.id], start, as_of)
+        ratio = AcwrState.from_history(loads, first_logged(db, [user.id], start)).ratios(method)[0]
+        return None if np.isnan(ratio) else float(ratio)
+
+    def squad_acwr(self, db: Session, organization_id: int, as_of: Optional[date] = None):
+        """Returns (user_ids, AcwrState) for every member of an organization, as of a day."""
+        as_of = as_of or utc_today()
+        user_ids, current = self._closed_state(db, organization_id, as_of)
+        current.advance(load_matrix(db, user_ids, as_of, as_of, missing=np.nan)[:, 0])
+        return user_ids, current
+
+    def _closed_state(self, db: Session, organization_id: int, as_of: date, member: Optional[int] = None):
+        """
+        (user_ids, copy of the state up to the day before `as_of`) for an
+        organization: the cached state, advanced over new closed days, or
+        rebuilt when the squad or its stamped history changed. With `member`
+        (single athlete) the copy holds only their row (None if they aren't
+        in the squad), and a cached squad that already has them skips the
+        members query.
+        """
+        closed = as_of - timedelta(days=1)
+        with self._lock:
+            cached = self._squads.get(organization_id)
+            if member is not None and cached and member in cached[0]:
+                user_ids = cached[0]
+            else:
+                user_ids = [uid for (uid,) in db.query(User.id).filter(User.organization_id == organization_id).order_by(User.id)]
+
+            if cached and cached[0] == user_ids and cached[1] <= closed and load_stamp(db, organization_id, cached[1]) == cached[2]:
+                _, last_day, stamp, state = cached
+                # Only fetch and fold in the closed days we haven't seen yet
+                if last_day < closed:
+                    new_loads = load_matrix(db, user_ids, last_day + timedelta(days=1), closed, missing=np.nan)
+                    for day in range(new_loads.shape[1]):
+                        state.advance(new_loads[:, day])
+                    stamp = load_stamp(db, organization_id, closed)
+            else:
+                start = as_of - timedelta(days=settings.ACWR_HISTORY_DAYS)
+                history = load_matrix(db, user_ids, start, closed)
+                state = AcwrState.from_history(history, first_logged(db, user_ids, start))
+                stamp = load_stamp(db, organization_id, closed)
+                self.rebuilds += 1
+            self._squads[organization_id] = (user_ids, closed, stamp, state)
+            if member is None:
+                return user_ids, copy.deepcopy(state)
+            return user_ids, state.take([user_ids.index(member)]) if member in user_ids else None
+
+    def with_server_acwr(self, db: Session, user: User, data: AnalysisInput) -> AnalysisInput:
+        """
+        Replaces the client-supplied ACWR with one computed from stored history.
+        Keeps the client value only when there isn't 28 days of load data yet.
+        """
+        if user.role not in ("athlete", "coach"): # Only the B2B report uses ACWR
+            return data
+        acwr = self.athlete_acwr(db, user)
+        if acwr is None:
+            return data
+        load = data.load_metrics.model_copy(update={"acwr": acwr}) if data.load_metrics else LoadInput(acwr=acwr)
+        return data.model_copy(update={"load_metrics": load})
+
+
+workload_engine = WorkloadEngine()
@@ -0,0 +1,114 @@
+import hashlib
+import os
+from typing import List, Optional
+from celery import Celery
+from app.core.config import settings
+from app.core.risk_rules import rule_engine
+from app.db.session import SessionLocal
+from app.services import biometric_store, rollups
+from app.services.analysis_service import AnalysisService
+from app.services.track_store import TrackStore, rescore_tracks
+from app.services.video_ingest import CHUNK_SIZE
+from app.services.workload import workload_engine
+
+# Import ALL models so SQLAlchemy can resolve relationships inside the worker
+from app.models.user import User
+from app.models.metrics import BiometricLog, KeypointTrack
+
+# Start with: celery -A app.worker.celery_app worker --loglevel=info
+celery_app = Celery(
+    "prehab",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+)
+celery_app.conf.update(
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_store_eager_result=True, # So status polling also works in eager mode
+    task_track_started=True,
+    task_serializer="json",
+    result_serializer="json",
+    result_expires=60 * 60 * 24,
+    worker_prefetch_multiplier=1, # Video jobs are long, don't hoard them
+)
+
+analyzer = AnalysisService()
+track_store = TrackStore.from_settings()
+
+# One YOLO model per worker process, loaded on the first job
+_vision_model = None
+
+def get_vision_model():
+    global _vision_model
+    if _vision_model is None:
+        from app.core.vision_engine import VisionEngine
+        _vision_model = VisionEngine()
+    return _vision_model
+
+
+@celery_app.task(name="analytics.analyze_video")
+def analyze_video_task(user_id: int, video_path: str, sha256: Optional[str] = None) -> dict:
+    """
+    Background job: Vision -> Digital Twin -> Report.
+    The uploaded file is always deleted when the job ends.
+    """
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if user is None:
+            raise ValueError(f"User {user_id} no longer exists")
+
+        engine = get_vision_model()
+        vision_results = engine.analyze_video(video_path, keep_track=track_store is not None)
+        track = vision_results.pop("track", None)
+        ai_data = analyzer.input_from_vision(vision_results)
+        ai_data = workload_engine.with_server_acwr(db, user, ai_data)
+        rule_engine.load_tiers(db, [user.organization_id])
+        report = analyzer.build_report(user, ai_data)
+
+        stored_track = None
+        if track_store is not None:
+            stored_track = track_store.store(
+                sha256 or _file_sha256(video_path), engine.extractor_version, vision_results, track,
+            )
+        biometric_store.save_report(db, user, ai_data, report, stored_track)
+        return report
+    finally:
+        db.close()
+        if os.path.exists(video_path):
+            os.remove(video_path)
+
+
+@celery_app.task(name="analytics.rescore_tracks")
+def rescore_tracks_task(track_ids: List[int]) -> dict:
+    """
+    Background job: re-scores stored keypoint tracks (no video, no model).
+    Returns {"rescored", "changed", "missing"} counts.
+    """
+    if track_store is None:
+        raise ValueError("TRACK_STORE_DIR is not set on this worker")
+    db = SessionLocal()
+    try:
+        return rescore_tracks(db, track_store, track_ids=track_ids)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="analytics.rebuild_rollups")
+def rebuild_rollups_task() -> dict:
+    """
+    Recomputes the history rollups from every BiometricLog (backfill for logs
+    stored before rollups existed). Returns {"logs": number of logs read}.
+    """
+    db = SessionLocal()
+    try:
+        return {"logs": rollups.rebuild(db)}
+    finally:
+        db.close()
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,17 @@
+"""
+Offline performance benchmarks.
+
+Run from the prehab-enterprise folder, e.g.:
+    python -m benchmarks.bench_vision_batch
+
+Settings normally come from .env; fill in safe local defaults so the
+benchmarks run on a bare checkout without touching a real database.
+"""
+import os
+
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+
+os.environ.setdefault("PROJECT_NAME", "Prehab Benchmarks")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
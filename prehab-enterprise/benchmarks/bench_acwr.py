@@ -0,0 +1,198 @@
+"""
+ACWR engine benchmark: 1k athletes x 2 years of daily load.
+
+    python -m benchmarks.bench_acwr --athletes 1000 --days 730
+    python -m benchmarks.bench_acwr --db   # also time the SQL aggregation into the load matrix
+
+Compares a naive per-athlete Python loop with the vectorized rolling/EWMA
+kernels, and a full recompute with one incremental AcwrState.advance().
+With --db it also checks that a new athlete (5 logged days) gets no server
+ACWR, so their client value is kept, while a 40-day athlete gets one, and
+that loads back-dated by another worker reach a process' cached squad state.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.services.workload import AcwrState, ewma_acwr, rolling_acwr
+
+
+def naive_rolling(loads: np.ndarray) -> np.ndarray:
+    """What a straightforward per-athlete, per-day implementation costs."""
+    out = np.full(loads.shape, np.nan)
+    for athlete in range(loads.shape[0]):
+        series = loads[athlete].tolist()
+        for day in range(27, len(series)):
+            acute = sum(series[day - 6:day + 1]) / 7
+            chronic = sum(series[day - 27:day + 1]) / 28
+            if chronic > 0:
+                out[athlete, day] = acute / chronic
+    return out
+
+
+def timed(fn, *args, repeats=1):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / repeats
+
+
+def bench_kernels(loads: np.ndarray):
+    athletes, days = loads.shape
+    print(f"Kernels ({athletes} athletes x {days} days = {loads.size:,} athlete-days):")
+
+    subset = loads[:max(1, athletes // 20)]
+    naive, t_naive = timed(naive_rolling, subset)
+    t_naive *= athletes / subset.shape[0] # Extrapolate from a 5% sample
+    print(f"  naive python rolling   : {t_naive * 1000:10.1f} ms (extrapolated)")
+
+    rolling, t_rolling = timed(rolling_acwr, loads, repeats=5)
+    assert np.allclose(naive, rolling[0][:subset.shape[0]], equal_nan=True)
+    print(f"  vectorized rolling     : {t_rolling * 1000:10.1f} ms  ({t_naive / t_rolling:,.0f}x)")
+
+    _, t_ewma = timed(ewma_acwr, loads, repeats=5)
+    print(f"  vectorized EWMA        : {t_ewma * 1000:10.1f} ms")
+
+    state, t_state = timed(AcwrState.from_history, loads[:, :-1])
+    print(f"  AcwrState full build   : {t_state * 1000:10.1f} ms")
+
+    start = time.perf_counter()
+    state.advance(loads[:, -1])
+    t_advance = time.perf_counter() - start
+    assert np.allclose(state.ratios("rolling"), rolling[0][:, -1], equal_nan=True)
+    print(f"  incremental +1 day     : {t_advance * 1000:10.3f} ms  ({t_rolling / t_advance:,.0f}x vs full rolling)")
+
+
+def bench_db(loads: np.ndarray):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.base_class import Base
+    from app.models.user import User
+    from app.models.metrics import BiometricLog  # noqa: F401
+    from app.services import biometric_store
+    from app.services.workload import load_matrix, utc_today
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'acwr.db')}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    athletes, days = loads.shape
+    end = utc_today()
+    start = end - timedelta(days=days - 1)
+
+    with Session() as db:
+        db.add_all([User(email=f"a{i}@bench", hashed_password="x", role="athlete") for i in range(athletes)])
+        db.commit()
+        user_ids = [u.id for u in db.query(User.id).order_by(User.id)]
+        base = datetime.combine(start, datetime.min.time(), tzinfo=timezone.utc)
+        t0 = time.perf_counter()
+        for i, user_id in enumerate(user_ids):
+            biometric_store.bulk_insert(db, [
+                {"user_id": user_id, "timestamp": base + timedelta(days=d, hours=10), "training_load": float(loads[i, d])}
+                for d in range(days)
+            ])
+        print(f"DB ({loads.size:,} rows inserted in {time.perf_counter() - t0:.1f}s):")
+
+        matrix, t_full = timed(load_matrix, db, user_ids, start, end)
+        assert np.allclose(matrix, loads)
+        print(f"  {f'load_matrix {days} days':<22} : {t_full * 1000:10.1f} ms")
+        _, t_day = timed(load_matrix, db, user_ids, end, end, repeats=5)
+        print(f"  {'load_matrix 1 day':<22} : {t_day * 1000:10.1f} ms")
+
+    with Session() as db:
+        check_short_history(db)
+        check_other_worker(db)
+
+
+def check_short_history(db):
+    """Zero-padded history must not turn a new athlete's steady load into an ACWR of 4."""
+    from app.models.user import Organization, User
+    from app.schemas.analytics import AnalysisInput, LoadInput
+    from app.services import biometric_store
+    from app.services.workload import WorkloadEngine, utc_today
+
+    org = Organization(name="ACWR bench", subscription_tier="pro")
+    db.add(org)
+    db.flush()
+    new, veteran = (User(email=f"{name}@acwr", hashed_password="x", role="athlete", organization_id=org.id)
+                    for name in ("new", "veteran"))
+    db.add_all([new, veteran])
+    db.commit()
+    today = datetime.combine(utc_today(), datetime.min.time(), tzinfo=timezone.utc) + timedelta(hours=10)
+    for user, days in ((new, 5), (veteran, 40)):
+        biometric_store.bulk_insert(db, [
+            {"user_id": user.id, "timestamp": today - timedelta(days=d), "training_load": 300.0} for d in range(days)
+        ])
+
+    engine = WorkloadEngine()
+    data = AnalysisInput(load_metrics=LoadInput(acwr=1.0))
+    user_ids, state = engine.squad_acwr(db, org.id)
+    squad = dict(zip(user_ids, state.ratios("rolling")))
+    for user, expected in ((new, None), (veteran, 1.0)):
+        single = engine.athlete_acwr(db, user, method="rolling")
+        assert (single is None) if expected is None else abs(single - expected) < 1e-9, (user.email, single)
+        assert np.isnan(squad[user.id]) if expected is None else abs(squad[user.id] - expected) < 1e-9, (user.email, squad[user.id])
+    assert engine.with_server_acwr(db, new, data).load_metrics.acwr == 1.0
+    print("  short history          : OK (5 days -> client ACWR kept, 40 days -> 1.00)")
+
+
+def check_other_worker(db):
+    """
+    Worker A serves an athlete from its cached squad state; worker B writes
+    back-dated loads and only invalidates its own cache. A must still match
+    a fresh engine, and must not rebuild while nothing changes.
+    """
+    from sqlalchemy import event
+    from app.models.user import Organization, User
+    from app.services import biometric_store
+    from app.services.workload import WorkloadEngine, utc_today
+
+    org = Organization(name="ACWR workers", subscription_tier="pro")
+    db.add(org)
+    db.flush()
+    athlete = User(email="worker@acwr", hashed_password="x", role="athlete", organization_id=org.id)
+    db.add(athlete)
+    db.commit()
+    today = datetime.combine(utc_today(), datetime.min.time(), tzinfo=timezone.utc) + timedelta(hours=10)
+    biometric_store.bulk_insert(db, [
+        {"user_id": athlete.id, "timestamp": today - timedelta(days=d), "training_load": 300.0} for d in range(40)
+    ], {athlete.id: org.id})
+
+    worker_a, worker_b = WorkloadEngine(), WorkloadEngine()
+    before = worker_a.athlete_acwr(db, athlete, method="rolling")
+    queries = []
+    listener = lambda *args: queries.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    again = worker_a.athlete_acwr(db, athlete, method="rolling")
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    biometric_store.bulk_insert(db, [
+        {"user_id": athlete.id, "timestamp": today - timedelta(days=d), "training_load": 600.0} for d in range(1, 4)
+    ], {athlete.id: org.id})
+    worker_b.invalidate(org.id)
+    after = worker_a.athlete_acwr(db, athlete, method="rolling")
+    fresh = WorkloadEngine().athlete_acwr(db, athlete, method="rolling")
+    user_ids, state = worker_a.squad_acwr(db, org.id)
+    squad = dict(zip(user_ids, state.ratios("rolling")))[athlete.id]
+    assert before == again == 1.0 and after == fresh != before and abs(squad - fresh) < 1e-12, (before, again, after, fresh, squad)
+    assert worker_a.rebuilds == 2, worker_a.rebuilds
+    print(f"  other worker's loads   : OK ({before:.2f} -> {after:.2f}; cached athlete lookup = {len(queries)} queries)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--athletes", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--db", action="store_true", help="Also benchmark the SQLite aggregation path")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    loads = rng.gamma(4.0, 100.0, size=(args.athletes, args.days)).round(1)
+    loads[rng.random(loads.shape) < 0.15] = 0 # Rest days
+
+    bench_kernels(loads)
+    if args.db:
+        bench_db(loads)
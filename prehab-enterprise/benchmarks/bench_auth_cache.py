@@ -0,0 +1,67 @@
+"""
+/analyze requests/sec with and without the auth caches.
+
+    python -m benchmarks.bench_auth_cache --requests 2000
+
+Runs app.main in-process against a throwaway SQLite database and counts
+the `users` SELECTs issued by get_current_user in each mode.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks import DEFAULT_DATABASE_URL
+
+if os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core import auth_cache
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.session import SessionLocal, async_engine
+from app.main import app
+from app.models.user import User
+
+user_queries = 0
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global user_queries
+    if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+        user_queries += 1
+
+
+def run(client, headers, n: int):
+    global user_queries
+    user_queries = 0
+    body = {"mechanics": {"knee_valgus_angle": 12.0}, "load_metrics": {"acwr": 1.1}}
+    start = time.perf_counter()
+    for _ in range(n):
+        client.post("/api/v1/analytics/analyze", json=body, headers=headers).raise_for_status()
+    return n / (time.perf_counter() - start), user_queries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        with SessionLocal() as db:
+            email = f"athlete-{time.time()}@bench"
+            db.add(User(email=email, hashed_password="x", role="athlete"))
+            db.commit()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+        for enabled in (False, True):
+            settings.AUTH_CACHE_ENABLED = enabled
+            auth_cache.token_cache.clear()
+            auth_cache.user_cache.clear()
+            rps, queries = run(client, headers, args.requests)
+            label = "cache on " if enabled else "cache off"
+            print(f"{label}: {rps:8.0f} req/s   user SELECTs: {queries}")
+        print(f"hit rates: {auth_cache.stats()}")
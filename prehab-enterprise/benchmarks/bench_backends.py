@@ -0,0 +1,125 @@
+"""
+Inference backend latency + accuracy regression (needs ultralytics, and
+onnxruntime / openvino for those backends).
+
+    python -m benchmarks.bench_backends --video clip.mp4
+    python -m benchmarks.bench_backends --video clip.mp4 --backends pytorch onnx --int8
+
+Runs the same sampled frames through every backend (the first one is the
+reference), reports load/export time, per-frame latency at batch 1 and
+frames/sec at VISION_BATCH_SIZE, and fails if the keypoint-derived valgus /
+hip / shin metrics drift from the reference by more than the tolerances.
+Use a clip with one clearly visible athlete; the synthetic clip from
+bench_vision_pool has no person in it.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from app.core.biomechanics import COLUMN, compute_joint_metrics
+from app.core.config import settings
+from app.core.vision_engine import VisionEngine
+
+# Max allowed |backend - reference| of the clip-level value per metric
+TOLERANCES = {"valgus": 3.0, "hip": 0.01, "shin": 3.0}
+
+
+def read_frames(video_path: str, limit: int, stride: int):
+    cap = cv2.VideoCapture(video_path)
+    frames, index = [], 0
+    while len(frames) < limit and cap.grab():
+        index += 1
+        if index % stride == 0:
+            ok, frame = cap.retrieve()
+            if ok:
+                frames.append((index, frame))
+    cap.release()
+    return frames
+
+
+def clip_metrics(kpts: np.ndarray) -> dict:
+    """Clip-level valgus (85th pct, worse leg), hip (mean |dev|, worse leg) and shin (mean, both legs)."""
+    values = compute_joint_metrics(kpts)["values"]
+
+    def stat(names, fn):
+        columns = values[:, [COLUMN[n] for n in names]].T
+        return [fn(c[~np.isnan(c)]) if np.any(~np.isnan(c)) else 0.0 for c in columns]
+
+    return {
+        "valgus": max(stat(("valgus_left", "valgus_right"), lambda c: np.percentile(c, 85))),
+        "hip": max(stat(("hip_left", "hip_right"), lambda c: np.mean(np.abs(c)))),
+        "shin": float(np.nanmean(values[:, [COLUMN["shin_left"], COLUMN["shin_right"]]])) if len(values) else 0.0,
+    }
+
+
+def run_backend(name: str, int8: bool, frames, batch_size: int):
+    engine = VisionEngine(backend=name, int8=int8)
+    start = time.perf_counter()
+    engine.load()
+    load_seconds = time.perf_counter() - start
+    engine._infer_batch(frames[:batch_size]) # Warm up kernels / graph compilation
+
+    # Latency: one frame per call
+    latencies = []
+    for item in frames:
+        start = time.perf_counter()
+        engine._infer_batch([item])
+        latencies.append(time.perf_counter() - start)
+
+    # Throughput + keypoints: batched calls
+    indices, kpts = [], []
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch_size):
+        batch_indices, batch_kpts = engine._infer_batch(frames[i:i + batch_size])
+        indices += batch_indices
+        kpts += batch_kpts
+    batch_fps = len(frames) / (time.perf_counter() - start)
+
+    stacked = np.stack(kpts) if kpts else np.empty((0, 17, 3))
+    return {
+        "label": f"{name}{'-int8' if int8 and name != 'pytorch' else ''}",
+        "load": load_seconds,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "fps": batch_fps,
+        "with_pose": len(indices),
+        "metrics": clip_metrics(stacked),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx", "openvino"])
+    parser.add_argument("--int8", action="store_true", help="Also run the INT8 variant of each exported backend")
+    parser.add_argument("--frames", type=int, default=200, help="Sampled frames to run")
+    parser.add_argument("--stride", type=int, default=settings.VISION_FRAME_STRIDE)
+    parser.add_argument("--batch-size", type=int, default=settings.VISION_BATCH_SIZE)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames, args.stride)
+    runs = [(name, False) for name in args.backends]
+    if args.int8:
+        runs += [(name, True) for name in args.backends if name != "pytorch"]
+
+    results = [run_backend(name, int8, frames, args.batch_size) for name, int8 in runs]
+    reference = results[0]
+
+    print(f"{len(frames)} frames from {args.video}, reference = {reference['label']}")
+    print(f"{'backend':<14} {'load s':>7} {'p50 ms':>7} {'p99 ms':>7} {'batch fps':>9} {'pose':>5}  "
+          f"{'valgus':>7} {'hip':>7} {'shin':>7}  status")
+    failures = []
+    for result in results:
+        drift = {k: abs(result["metrics"][k] - reference["metrics"][k]) for k in TOLERANCES}
+        bad = [k for k, d in drift.items() if d > TOLERANCES[k]]
+        if bad:
+            failures.append((result["label"], bad))
+        m = result["metrics"]
+        print(f"{result['label']:<14} {result['load']:>7.1f} {result['p50'] * 1000:>7.1f} {result['p99'] * 1000:>7.1f} "
+              f"{result['fps']:>9.1f} {result['with_pose']:>5}  {m['valgus']:>7.2f} {m['hip']:>7.4f} {m['shin']:>7.2f}  "
+              f"{'DRIFT ' + ','.join(bad) if bad else 'OK'}")
+
+    if failures:
+        raise SystemExit(f"Accuracy regression beyond {TOLERANCES}: {failures}")
@@ -0,0 +1,89 @@
+"""
+BiometricLog insert throughput: per-row ORM adds vs batched executemany.
+
+    python -m benchmarks.bench_bulk_insert --rows 20000
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_bulk_insert
+
+Uses a throwaway SQLite file unless DATABASE_URL points elsewhere.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks import DEFAULT_DATABASE_URL
+from app.db.base_class import Base
+from app.models.user import User
+from app.models.metrics import BiometricLog
+from app.services import biometric_store
+
+
+def make_rows(n: int, user_id: int):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "user_id": user_id,
+            "timestamp": start + timedelta(hours=i),
+            "steps": random.randint(2000, 20000),
+            "sleep_hours": round(random.uniform(5, 9), 1),
+            "vo2_max": round(random.uniform(40, 65), 1),
+            "acwr_ratio": round(random.uniform(0.6, 1.6), 2),
+        }
+        for i in range(n)
+    ]
+
+
+def per_row(db, rows):
+    # What a naive endpoint would do: one ORM add + commit per row
+    for row in rows:
+        db.add(BiometricLog(**row))
+        db.commit()
+
+
+def orm_add_all(db, rows):
+    db.add_all([BiometricLog(**row) for row in rows])
+    db.commit()
+
+
+def batched(db, rows):
+    biometric_store.bulk_insert(db, rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--per-row-cap", type=int, default=2000, help="Per-row commits are slow; cap them")
+    args = parser.parse_args()
+
+    url = os.environ["DATABASE_URL"]
+    if url == DEFAULT_DATABASE_URL:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bulk.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        user = User(email=f"bench-{time.time()}@prehab.dev", hashed_password="x", role="athlete")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    for label, fn, n in (
+        ("per-row commit", per_row, min(args.rows, args.per_row_cap)),
+        ("ORM add_all", orm_add_all, args.rows),
+        ("batched insert", batched, args.rows),
+    ):
+        rows = make_rows(n, user_id)
+        with Session() as db:
+            start = time.perf_counter()
+            fn(db, rows)
+            elapsed = time.perf_counter() - start
+            db.execute(delete(BiometricLog).where(BiometricLog.user_id == user_id))
+            db.commit()
+        print(f"  {label:<15}: {n:>7} rows in {elapsed:6.2f}s -> {n / elapsed:>10,.0f} rows/sec")
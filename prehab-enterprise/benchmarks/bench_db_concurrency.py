@@ -0,0 +1,108 @@
+"""
+DB concurrency: the same per-request work (user lookup + one BiometricLog
+insert) through the sync session in the threadpool vs the async session.
+
+    python -m benchmarks.bench_db_concurrency --requests 2000 --concurrency 100
+    DATABASE_URL=postgresql://user:pw@localhost/prehab python -m benchmarks.bench_db_concurrency
+    DB_POOL_SIZE=5 DB_MAX_OVERFLOW=0 python -m benchmarks.bench_db_concurrency
+
+Also runs /analyze end to end (auth cache off, so every request hits the DB)
+through httpx's ASGI transport. Defaults to a throwaway SQLite file.
+
+On SQLite the async session is SLOWER than the sync one (aiosqlite proxies
+every call through a thread and both engines get a single connection):
+
+    1000 requests @ 50 concurrent, sqlite+aiosqlite
+      sync session + threadpool :      587 req/s   p50    83.3 ms   p99   154.7 ms
+      async session             :      420 req/s   p50   111.2 ms   p99   205.2 ms
+      POST /analyze (end to end):       77 req/s   p50   639.4 ms   p99   785.0 ms
+
+No Postgres/asyncpg numbers yet: run the DATABASE_URL=postgresql://... line
+above before claiming the async path buys any throughput.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks import DEFAULT_DATABASE_URL
+
+if os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'concurrency.db')}"
+os.environ["AUTH_CACHE_ENABLED"] = "false"
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+
+from app.core.security import create_access_token
+from app.db.session import ASYNC_DATABASE_URL, AsyncSessionLocal, SessionLocal, async_engine
+from app.main import app
+from app.models.metrics import BiometricLog
+from app.models.user import User
+
+EMAIL = "concurrency@bench"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def sync_request():
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == EMAIL).first()
+        db.execute(insert(BiometricLog), [{"user_id": user.id, "steps": 1000}])
+        db.commit()
+
+
+async def async_request():
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.email == EMAIL))).scalars().first()
+        await db.execute(insert(BiometricLog), [{"user_id": user.id, "steps": 1000}])
+        await db.commit()
+
+
+async def drive(label: str, call, requests: int, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with gate:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - start
+    print(f"  {label:<26}: {requests / wall:8.0f} req/s   p50 {percentile(latencies, 50) * 1000:7.1f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f} ms")
+
+
+async def main(args):
+    async with app.router.lifespan_context(app):
+        with SessionLocal() as db:
+            db.add(User(email=EMAIL, hashed_password="x", role="athlete"))
+            db.commit()
+
+        print(f"{ASYNC_DATABASE_URL.split('://')[0]}  pool: {async_engine.pool.status()}")
+        print(f"{args.requests} requests @ {args.concurrency} concurrent")
+        await drive("sync session + threadpool", lambda: run_in_threadpool(sync_request), args.requests, args.concurrency)
+        await drive("async session", async_request, args.requests, args.concurrency)
+
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': EMAIL})}"}
+        body = {"mechanics": {"knee_valgus_angle": 12.0}, "load_metrics": {"acwr": 1.1}}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def analyze():
+                (await client.post("/api/v1/analytics/analyze", json=body, headers=headers)).raise_for_status()
+            await drive("POST /analyze (end to end)", analyze, args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,269 @@
+"""
+History range queries: daily/weekly rollups vs aggregating biometric_logs.
+
+    python -m benchmarks.bench_history --rows 1000000
+    python -m benchmarks.bench_history --rows 10000000 --athletes 2000   # the full-size run (~10 min to seed)
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_history     # same on PostgreSQL (empty database!)
+
+Seeds `--rows` synthetic wearable logs (athletes spread over `--orgs`
+organizations, `--days` of history) with the bulk_insert path, timing the
+executemany and the rollup maintenance separately. Then runs `--queries`
+random range reads (7 days to the whole history, athlete or organization)
+and team summary pages, each both ways: p50 / p95 / max latency. Every
+rollup series is checked against the same aggregation done on the raw logs;
+--rebuild also times a backfill and checks it reproduces the incremental
+rollups exactly. Rows that leave metrics out (reports, sleep-only syncs)
+are always checked too: a rebuild from the stored logs must give the same
+rollups as the incremental path that wrote them.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from benchmarks import DEFAULT_DATABASE_URL
+
+if os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'history.db')}"
+
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from app.db.base_class import Base
+from app.db.session import SessionLocal, engine
+from app.models.metrics import BiometricLog, BiometricRollup
+from app.models.user import Organization, User
+from app.services import rollups
+
+END = date(2026, 6, 30)
+
+
+def seed(n_rows: int, athletes: int, orgs: int, days: int, batch_size: int):
+    """Returns (user ids, org ids, seconds in executemany, seconds in rollups.apply)."""
+    rng = np.random.default_rng(0)
+    with SessionLocal() as db:
+        organizations = [Organization(name=f"History FC {i} {time.time()}", subscription_tier="pro") for i in range(orgs)]
+        db.add_all(organizations)
+        db.flush()
+        users = [
+            User(email=f"history{i}-{time.time()}@bench", hashed_password="x", role="athlete",
+                 full_name=f"Athlete {i}", organization_id=organizations[i % orgs].id)
+            for i in range(athletes)
+        ]
+        db.add_all(users)
+        db.commit()
+        user_ids = np.array([u.id for u in users])
+        org_ids = [o.id for o in organizations]
+
+        first = datetime.combine(END - timedelta(days=days - 1), datetime.min.time(), tzinfo=timezone.utc)
+        insert_seconds = rollup_seconds = 0.0
+        for start in range(0, n_rows, batch_size):
+            n = min(batch_size, n_rows - start)
+            # Arrives in time order (each batch is the next slice of history), like real syncs
+            span = days * 86400
+            seconds = np.sort(rng.integers(start * span // n_rows, (start + n) * span // n_rows, n))
+            has_sleep = rng.random(n) < 0.5
+            batch = [
+                {
+                    "user_id": int(u), "timestamp": first + timedelta(seconds=int(s)),
+                    "steps": int(st), "sleep_hours": float(sl) if hs else None,
+                    "vo2_max": None, "acwr_ratio": float(a), "training_load": float(l),
+                }
+                for u, s, st, sl, hs, a, l in zip(
+                    rng.choice(user_ids, n), seconds, rng.integers(0, 20000, n), rng.normal(7.5, 1, n),
+                    has_sleep, rng.normal(1.1, 0.3, n).round(3), rng.gamma(4, 80, n).round(1),
+                )
+            ]
+            t0 = time.perf_counter()
+            db.execute(insert(BiometricLog), batch)
+            t1 = time.perf_counter()
+            rollups.apply(db, batch)
+            db.commit()
+            insert_seconds += t1 - t0
+            rollup_seconds += time.perf_counter() - t1
+    return user_ids.tolist(), org_ids, insert_seconds, rollup_seconds
+
+
+# === NAIVE (NO ROLLUPS) ===
+
+def naive_series(db, scope: str, scope_id: int, start: date, end: date) -> dict:
+    """Daily aggregates straight from biometric_logs: what /history would cost without rollups."""
+    day = func.date(BiometricLog.timestamp)
+    query = select(
+        day, func.count(), func.avg(BiometricLog.steps), func.avg(BiometricLog.sleep_hours),
+        func.sum(BiometricLog.training_load), func.max(BiometricLog.acwr_ratio),
+    ).where(
+        BiometricLog.timestamp >= datetime.combine(start, datetime.min.time()),
+        BiometricLog.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+    )
+    if scope == "user":
+        query = query.where(BiometricLog.user_id == scope_id)
+    else:
+        query = query.join(User, BiometricLog.user_id == User.id).where(User.organization_id == scope_id)
+    return {str(row[0]): row[1:] for row in db.execute(query.group_by(day))}
+
+
+def naive_team(db, organization_id: int, start: date, end: date, limit: int) -> list:
+    return db.execute(
+        select(User.id, func.count(BiometricLog.id), func.avg(BiometricLog.sleep_hours), func.sum(BiometricLog.training_load))
+        .join(BiometricLog, BiometricLog.user_id == User.id)
+        .where(
+            User.organization_id == organization_id,
+            BiometricLog.timestamp >= datetime.combine(start, datetime.min.time()),
+            BiometricLog.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        )
+        .group_by(User.id).order_by(User.id).limit(limit)
+    ).all()
+
+
+def same_series(rolled: dict, naive: dict) -> bool:
+    points = {p["start"].isoformat(): p for p in rolled["points"]}
+    if points.keys() != naive.keys():
+        return False
+    for day, (logs, steps, sleep, load, acwr_max) in naive.items():
+        p = points[day]
+        expected = (logs, steps, sleep, load or 0.0, acwr_max)
+        actual = (p["logs"], p["steps"], p["sleep_hours"], p["training_load_total"], p["acwr_max"])
+        if not all((a is None and b is None) or (a is not None and b is not None and np.isclose(a, b)) for a, b in zip(actual, expected)):
+            return False
+    return True
+
+
+def percentiles(samples: list) -> str:
+    ms = np.array(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):8.2f} ms   p95 {np.percentile(ms, 95):8.2f} ms   max {ms.max():8.2f} ms"
+
+
+def bench_queries(user_ids: list, org_ids: list, days: int, n_queries: int, max_points: int, compare: bool):
+    random.seed(0)
+    timings = {"rollup": [], "naive": []}
+    mismatches = 0
+    with SessionLocal() as db:
+        for i in range(n_queries):
+            scope, scope_id = ("org", random.choice(org_ids)) if i % 4 == 0 else ("user", random.choice(user_ids))
+            span = random.choice([7, 28, 90, 365, days])
+            end = END - timedelta(days=random.randrange(0, max(1, days - span)))
+            start = end - timedelta(days=span - 1)
+
+            t0 = time.perf_counter()
+            rolled = rollups.read_series(db, scope, scope_id, start, end, "auto", max_points, 5000)
+            timings["rollup"].append(time.perf_counter() - t0)
+            if not compare:
+                continue
+            t0 = time.perf_counter()
+            naive = naive_series(db, scope, scope_id, start, end)
+            timings["naive"].append(time.perf_counter() - t0)
+            if rolled["bucket_days"] == 1:
+                mismatches += not same_series(rolled, naive)
+            else: # Downsampled into whole ISO weeks: same logs as the raw rows of those weeks
+                monday = rollups.period_start(start, "week")
+                weeks = naive_series(db, scope, scope_id, monday, rollups.period_start(end, "week") + timedelta(days=6))
+                mismatches += sum(p["logs"] for p in rolled["points"]) != sum(v[0] for v in weeks.values())
+
+        print(f"range reads ({n_queries}, 7..{days} days, max {max_points} points):")
+        print(f"  rollups      : {percentiles(timings['rollup'])}")
+        if compare:
+            print(f"  raw GROUP BY : {percentiles(timings['naive'])}   "
+                  f"({np.percentile(timings['naive'], 95) / np.percentile(timings['rollup'], 95):,.0f}x at p95)")
+
+        # Team summary: one page of athletes over the last 28 days
+        timings = {"rollup": [], "naive": []}
+        for i in range(max(10, n_queries // 10)):
+            org_id = org_ids[i % len(org_ids)]
+            start = END - timedelta(days=27)
+            t0 = time.perf_counter()
+            rollups.read_team(db, org_id, start, END, 100)
+            timings["rollup"].append(time.perf_counter() - t0)
+            if compare:
+                t0 = time.perf_counter()
+                naive_team(db, org_id, start, END, 100)
+                timings["naive"].append(time.perf_counter() - t0)
+        print("team summary page (100 athletes, 28 days):")
+        print(f"  rollups      : {percentiles(timings['rollup'])}")
+        if compare:
+            print(f"  raw GROUP BY : {percentiles(timings['naive'])}")
+    return mismatches
+
+
+def check_rebuild() -> int:
+    columns = [BiometricRollup.__table__.c[c] for c in (*rollups.BUCKET_KEY, *rollups.SUM_COLUMNS, "acwr_max")]
+    with SessionLocal() as db:
+        before = db.execute(select(*columns).order_by(*columns[:4])).all()
+        t0 = time.perf_counter()
+        logs = rollups.rebuild(db)
+        elapsed = time.perf_counter() - t0
+        after = db.execute(select(*columns).order_by(*columns[:4])).all()
+    same = len(before) == len(after) and all(
+        a[:4] == b[:4] and np.allclose([x if x is not None else np.nan for x in a[4:]],
+                                       [x if x is not None else np.nan for x in b[4:]], equal_nan=True)
+        for a, b in zip(before, after)
+    )
+    print(f"rebuild (backfill)    : {logs:,} logs in {elapsed:.1f}s ({logs / elapsed:,.0f} logs/sec)   "
+          f"{'matches' if same else 'DIFFERS FROM'} the incremental rollups")
+    return 0 if same else 1
+
+
+def check_missing_values() -> int:
+    """Report rows and sleep-only rows (no steps) through every write path, then rebuild() == incremental apply()."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.schemas.analytics import AnalysisInput, BiometricRow, DailyInput
+    from app.services import biometric_store
+
+    scratch = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'missing.db')}")
+    Base.metadata.create_all(bind=scratch)
+    columns = [BiometricRollup.__table__.c[c] for c in (*rollups.BUCKET_KEY, *rollups.SUM_COLUMNS, "acwr_max")]
+    with sessionmaker(bind=scratch)() as db:
+        org = Organization(name="Missing FC", subscription_tier="pro")
+        db.add(org)
+        db.flush()
+        user = User(email="missing@bench", hashed_password="x", role="athlete", organization_id=org.id)
+        db.add(user)
+        db.commit()
+        report = {"user_id": user.id, "score": 40}
+        biometric_store.save_report(db, user, AnalysisInput(), report)
+        biometric_store.save_report(db, user, AnalysisInput(daily_stats=DailyInput(steps=8000)), report)
+        biometric_store.save_reports(db, user.organization_id, [report, report], [1.2, None])
+        biometric_store.bulk_insert(db, [BiometricRow(user_id=user.id, sleep_hours=7.0).model_dump()])
+        biometric_store.bulk_insert(db, [BiometricRow(user_id=user.id, steps=0, sleep_hours=8.0).model_dump()])
+        incremental = db.execute(select(*columns).order_by(*columns[:4])).all()
+        rollups.rebuild(db)
+        rebuilt = db.execute(select(*columns).order_by(*columns[:4])).all()
+        steps = db.execute(select(BiometricRollup.steps_sum, BiometricRollup.steps_n).where(
+            BiometricRollup.scope == "user", BiometricRollup.period == "day")).all()
+    ok = incremental == rebuilt and steps == [(8000.0, 2)]
+    print(f"missing values        : {'OK' if ok else 'FAILED'} (rebuild vs incremental, day steps sum/n {steps})")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--athletes", type=int, default=500)
+    parser.add_argument("--orgs", type=int, default=10)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-points", type=int, default=366)
+    parser.add_argument("--batch", type=int, default=10000, help="Rows per executemany + rollup upsert")
+    parser.add_argument("--no-compare", action="store_true", help="Skip the raw GROUP BY timings (slow on big tables)")
+    parser.add_argument("--rebuild", action="store_true", help="Also time and verify a full backfill")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    user_ids, org_ids, insert_seconds, rollup_seconds = seed(args.rows, args.athletes, args.orgs, args.days, args.batch)
+    with SessionLocal() as db:
+        buckets = db.query(func.count(BiometricRollup.id)).scalar()
+    print(f"{engine.dialect.name}: seeded {args.rows:,} logs ({args.athletes} athletes, {args.orgs} orgs, {args.days} days) -> "
+          f"{buckets:,} rollup rows")
+    print(f"  executemany {insert_seconds:.1f}s + rollups {rollup_seconds:.1f}s "
+          f"(+{rollup_seconds / insert_seconds:.0%} write cost, {args.rows / (insert_seconds + rollup_seconds):,.0f} rows/sec)")
+
+    failures = bench_queries(user_ids, org_ids, args.days, args.queries, args.max_points, not args.no_compare)
+    print(f"parity vs raw logs    : {'identical' if not failures else f'{failures} series DIFFER'}")
+    failures += check_missing_values()
+    if args.rebuild:
+        failures += check_rebuild()
+    if failures:
+        raise SystemExit("Rollups disagree with the raw logs")
@@ -0,0 +1,119 @@
+"""
+Upload ingestion benchmark: latency and peak RSS.
+
+    python -m benchmarks.bench_ingest --sizes 50 500
+
+Compares the legacy path (multipart spool file + shutil.copyfileobj into
+temp_<name>) with the multipart parser the upload endpoints use now
+(ingest_multipart) and the raw body path of /analyze/video/stream.
+Each case runs in a fresh process so peak RSS is not shared.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+CHUNK = 64 * 1024 # Typical ASGI receive() chunk
+
+
+def _chunks(size_mb: int):
+    block = os.urandom(CHUNK)
+    for _ in range(size_mb * 1024 * 1024 // CHUNK):
+        yield block
+
+
+def _legacy(size_mb: int, workdir: str):
+    # Starlette spools multipart bodies (rolls to disk after 1 MB) ...
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, dir=workdir)
+    for block in _chunks(size_mb):
+        spool.write(block)
+    spool.seek(0)
+    # ... then the endpoint copies that spool into temp_<filename>
+    path = os.path.join(workdir, "temp_clip.mp4")
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(spool, buffer)
+    spool.close()
+    os.remove(path)
+
+
+def _streaming(size_mb: int, workdir: str):
+    from app.core.config import settings
+    from app.services.video_ingest import ingest_stream # Already imported by _run_case
+
+    settings.MAX_UPLOAD_MB = max(settings.MAX_UPLOAD_MB, size_mb + 1)
+    settings.VIDEO_TMP_DIR = workdir
+
+    async def body():
+        for block in _chunks(size_mb):
+            yield block
+
+    size = size_mb * 1024 * 1024
+    video = asyncio.run(ingest_stream(body(), "clip.mp4", size_hint=size))
+    video.cleanup()
+
+
+def _multipart(size_mb: int, workdir: str):
+    from starlette.requests import Request
+    from app.core.config import settings
+    from app.services.video_ingest import ingest_multipart
+
+    settings.MAX_UPLOAD_MB = max(settings.MAX_UPLOAD_MB, size_mb + 1)
+    settings.VIDEO_TMP_DIR = workdir
+
+    boundary = b"benchboundary"
+    head = b"--" + boundary + b'\r\nContent-Disposition: form-data; name="file"; filename="clip.mp4"\r\n\r\n'
+    tail = b"\r\n--" + boundary + b"--\r\n"
+    size = size_mb * 1024 * 1024 + len(head) + len(tail)
+
+    async def receive(body=iter([head, *_chunks(size_mb), tail])):
+        chunk = next(body, b"")
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunk)}
+
+    headers = [
+        (b"content-type", b"multipart/form-data; boundary=" + boundary),
+        (b"content-length", str(size).encode()),
+    ]
+    request = Request({"type": "http", "method": "POST", "headers": headers}, receive)
+    video, _ = asyncio.run(ingest_multipart(request))
+    video.cleanup()
+
+
+def _run_case(case: str, size_mb: int, workdir: str, queue):
+    # Import the app side for both cases so the RSS baseline is comparable
+    import app.services.video_ingest  # noqa: F401
+
+    fn = {"legacy": _legacy, "multipart": _multipart, "streaming": _streaming}[case]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    fn(size_mb, workdir)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((elapsed, peak, peak - baseline))
+
+
+def run(case: str, size_mb: int, workdir: str):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(case, size_mb, workdir, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500], help="Upload sizes in MB")
+    parser.add_argument("--workdir", default=None, help="Directory to write into (default: system temp)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.gettempdir()
+    print(f"{'case':<10} {'size':>7} {'latency':>10} {'MB/s':>8} {'peak RSS':>10} {'growth':>9}")
+    for size_mb in args.sizes:
+        for case in ("legacy", "multipart", "streaming"):
+            elapsed, peak, growth = run(case, size_mb, workdir)
+            print(f"{case:<10} {size_mb:>5}MB {elapsed:>9.2f}s {size_mb / elapsed:>8.0f} {peak:>8.1f}MB {growth:>7.1f}MB")
@@ -0,0 +1,123 @@
+"""
+Live WebSocket analysis (needs ultralytics + the YOLO weights).
+
+    python -m benchmarks.bench_live --fps 30 --seconds 20
+    python -m benchmarks.bench_live --video clip.mp4 --fps 60
+    LIVE_MAX_PENDING_FRAMES=2 python -m benchmarks.bench_live --fps 60
+
+Streams JPEG frames into /analyze/live at the target frame rate from a
+sender thread (like a pitch-side camera that never waits for the server)
+and reports per-frame end-to-end latency (frame received -> metrics pushed)
+plus how many frames were processed vs dropped. When the model can't keep
+up, dropped frames go up while latency should stay flat.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks import DEFAULT_DATABASE_URL
+
+if os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'live.db')}"
+
+import cv2
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.db.session import SessionLocal
+from app.main import app
+from app.models.user import User
+
+EMAIL = "live@bench"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+def encoded_frames(video_path, count: int, size=(640, 480)):
+    """JPEG frames from a clip (looped), or a synthetic moving blob without one."""
+    frames = []
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < count:
+            ok, frame = cap.read()
+            if not ok:
+                if not frames:
+                    raise SystemExit(f"Could not read {video_path}")
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            frames.append(cv2.imencode(".jpg", frame)[1].tobytes())
+        cap.release()
+        return frames
+
+    for i in range(count):
+        frame = np.full((size[1], size[0], 3), 40, np.uint8)
+        x = 100 + (i * 5) % (size[0] - 200)
+        cv2.rectangle(frame, (x, 100), (x + 60, 400), (200, 180, 160), -1)
+        frames.append(cv2.imencode(".jpg", frame)[1].tobytes())
+    return frames
+
+
+def run(frames, fps: float):
+    with TestClient(app) as client:  # Startup creates the tables
+        with SessionLocal() as db:
+            if not db.query(User).filter(User.email == EMAIL).first():
+                db.add(User(email=EMAIL, hashed_password="x", role="athlete"))
+                db.commit()
+        token = create_access_token(data={"sub": EMAIL})
+
+        with client.websocket_connect(f"/api/v1/analytics/analyze/live?token={token}&fps={fps}") as ws:
+            def send():
+                interval = 1 / fps
+                start = time.perf_counter()
+                for i, data in enumerate(frames):
+                    delay = start + i * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    ws.send_bytes(data)
+
+            sender = threading.Thread(target=send)
+            start = time.perf_counter()
+            sender.start()
+
+            # Drop-oldest never drops the newest frame, so the last push carries frame == len(frames)
+            latencies, reports, last = [], 0, None
+            while last is None or last["frame"] < len(frames):
+                message = ws.receive_json()
+                if message["type"] == "report":
+                    reports += 1
+                    continue
+                latencies.append(message["latency_ms"])
+                last = message
+            elapsed = time.perf_counter() - start
+            sender.join()
+
+            # Let the server store the session before the connection goes away
+            ws.send_text("end")
+            while ws.receive_json()["type"] != "summary":
+                pass
+
+    return {"latencies": latencies, "last": last, "reports": reports, "elapsed": elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    frames = encoded_frames(args.video, int(args.fps * args.seconds))
+    result = run(frames, args.fps)
+    last, latencies = result["last"], result["latencies"]
+    processed = last["received"] - last["dropped"]
+    print(f"{len(frames)} frames at {args.fps:g} fps ({result['elapsed']:.1f}s wall)")
+    print(f"processed {processed} ({processed / result['elapsed']:.1f}/s)   dropped {last['dropped']} "
+          f"({last['dropped'] / len(frames):.1%})   metrics pushes {len(latencies)}   report pushes {result['reports']}")
+    print(f"end-to-end latency p50 {percentile(latencies, 50):.1f} ms   p99 {percentile(latencies, 99):.1f} ms   "
+          f"max {max(latencies):.1f} ms")
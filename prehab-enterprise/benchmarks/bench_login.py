@@ -0,0 +1,103 @@
+"""
+Login burst: p50/p99 latency of N concurrent /auth/login calls, plus the
+latency of a cheap endpoint (GET /) probed while the burst is running.
+
+    python -m benchmarks.bench_login --concurrency 200
+    python -m benchmarks.bench_login --rounds 10 --workers 2 --max-pending 50
+    python -m benchmarks.bench_login --seed-rounds 10   # hashes stored at a lower cost -> rehash on login
+
+Runs app.main in-process (httpx ASGI transport, one event loop) against a
+throwaway SQLite database. Requests rejected with 429 are counted separately.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import DEFAULT_DATABASE_URL
+
+if os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'login.db')}"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--seed-rounds", type=int, default=None, help="Cost of the stored hashes (default: --rounds)")
+    parser.add_argument("--workers", type=int, default=None, help="BCRYPT_WORKERS")
+    parser.add_argument("--max-pending", type=int, default=None, help="BCRYPT_MAX_PENDING")
+    return parser.parse_args()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+async def main(args):
+    import bcrypt
+    import httpx
+    from app.db.session import SessionLocal
+    from app.main import app
+    from app.models.user import User
+
+    password = "correct horse battery staple"
+    stored = bcrypt.hashpw(password.encode(), bcrypt.gensalt(args.seed_rounds or args.rounds)).decode()
+
+    async with app.router.lifespan_context(app):
+        with SessionLocal() as db:
+            db.add_all([
+                User(email=f"login{i}@bench", hashed_password=stored, role="athlete")
+                for i in range(args.concurrency)
+            ])
+            db.commit()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def login(i):
+                start = time.perf_counter()
+                res = await client.post(
+                    "/api/v1/auth/login", data={"username": f"login{i}@bench", "password": password}
+                )
+                return res.status_code, time.perf_counter() - start
+
+            probes = []
+            done = asyncio.Event()
+
+            async def probe():
+                while not done.is_set():
+                    start = time.perf_counter()
+                    (await client.get("/")).raise_for_status()
+                    probes.append(time.perf_counter() - start)
+                    await asyncio.sleep(0.01)
+
+            prober = asyncio.create_task(probe())
+            start = time.perf_counter()
+            results = await asyncio.gather(*(login(i) for i in range(args.concurrency)))
+            wall = time.perf_counter() - start
+            done.set()
+            await prober
+
+    ok = [t for code, t in results if code == 200]
+    rejected = sum(1 for code, _ in results if code == 429)
+    other = len(results) - len(ok) - rejected
+    print(f"{args.concurrency} concurrent logins (cost {args.rounds}, stored {args.seed_rounds or args.rounds}) in {wall:.2f}s")
+    print(f"  ok       : {len(ok):5d}   p50 {percentile(ok, 50) * 1000:8.1f} ms   p99 {percentile(ok, 99) * 1000:8.1f} ms")
+    print(f"  429      : {rejected:5d}")
+    if other:
+        print(f"  other    : {other:5d}", file=sys.stderr)
+    print(f"  GET / during burst ({len(probes)} probes): p50 {percentile(probes, 50) * 1000:.1f} ms   "
+          f"p99 {percentile(probes, 99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.workers is not None:
+        os.environ["BCRYPT_WORKERS"] = str(args.workers)
+    if args.max_pending is not None:
+        os.environ["BCRYPT_MAX_PENDING"] = str(args.max_pending)
+    asyncio.run(main(args))
@@ -0,0 +1,91 @@
+"""
+Instrumentation overhead: request latency with METRICS_ENABLED off vs on.
+
+    python -m benchmarks.bench_metrics --requests 2000 --runs 3
+
+Each run is a fresh interpreter (the flag is read at import) that times
+GET /api/v1/analytics/squad/acwr (route match, JWT and a few DB queries,
+so the middleware and the engine listeners both fire) and a bare
+Histogram.observe() call.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r"""
+import json, sys, time
+from fastapi.testclient import TestClient
+from app.core import metrics
+from app.core.security import create_access_token
+from app.db.session import SessionLocal
+from app.main import app
+from app.models.metrics import BiometricLog
+from app.models.user import User
+
+requests = int(sys.argv[1])
+with TestClient(app) as client:
+    with SessionLocal() as db:
+        if not db.query(User).filter(User.email == "metrics@bench").first():
+            db.add(User(email="metrics@bench", hashed_password="x", role="coach", organization_id=1))
+            db.commit()
+    headers = {"Authorization": "Bearer " + create_access_token(data={"sub": "metrics@bench"})}
+    for _ in range(50):
+        client.get("/api/v1/analytics/squad/acwr", headers=headers)
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        assert client.get("/api/v1/analytics/squad/acwr", headers=headers).status_code == 200
+        latencies.append(time.perf_counter() - start)
+    scrape = client.get("/metrics")
+
+start = time.perf_counter()
+for _ in range(100000):
+    metrics.db_query_seconds.observe(0.003, "sync", "SELECT")
+observe = (time.perf_counter() - start) / 100000
+
+print(json.dumps({
+    "latencies": latencies, "observe": observe,
+    "scrape_status": scrape.status_code, "scrape_bytes": len(scrape.content),
+}))
+"""
+
+
+def run_once(enabled: bool, requests: int, database_url: str) -> dict:
+    env = {**os.environ, "METRICS_ENABLED": "true" if enabled else "false", "DATABASE_URL": database_url}
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, str(requests)], capture_output=True, text=True, check=True, env=env,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'metrics.db')}"
+    results = {False: [], True: []}
+    for _ in range(args.runs):  # Interleaved so drift hits both modes alike
+        for enabled in (False, True):
+            results[enabled].append(run_once(enabled, args.requests, database_url))
+
+    medians = {}
+    for enabled, runs in results.items():
+        latencies = [ms * 1000 for run in runs for ms in run["latencies"]]
+        medians[enabled] = statistics.median(latencies)
+        observe_ns = statistics.median(run["observe"] for run in runs) * 1e9
+        print(f"metrics {'on ' if enabled else 'off'}: p50 {medians[enabled]:.3f} ms   "
+              f"p99 {percentile(latencies, 99):.3f} ms   observe() {observe_ns:,.0f} ns   "
+              f"/metrics -> {runs[-1]['scrape_status']} ({runs[-1]['scrape_bytes']:,} bytes)")
+    print(f"overhead when on: {medians[True] - medians[False]:+.3f} ms/request "
+          f"({(medians[True] / medians[False] - 1):+.1%})")
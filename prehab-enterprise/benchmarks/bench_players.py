@@ -0,0 +1,173 @@
+"""
+Multi-athlete clips: one tracked pass vs one upload per athlete.
+
+    python -m benchmarks.bench_players --athletes 6 --seconds 30
+    python -m benchmarks.bench_players --video drill.mp4   # + the real model end to end (needs ultralytics)
+
+Synthetic drill: `--athletes` runners side by side (the detector's person
+order shuffled every frame, the whole squad drifting across the image, one
+runner hidden for half a second). Reports identity purity (share of each
+runner's frames on their majority track), checks every player's report
+against a single-athlete GaitTracker fed only that runner, and times the
+post-inference stage of the tracked pass against N single-athlete passes.
+Total cost adds --infer-ms of model time per inferred frame (once for the
+tracked pass, once per athlete for separate uploads). With --video the clip goes through analyze_players() once vs analyze_video()
+once per athlete found, which is what N trimmed uploads would cost at best.
+"""
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.core.gait import GaitTracker
+from app.core.tracking import PersonTracker, PlayerTracker
+from app.core.vision_engine import VisionEngine
+from benchmarks.bench_gait import FPS, SAMPLE_EVERY, runner
+
+LANE_PX = 180            # Distance between neighbouring runners
+DRIFT_PX_PER_SECOND = 40 # Camera pan: everybody moves across the image together
+HIDDEN = (3.0, 3.5)      # Seconds during which runner 1 is out of frame
+
+
+def drill(athletes: int, seconds: float, seed: int = 0):
+    """Per sampled frame: (frame_index, people (P, 17, 3) in shuffled order, runner index of each row)."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * FPS / SAMPLE_EVERY)
+    streams = [runner(n, seed=seed + a) for a in range(athletes)]
+    frames = []
+    for samples in zip(*streams):
+        frame_index = samples[0][0]
+        t = frame_index / FPS
+        people, owners = [], []
+        for a, (_, _, noisy) in enumerate(samples):
+            if a == 1 and HIDDEN[0] <= t < HIDDEN[1]:
+                continue
+            person = noisy.copy()
+            person[:, 0] += a * LANE_PX + DRIFT_PX_PER_SECOND * t
+            people.append(person)
+            owners.append(a)
+        order = rng.permutation(len(people))
+        frames.append((frame_index, np.stack(people)[order], [owners[i] for i in order]))
+    return frames
+
+
+def tracked_pass(frames, batch: int = 16) -> PlayerTracker:
+    tracker = PlayerTracker(FPS)
+    for start in range(0, len(frames), batch):
+        chunk = frames[start:start + batch]
+        tracker.update([f for f, _, _ in chunk], [people for _, people, _ in chunk])
+    return tracker
+
+
+def identities(frames) -> Counter:
+    """(runner, track id) -> samples, from a fresh PersonTracker (same deterministic matching as the pass)."""
+    people_tracker = PersonTracker(FPS)
+    assigned = Counter()
+    for frame_index, people, owners in frames:
+        ids, _ = people_tracker.update(frame_index, people)
+        for owner, track_id in zip(owners, ids.tolist()):
+            assigned[(owner, track_id)] += 1
+    return assigned
+
+
+def single_passes(frames, athletes: int, batch: int = 16):
+    """Reference: one GaitTracker per runner fed only that runner's keypoints (= N trimmed uploads)."""
+    trackers = []
+    for a in range(athletes):
+        rows = [(f, people[owners.index(a)]) for f, people, owners in frames if a in owners]
+        tracker = GaitTracker(FPS)
+        for start in range(0, len(rows), batch):
+            chunk = rows[start:start + batch]
+            tracker.update([f for f, _ in chunk], np.stack([k for _, k in chunk]))
+        trackers.append(tracker)
+    return trackers
+
+
+def report(summary: dict) -> dict:
+    return VisionEngine.score_extracted({"summary": summary, "frames": None}, record=False)
+
+
+def same(a, b) -> bool:
+    """Equal up to float summation order (rows are aggregated in differently composed batches)."""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return bool(np.isclose(a, b, rtol=1e-9, atol=1e-12))
+    return a == b
+
+
+def bench_synthetic(athletes: int, seconds: float, infer_ms: float):
+    frames = drill(athletes, seconds)
+
+    start = time.perf_counter()
+    tracker = tracked_pass(frames)
+    tracked_seconds = time.perf_counter() - start
+    assigned = identities(frames)
+    start = time.perf_counter()
+    references = single_passes(frames, athletes)
+    single_seconds = time.perf_counter() - start
+
+    # 1. Identity purity: how much of each runner lives on one track
+    purity, majority = [], {}
+    for a in range(athletes):
+        counts = {track_id: n for (owner, track_id), n in assigned.items() if owner == a}
+        track_id, n = max(counts.items(), key=lambda item: item[1])
+        majority[a] = track_id
+        purity.append(n / sum(counts.values()))
+    print(f"{athletes} athletes, {len(frames)} sampled frames: {tracker.people.next_id - 1} track ids opened, "
+          f"identity purity min {min(purity):.1%} mean {np.mean(purity):.1%}")
+
+    # 2. Per-player report vs the single-athlete reference (exact when identities are clean)
+    players = {p["track_id"]: p for p in tracker.summaries(min_frames=1)}
+    mismatches = 0
+    for a, reference in enumerate(references):
+        player = players.get(majority[a])
+        ok = player is not None and same(report(player["summary"]), report(reference.summary()))
+        mismatches += not ok
+    print(f"per-player vs single  : {'identical' if not mismatches else f'{mismatches} DIFFER'} "
+          f"(valgus / hip / foot strike / gait per athlete)")
+    print(f"post-inference stage  : tracked pass {tracked_seconds * 1000:.0f} ms   "
+          f"{athletes} single passes {single_seconds * 1000:.0f} ms")
+    inference = len(frames) * infer_ms / 1000
+    tracked_total = inference + tracked_seconds
+    single_total = athletes * inference + single_seconds
+    print(f"total @ {infer_ms:g} ms/frame : tracked {tracked_total:.1f}s   {athletes} uploads {single_total:.1f}s "
+          f"({single_total / tracked_total:.1f}x)")
+    return mismatches
+
+
+def bench_video(video_path: str):
+    engine = VisionEngine()
+    engine.analyze_video(video_path)  # Warm up model/kernels
+
+    start = time.perf_counter()
+    results = engine.analyze_players(video_path)
+    players_seconds = time.perf_counter() - start
+    n = len(results["players"])
+    start = time.perf_counter()
+    for _ in range(n):
+        engine.analyze_video(video_path)
+    single_seconds = time.perf_counter() - start
+    print(f"{video_path}: {n} players ({results['frames']['tracks']} track ids)   analyze_players {players_seconds:.2f}s   "
+          f"{n} x analyze_video {single_seconds:.2f}s ({single_seconds / max(players_seconds, 1e-9):.1f}x)")
+    for player in results["players"]:
+        print(f"  track {player['track_id']:>3}: frames {player['first_frame']}-{player['last_frame']} "
+              f"valgus {player['valgus']:.1f}  {player['hip_rotation']}  {player['foot_strike']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--athletes", type=int, default=6)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--infer-ms", type=float, default=25.0, help="Model time per frame (yolov8n-pose, CPU ballpark)")
+    parser.add_argument("--video", default=None)
+    args = parser.parse_args()
+
+    failures = bench_synthetic(args.athletes, args.seconds, args.infer_ms)
+    if args.video:
+        bench_video(args.video)
+    if failures:
+        raise SystemExit("Per-player reports differ from single-athlete analysis")
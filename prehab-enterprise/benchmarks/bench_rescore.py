@@ -0,0 +1,158 @@
+"""
+Re-scoring from stored keypoint tracks vs re-running the pose model.
+
+    python -m benchmarks.bench_rescore --tracks 2000 --seconds 60
+    python -m benchmarks.bench_rescore --video clip.mp4   # + real re-inference (needs ultralytics)
+
+Stores `--tracks` synthetic runner clips (float32 memmap tracks + DB rows
+linked to a BiometricLog each), runs the re-score job over all of them and
+reports tracks/sec, frames/sec and bytes on disk per clip. The runner is
+placed at the far corner of a 4K frame, and scores from the stored tracks
+(and from a float16 cast, the old format) are checked against the
+full-precision keypoints. With --video the
+clip is analyzed for real, its track stored, and the per-clip re-score time
+is compared with re-inference.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks import DEFAULT_DATABASE_URL
+
+if os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'rescore.db')}"
+
+import numpy as np
+
+from app.core.vision_engine import VisionEngine
+from app.db.base_class import Base
+from app.db.session import SessionLocal, engine
+from app.models.metrics import BiometricLog, KeypointTrack
+from app.models.user import User
+from app.services import biometric_store
+from app.services.analysis_service import AnalysisService
+from app.services.track_store import TrackStore, rescore_tracks
+from benchmarks.bench_gait import FPS, SAMPLE_EVERY, runner
+
+analyzer = AnalysisService()
+PLACEMENT = (3200.0, 1600.0) # Runner offset in pixels: far corner of a 3840x2160 frame
+
+
+def synthetic_track(seconds: float, seed: int) -> dict:
+    samples = list(runner(int(seconds * FPS / SAMPLE_EVERY), seed=seed))
+    keypoints = np.stack([noisy for _, _, noisy in samples])  # Full precision (float64)
+    keypoints[:, :, :2] += PLACEMENT
+    return {
+        "fps": FPS,
+        "frames": np.array([frame_index for frame_index, _, _ in samples], dtype=np.int32),
+        "keypoints": keypoints,
+    }
+
+
+def frame_counters(track: dict) -> dict:
+    n = len(track["frames"])
+    return {"total": n * SAMPLE_EVERY, "decoded": n, "inferred": n, "with_pose": n, "sampling": "stride"}
+
+
+def store_track(db, store: TrackStore, user: User, sha256: str, extractor: str, track: dict, vision_results: dict):
+    """What the upload path does: report -> BiometricLog, keypoints -> TrackStore + KeypointTrack."""
+    data = analyzer.input_from_vision(vision_results)
+    report = analyzer.build_report(user, data)
+    stored = store.store(sha256, extractor, vision_results, track)
+    biometric_store.save_report(db, user, data, report, stored)
+
+
+def seed(store: TrackStore, n: int, seconds: float) -> list:
+    """n stored clips (a handful of distinct motions, varied jitter) spread over 50 athletes."""
+    tracks = []
+    with SessionLocal() as db:
+        users = [User(email=f"rescore{i}@bench", hashed_password="x", role="athlete") for i in range(50)]
+        db.add_all(users)
+        db.commit()
+        for i in range(n):
+            track = synthetic_track(seconds, seed=i)
+            frames = frame_counters(track)
+            vision_results = VisionEngine.score_track(track["frames"], track["keypoints"], FPS, frames)
+            vision_results["frames"] = frames
+            store_track(db, store, users[i % len(users)], f"{i:064x}", "bench|synthetic", track, vision_results)
+            if i < 20:
+                tracks.append(track)
+    return tracks
+
+
+def check_precision(store: TrackStore, tracks: list):
+    """Scores from the stored memmaps (and a float16 cast) vs the full-precision keypoints they came from."""
+    keys = ("valgus", "hip_ratio", "shin_angle", "head_forward_angle")
+    worst = {"stored": dict.fromkeys(keys, 0.0), "float16": dict.fromkeys(keys, 0.0)}
+    labels_equal = True
+    for i, track in enumerate(tracks):
+        frames = frame_counters(track)
+        exact = VisionEngine.score_track(track["frames"], track["keypoints"], FPS, frames)
+        stored = store.open(TrackStore.key(f"{i:064x}", "bench|synthetic"))
+        scored = {
+            "stored": VisionEngine.score_track(stored.frames, stored.keypoints, stored.meta["fps"], stored.meta["frames"]),
+            "float16": VisionEngine.score_track(track["frames"], track["keypoints"].astype(np.float16), FPS, frames),
+        }
+        for name, approx in scored.items():
+            for key in keys:
+                worst[name][key] = max(worst[name][key], abs(exact[key] - approx[key]))
+        labels_equal &= all(exact[key] == scored["stored"][key] for key in ("hip_rotation", "foot_strike"))
+    print(f"{stored.keypoints.dtype} vs float64    : labels {'identical' if labels_equal else 'DIFFER'}   max abs diff "
+          + "  ".join(f"{key} {value:.4f}" for key, value in worst["stored"].items()))
+    print(f"(float16 vs float64   :                    max abs diff "
+          + "  ".join(f"{key} {value:.4f}" for key, value in worst["float16"].items()) + ")")
+    return 0 if labels_equal else 1
+
+
+def bench_video(store: TrackStore, video_path: str):
+    vision = VisionEngine()
+    vision.analyze_video(video_path)  # Warm up model/kernels
+
+    start = time.perf_counter()
+    vision_results = vision.analyze_video(video_path, keep_track=True)
+    inference_seconds = time.perf_counter() - start
+    track = vision_results.pop("track")
+    with SessionLocal() as db:
+        user = User(email="rescore-video@bench", hashed_password="x", role="athlete")
+        db.add(user)
+        db.commit()
+        store_track(db, store, user, "f" * 64, vision.extractor_version, track, vision_results)
+        track_id = db.query(KeypointTrack.id).filter(KeypointTrack.user_id == user.id).scalar()
+
+        start = time.perf_counter()
+        rescore_tracks(db, store, track_ids=[track_id])
+        rescore_seconds = time.perf_counter() - start
+
+    stored = store.open(TrackStore.key("f" * 64, vision.extractor_version))
+    rescored = VisionEngine.score_track(stored.frames, stored.keypoints, stored.meta["fps"], stored.meta["frames"])
+    print(f"{video_path}: re-inference {inference_seconds:.2f}s   re-score {rescore_seconds * 1000:.1f} ms "
+          f"({inference_seconds / rescore_seconds:,.0f}x)   valgus {vision_results['valgus']:.2f} -> {rescored['valgus']:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tracks", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=60.0, help="Length of each synthetic clip")
+    parser.add_argument("--video", default=None)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    store = TrackStore(tempfile.mkdtemp())
+    tracks = seed(store, args.tracks, args.seconds)
+    disk = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(store.root) for name in names)
+    rows = sum(len(t["frames"]) for t in tracks) / len(tracks)
+    print(f"stored {args.tracks} clips of {args.seconds:g}s ({rows:.0f} frames each): "
+          f"{disk / args.tracks / 1024:.1f} KiB/clip on disk")
+
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        counts = rescore_tracks(db, store)
+        elapsed = time.perf_counter() - start
+    print(f"re-score job          : {counts}   {elapsed:.1f}s   {args.tracks / elapsed:,.1f} clips/sec   "
+          f"{args.tracks * rows / elapsed:,.0f} frames/sec")
+    failures = check_precision(store, tracks)
+    if args.video:
+        bench_video(store, args.video)
+    if failures:
+        raise SystemExit("stored tracks change the report labels")
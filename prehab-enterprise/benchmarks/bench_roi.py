@@ -0,0 +1,244 @@
+"""
+Downscale-on-decode and athlete ROI crops vs full-frame inference.
+
+    python -m benchmarks.bench_roi                        # synthetic 1080p clip, marker detector
+    python -m benchmarks.bench_roi --height 2160          # 4K
+    python -m benchmarks.bench_roi --video clip.mp4       # real model (needs ultralytics)
+
+Each clip goes through extract_metrics() three times: frames as decoded
+(today's path, the reference), downscaled to --max-side, and downscaled +
+ROI crops. Reported per inferred frame: decode (incl. the grab() of skipped
+frames), preprocessing and model time, how many frames were cropped / re-run whole, and the drift of the
+keypoints (original pixels) and of the report metrics from the reference.
+
+Without --video the clip is a bench_gait runner drawn at 40% of the frame
+height, crossing the pitch and back, out of frame for a second halfway.
+Its joints are coloured markers and the "model" finds them (median of the
+marker pixels after resizing its input to imgsz, as YOLO's letterbox does),
+so keypoint errors measure the resize/crop/mapping path exactly. Model time
+there = that resize (measured) + --infer-ms per 640x640 input, scaled by the
+letterboxed input area (crops go in at VISION_ROI_IMGSZ).
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.vision_engine import VisionEngine
+from benchmarks.bench_gait import FPS, SAMPLE_EVERY, runner
+
+SECONDS = 20.0
+HIDDEN = (9.0, 10.0)    # Seconds the athlete is out of frame
+VISIBLE = [3, 4, 5, 6, 11, 12, 13, 14, 15, 16]
+LEFT = [3, 5, 11, 13, 15]
+LEFT_OFFSET = 110       # Runner units: left joints drawn apart so no marker ever hides another
+# Marker colour per joint (BGR): G ~0 sets markers apart from the pitch and the limbs
+MARKERS = {j: (90 + 75 * (i // 4), 0, 20 + 78 * (i % 4)) for i, j in enumerate(VISIBLE)}
+METRICS = ("valgus", "hip_ratio", "shin_angle", "trunk_lean", "head_forward_angle")
+
+
+# === 1. SYNTHETIC CLIP + MARKER "MODEL" ===
+
+def placement(t: float, width: int, height: int):
+    """Runner units -> pixels at time t: (scale, x offset, y offset)."""
+    scale = 0.4 * height / 410
+    travel = (t / SECONDS * 2) % 2 # Across and back
+    x = width * (0.15 + 0.7 * (travel if travel <= 1 else 2 - travel))
+    return scale, x - 325 * scale, 0.45 * height - 60 * scale
+
+
+def synthetic_clip(path: str, width: int, height: int):
+    """Writes the clip; returns {frame_index: true (17, 3) keypoints in pixels} for the sampled frames."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), FPS, (width, height))
+    truth = {}
+    for frame_index, clean, _ in runner(int(SECONDS * FPS / SAMPLE_EVERY)):
+        t = frame_index / FPS
+        frame = np.full((height, width, 3), (60, 140, 60), dtype=np.uint8)
+        if not HIDDEN[0] <= t < HIDDEN[1]:
+            scale, dx, dy = placement(t, width, height)
+            kpts = clean.copy()
+            kpts[LEFT, 0] += LEFT_OFFSET
+            kpts[VISIBLE, 0] = kpts[VISIBLE, 0] * scale + dx
+            kpts[VISIBLE, 1] = clean[VISIBLE, 1] * scale + dy
+            truth[frame_index] = kpts
+            points = {j: (int(round(kpts[j, 0])), int(round(kpts[j, 1]))) for j in VISIBLE}
+            for a, b in ((5, 11), (6, 12), (11, 13), (13, 15), (12, 14), (14, 16), (5, 6), (11, 12)):
+                cv2.line(frame, points[a], points[b], (230, 230, 230), max(2, int(6 * scale)))
+            for j in VISIBLE:
+                cv2.circle(frame, points[j], max(4, int(10 * scale)), MARKERS[j], -1)
+        for _ in range(SAMPLE_EVERY):
+            writer.write(frame)
+    writer.release()
+    return truth
+
+
+class _Array:
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class _Keypoints:
+    def __init__(self, people):
+        self.data = _Array(people)
+
+    def __len__(self):
+        return len(self.data.array)
+
+
+class _Result:
+    def __init__(self, people):
+        self.keypoints = _Keypoints(people) if len(people) else None
+
+
+class MarkerModel:
+    """
+    Stands in for YOLO: resizes each input to imgsz like its letterbox does
+    (INTER_LINEAR, timed), finds one person whose joints are the median pixel
+    of each marker colour, and scales them back to input pixels.
+    """
+
+    def __init__(self, infer_ms: float):
+        self.infer_ms = infer_ms
+        self.modelled = 0.0 # Letterbox resize (measured) + network (modelled from the input area)
+
+    def __call__(self, images, verbose=False, imgsz=640):
+        results = []
+        for image in images:
+            start = time.perf_counter()
+            gain = imgsz / max(image.shape[:2])
+            if gain != 1:
+                size = (round(image.shape[1] * gain), round(image.shape[0] * gain))
+                image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+            self.modelled += time.perf_counter() - start
+            self.modelled += self.infer_ms / 1000 * letterboxed_area(image.shape, imgsz) / 640 ** 2
+
+            pixels = image.reshape(-1, 3).astype(np.int16)
+            ys, xs = np.divmod(np.flatnonzero(pixels[:, 1] < 30), image.shape[1])
+            colours = pixels[ys * image.shape[1] + xs]
+            person = np.zeros((17, 3), np.float32)
+            for j, colour in MARKERS.items():
+                hit = np.abs(colours - colour).max(axis=1) < 25
+                if hit.sum() >= 3:
+                    person[j] = ((np.median(xs[hit]) + 0.5) / gain, (np.median(ys[hit]) + 0.5) / gain, 0.9)
+            results.append(_Result(person[None] if (person[:, 2] > 0).sum() >= 4 else np.empty((0, 17, 3))))
+        return results
+
+
+def letterboxed_area(shape, imgsz: int) -> int:
+    """Model input pixels after YOLO's rectangular letterbox (long side = imgsz, short side padded to /32)."""
+    height, width = shape[:2]
+    short = min(height, width) * imgsz / max(height, width)
+    return imgsz * int(math.ceil(short / 32) * 32)
+
+
+# === 2. RUNS ===
+
+def configure(max_side, roi: bool):
+    settings.VISION_DECODE_MAX_SIDE = max_side
+    settings.VISION_ROI = roi
+
+
+def run(engine: VisionEngine, video_path: str) -> dict:
+    extracted = engine.extract_metrics(video_path, keep_track=True)
+    report = VisionEngine.score_extracted(extracted, record=False)
+    track = extracted["track"]
+    return {
+        "frames": extracted["frames"],
+        "timings": extracted["timings"],
+        "report": report,
+        "keypoints": dict(zip(track["frames"].tolist(), track["keypoints"].astype(np.float32))),
+    }
+
+
+def keypoint_error(result: dict, reference: dict, min_conf: float) -> np.ndarray:
+    """Pixel distances between matching confident joints of frames both runs found."""
+    errors = []
+    for frame_index, kpts in result["keypoints"].items():
+        other = reference.get(frame_index)
+        if other is None:
+            continue
+        seen = (kpts[:, 2] >= min_conf) & (other[:, 2] >= min_conf)
+        errors.extend(np.linalg.norm(kpts[seen, :2] - other[seen, :2], axis=1))
+    return np.array(errors)
+
+
+def describe(name: str, result: dict, reference: dict, truth: dict, model_seconds: float):
+    frames, timings = result["frames"], result["timings"]
+    n = max(1, frames["inferred"])
+    decode_ms, prep_ms = timings["decode"] * 1000 / n, timings["preprocess"] * 1000 / n
+    model_ms = model_seconds * 1000 / n
+    line = (f"  {name:<10}: decode {decode_ms:6.2f}  preprocess {prep_ms:5.2f}  model {model_ms:6.2f}  "
+            f"= {decode_ms + prep_ms + model_ms:6.2f} ms/frame   pose {frames['with_pose']}/{frames['inferred']}   "
+            f"cropped {frames['cropped']} retried {frames['retried']}")
+    print(line)
+    min_conf = settings.VISION_MIN_KEYPOINT_CONF
+    drift = keypoint_error(result, reference["keypoints"], min_conf)
+    parts = [f"keypoints vs full frame: mean {drift.mean():.2f} px  p95 {np.percentile(drift, 95):.2f} px"] if len(drift) else []
+    if truth:
+        error = keypoint_error(result, truth, min_conf)
+        parts.append(f"vs truth: mean {error.mean():.2f} px  p95 {np.percentile(error, 95):.2f} px")
+    print("               " + "   ".join(parts))
+    deltas = {m: result["report"][m] - reference["report"][m] for m in METRICS}
+    strides = result["report"]["gait"]["stride_count"] - reference["report"]["gait"]["stride_count"]
+    print("               metric deltas: " + "  ".join(f"{m} {d:+.3f}" for m, d in deltas.items()) + f"  strides {strides:+d}")
+    return deltas
+
+
+def bench(video_path: str, engine_factory, max_side: int, truth: dict):
+    """engine_factory() -> (engine, modelled model seconds so far, or None to use the measured inference time)."""
+    configs = [("full", None, False), (f"max {max_side}", max_side, False), ("roi", max_side, True)]
+    results, seconds = {}, {}
+    for name, side, roi in configs:
+        configure(side, roi)
+        engine, model_time = engine_factory()
+        run(engine, video_path) # Warm up (model load, page cache)
+        before = model_time() if model_time else 0.0
+        results[name] = run(engine, video_path)
+        seconds[name] = model_time() - before if model_time else results[name]["timings"]["inference"]
+    worst = {}
+    for name, _, _ in configs:
+        deltas = describe(name, results[name], results["full"], truth, seconds[name])
+        for metric, delta in deltas.items():
+            worst[metric] = max(worst.get(metric, 0.0), abs(delta))
+    return worst
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video", default=None, help="Real clip, one athlete (needs ultralytics)")
+    parser.add_argument("--height", type=int, default=1080, help="Synthetic clip height (16:9)")
+    parser.add_argument("--max-side", type=int, default=640, help="VISION_DECODE_MAX_SIDE for the scaled runs")
+    parser.add_argument("--infer-ms", type=float, default=25.0, help="Modelled model time per 640x640 input (synthetic)")
+    args = parser.parse_args()
+
+    if args.video:
+        print(f"{args.video}: {settings.VISION_MODEL_NAME} on {VisionEngine().backend.name}, "
+              f"crops at imgsz {settings.VISION_ROI_IMGSZ}")
+        bench(args.video, lambda: (VisionEngine(), None), args.max_side, {})
+    else:
+        width = args.height * 16 // 9
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "roi.mp4")
+            truth = synthetic_clip(path, width, args.height)
+
+            def marker_engine():
+                engine = VisionEngine()
+                engine._model = model = MarkerModel(args.infer_ms)
+                return engine, lambda: model.modelled
+
+            print(f"synthetic {width}x{args.height}, {SECONDS:g}s, {len(truth)} sampled frames with the athlete, "
+                  f"model time modelled at {args.infer_ms:g} ms per 640x640 input")
+            worst = bench(path, marker_engine, args.max_side, truth)
+        if worst["valgus"] > 3.0 or worst["hip_ratio"] > 0.01 or worst["shin_angle"] > 3.0:
+            raise SystemExit("ROI / downscaled metrics drift from full-frame inference")
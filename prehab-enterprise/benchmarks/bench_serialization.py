@@ -0,0 +1,138 @@
+"""
+Report serialization: what a report response costs once the rules have run.
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --squad 1000 --repeat 200
+
+For a single report (/analyze) and a squad of --squad reports (/squad/analyze):
+
+- validated   : what FastAPI does with response_model and the default
+                response class (validate into AnalysisResponse, dump_json)
+- orjson      : FastJSONResponse.render() of the engine's dicts, as the
+                report endpoints now return them
+- pydantic-core: the same without orjson installed (to_json fallback)
+- compact     : ?compact=true (codes only) through FastJSONResponse
+
+Reported: µs per response and payload bytes (end to end, the squad call is
+timed by benchmarks.bench_squad and benchmarks.suite). Exits non-zero if the
+payloads don't decode to the same reports, or if a compact report's codes
+don't resolve to its alerts through GET /codes.
+"""
+import argparse
+import gc
+import json
+import random
+import time
+
+from pydantic import TypeAdapter
+
+import app.api.responses as responses
+from app.api.responses import FastJSONResponse, compact_report
+from app.core.risk_rules import rule_engine
+from app.schemas.analytics import AnalysisResponse, SquadAnalysisResponse
+from benchmarks.bench_rules import random_case
+
+PAIRS = (("alerts", "alert"), ("recommendations", "recommendation"))
+
+
+def best_of(fn, repeat: int) -> float:
+    """Best time of `repeat` calls, GC paused."""
+    times = []
+    gc.collect()
+    gc.disable()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    gc.enable()
+    return min(times)
+
+
+# === 1. ENCODERS ===
+
+def validated(adapter: TypeAdapter):
+    """FastAPI 0.1xx's default path for a route with response_model."""
+    return lambda content: adapter.dump_json(adapter.validate_python(content))
+
+
+def fast_json(content) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def pydantic_core_json(content) -> bytes:
+    orjson, responses.orjson = responses.orjson, None
+    try:
+        return FastJSONResponse(content).body
+    finally:
+        responses.orjson = orjson
+
+
+def compact(content) -> bytes:
+    if "reports" in content:
+        return FastJSONResponse({"reports": [compact_report(r) for r in content["reports"]]}).body
+    return FastJSONResponse(compact_report(content)).body
+
+
+# === 2. CHECKS ===
+
+def check_parity(content, encoders) -> int:
+    reference = json.loads(encoders["validated"](content))
+    mismatches = 0
+    for name in ("orjson", "pydantic-core"):
+        if responses.orjson is None and name == "orjson":
+            continue
+        if json.loads(encoders[name](content)) != reference:
+            print(f"  {name}: payload differs from the validated one")
+            mismatches += 1
+    return mismatches
+
+
+def check_catalogue(reports) -> int:
+    """Codes + GET /codes give back the full report's texts."""
+    catalogue = rule_engine.catalogue(None)
+    mismatches = 0
+    for report in reports:
+        codes = compact_report(report)["codes"]
+        texts = catalogue[report["report_type"]]
+        for field, key in PAIRS:
+            mismatches += [texts[code][key] for code in codes] != report[field]
+    print(f"codes -> catalogue    : {'OK' if not mismatches else f'{mismatches} MISMATCHES'} ({len(reports)} reports)")
+    return mismatches
+
+
+# === 3. RUNS ===
+
+def bench(label: str, content, adapter: TypeAdapter, repeat: int) -> int:
+    encoders = {
+        "validated": validated(adapter),
+        "orjson": fast_json,
+        "pydantic-core": pydantic_core_json,
+        "compact": compact,
+    }
+    if responses.orjson is None:
+        del encoders["orjson"]
+    print(label)
+    baseline = None
+    for name, encode in encoders.items():
+        seconds = best_of(lambda: encode(content), repeat)
+        baseline = baseline or seconds
+        size = len(encode(content))
+        print(f"  {name:<14}: {seconds * 1e6:10.1f} µs   {size:>9,} bytes   x{baseline / seconds:5.1f}")
+    return check_parity(content, encoders)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--squad", type=int, default=1000, help="Reports in the squad response")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    random.seed(0)
+
+    users, inputs = zip(*(random_case(i) for i in range(args.squad)))
+    reports = rule_engine.evaluate_batch(list(users), list(inputs))
+    print(f"encoder: {'orjson' if responses.orjson is not None else 'pydantic-core (orjson not installed)'}")
+    failures = bench("1 report (/analyze)", reports[0], TypeAdapter(AnalysisResponse), args.repeat * 100)
+    failures += bench(f"{args.squad} reports (/squad/analyze)", {"reports": reports}, TypeAdapter(SquadAnalysisResponse), args.repeat)
+    failures += check_catalogue(reports)
+    if failures:
+        raise SystemExit("Report payloads differ between encoders")
@@ -0,0 +1,86 @@
+"""
+Squad analysis throughput: one /squad/analyze call vs N single /analyze calls.
+
+    python -m benchmarks.bench_squad --athletes 500
+
+Runs app.main in-process (TestClient) against a throwaway SQLite database.
+Both paths include auth, the DB user lookup and report persistence.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks import DEFAULT_DATABASE_URL
+
+if os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'squad.db')}"
+
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.db.session import SessionLocal
+from app.main import app
+from app.models.user import Organization, User
+
+
+def random_input():
+    return {
+        "mechanics": {
+            "knee_valgus_angle": random.uniform(0, 30),
+            "hip_internal_rotation": random.choice(["Normal", "Excessive Internal Rotation"]),
+            "foot_strike_pattern": random.choice(["Midfoot/Forefoot", "Heel Strike (Overstride)"]),
+        },
+        "load_metrics": {"acwr": random.uniform(0.6, 1.8)},
+    }
+
+
+def seed(athletes: int):
+    with SessionLocal() as db:
+        org = Organization(name=f"Bench FC {time.time()}", subscription_tier="pro")
+        db.add(org)
+        db.flush()
+        coach = User(email=f"coach-{org.id}@bench", hashed_password="x", role="coach", organization_id=org.id)
+        squad = [
+            User(email=f"p{i}-{org.id}@bench", hashed_password="x", role="athlete", organization_id=org.id)
+            for i in range(athletes)
+        ]
+        db.add_all([coach, *squad])
+        db.commit()
+        return coach.email, [(u.id, u.email) for u in squad]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--athletes", type=int, default=500)
+    args = parser.parse_args()
+    random.seed(0)
+
+    with TestClient(app) as client:
+        coach_email, squad = seed(args.athletes)
+        inputs = [random_input() for _ in squad]
+        prefix = "/api/v1/analytics"
+
+        # A. N single calls, each with that athlete's own token
+        tokens = [create_access_token({"sub": email}) for _, email in squad]
+        start = time.perf_counter()
+        singles = []
+        for token, data in zip(tokens, inputs):
+            res = client.post(f"{prefix}/analyze", json=data, headers={"Authorization": f"Bearer {token}"})
+            singles.append(res.json())
+        t_single = time.perf_counter() - start
+
+        # B. One squad call from the coach
+        body = {"athletes": [{"user_id": uid, "data": data} for (uid, _), data in zip(squad, inputs)]}
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': coach_email})}"}
+        start = time.perf_counter()
+        res = client.post(f"{prefix}/squad/analyze", json=body, headers=headers)
+        t_squad = time.perf_counter() - start
+        res.raise_for_status()
+
+        assert res.json()["reports"] == singles, "Squad reports differ from single-call reports"
+        n = len(squad)
+        print(f"{n} single /analyze calls : {t_single:7.2f}s  ({n / t_single:8.0f} reports/sec)")
+        print(f"1 /squad/analyze call    : {t_squad:7.2f}s  ({n / t_squad:8.0f} reports/sec, {t_single / t_squad:.0f}x)")
+        print("parity                   : OK")
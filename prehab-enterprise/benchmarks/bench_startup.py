@@ -0,0 +1,52 @@
+"""
+API import-time and startup-time benchmark.
+
+    python -m benchmarks.bench_startup --runs 5
+
+Each run is a fresh interpreter that imports app.main, then enters the
+app lifespan (table creation + optional warmup). Reports wall times, peak
+RSS, and which heavy vision modules ended up imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app):
+    started = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "startup": started - imported,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": sorted(m for m in ("torch", "ultralytics", "cv2") if m in sys.modules),
+}))
+"""
+
+
+def run_once() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True, text=True, check=True, env=os.environ.copy(),
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    for key, label in (("import", "import app.main"), ("startup", "lifespan startup")):
+        values = [r[key] * 1000 for r in runs]
+        print(f"{label:<18}: median {statistics.median(values):8.1f} ms   max {max(values):8.1f} ms")
+    print(f"{'peak RSS':<18}: median {statistics.median(r['rss_mb'] for r in runs):8.1f} MB")
+    print(f"{'heavy modules':<18}: {runs[-1]['heavy'] or 'none'}")
@@ -0,0 +1,147 @@
+"""
+Per-frame vs batched VisionEngine benchmark.
+
+    python -m benchmarks.bench_vision_batch                  # metric extraction only (no model)
+    python -m benchmarks.bench_vision_batch --video clip.mp4 # full pipeline with YOLO
+
+Reports frames/sec for the legacy right-leg scalar loop and the vectorized
+bilateral pass (8 metrics per frame), and fails if the right-leg columns
+disagree numerically with the legacy loop, or if a metric changes when only
+the keypoint confidences do (left/right are averaged by confidence).
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.core.biomechanics import COLUMN, compute_joint_metrics
+
+
+def synthetic_keypoints(n_frames: int, seed: int = 0) -> np.ndarray:
+    """Plausible running keypoints with ~5% dropped knees (YOLO style: (0, 0), conf 0)."""
+    rng = np.random.default_rng(seed)
+    kpts = rng.uniform(50, 600, size=(n_frames, 17, 3)).astype(np.float32)
+    kpts[:, :, 2] = rng.uniform(0.5, 1.0, (n_frames, 17))
+    for joint, (x, y), spread in (
+        (3, (335, 60), 8), (4, (330, 60), 8), (5, (322, 100), 8), (6, (318, 100), 8),
+        (11, (324, 200), 10), (12, (320, 200), 10), (13, (334, 320), 15), (14, (330, 320), 15),
+        (15, (324, 440), 20), (16, (320, 440), 20),
+    ):
+        kpts[:, joint, :2] = [x, y] + rng.normal(0, spread, (n_frames, 2))
+    for knee in (13, 14):
+        dropped = rng.random(n_frames) < 0.05
+        kpts[dropped, knee] = 0
+    return kpts
+
+
+def calculate_angle(p1, p2, p3):
+    v1 = np.array([p1[0] - p2[0], p1[1] - p2[1]])
+    v2 = np.array([p3[0] - p2[0], p3[1] - p2[1]])
+    mag1 = np.linalg.norm(v1)
+    mag2 = np.linalg.norm(v2)
+    if mag1 == 0 or mag2 == 0: return 180.0
+    cos_angle = np.dot(v1, v2) / (mag1 * mag2)
+    return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+
+def legacy_metrics(frames):
+    """The original per-frame scalar loop from VisionEngine.analyze_video."""
+    valgus_angles, shin_angles, hip_deviations = [], [], []
+    for kpts in frames:
+        r_hip, r_knee, r_ankle = kpts[12][:2], kpts[14][:2], kpts[16][:2]
+        if np.any(r_hip == 0) or np.any(r_knee == 0) or np.any(r_ankle == 0):
+            continue
+        leg_length = np.linalg.norm(r_hip - r_ankle)
+        if leg_length == 0: continue
+        midpoint_x = (r_hip[0] + r_ankle[0]) / 2
+        hip_deviations.append((r_knee[0] - midpoint_x) / leg_length)
+        valgus_angles.append(abs(180 - calculate_angle(r_hip, r_knee, r_ankle)))
+        dx = r_knee[0] - r_ankle[0]
+        dy = r_knee[1] - r_ankle[1]
+        if dy != 0:
+            shin_angles.append(math.degrees(math.atan2(dx, dy)))
+    return {"valgus": valgus_angles, "hip": hip_deviations, "shin": shin_angles}
+
+
+def check_parity(legacy, vectorized, atol=1e-8):
+    for key in ("valgus", "hip", "shin"):
+        a = np.asarray(legacy[key], dtype=np.float64)
+        b = vectorized["values"][:, COLUMN[f"{key}_right"]]
+        b = b[~np.isnan(b)]
+        assert a.shape == b.shape, f"{key}: {a.shape} != {b.shape}"
+        assert np.allclose(a, b, atol=atol), f"{key}: max diff {np.max(np.abs(a - b))}"
+
+
+def check_confidence_invariance(kpts: np.ndarray):
+    """Same pose, every confidence scaled (one side only, too): metrics must not move."""
+    reference = compute_joint_metrics(kpts, min_conf=0.0)["values"]
+    one_side = kpts.copy()
+    one_side[:, [4, 6, 12, 14, 16], 2] = 0 # Right side gone
+    one_side_reference = compute_joint_metrics(one_side, min_conf=0.0)["values"]
+    for scale in (0.35, 0.5):
+        for pose, expected in ((kpts, reference), (one_side, one_side_reference)):
+            scaled = pose.copy()
+            scaled[..., 2] *= scale
+            values = compute_joint_metrics(scaled, min_conf=0.0)["values"]
+            assert np.allclose(values, expected, equal_nan=True), \
+                f"metrics change with confidence x{scale}: max diff {np.nanmax(np.abs(values - expected))}"
+
+
+def bench_metrics(n_frames: int, repeats: int):
+    # float64 on both sides: the vectorized path upcasts, and float32 arccos
+    # near 180 degrees drifts by ~0.02 which would mask real regressions.
+    kpts = synthetic_keypoints(n_frames).astype(np.float64)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        legacy = legacy_metrics(kpts)
+    legacy_fps = n_frames * repeats / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        vectorized = compute_joint_metrics(kpts)
+    vector_fps = n_frames * repeats / (time.perf_counter() - start)
+
+    check_parity(legacy, vectorized)
+    check_confidence_invariance(kpts)
+    print(f"Metric extraction ({n_frames} frames x {repeats}):")
+    print(f"  per-frame scalar (right leg, 3 metrics) : {legacy_fps:>12,.0f} frames/sec")
+    print(f"  vectorized (bilateral, 8 metrics)       : {vector_fps:>12,.0f} frames/sec  ({vector_fps / legacy_fps:.1f}x)")
+    print("  right-leg parity                        : OK")
+    print("  confidence invariance                   : OK")
+    assert vector_fps > legacy_fps, "Joint metrics must stay cheaper per frame than the scalar loop"
+
+
+def bench_video(video_path: str, batch_size: int):
+    from app.core.vision_engine import VisionEngine
+
+    engine = VisionEngine()
+    engine.analyze_video(video_path, batch_size=batch_size) # Warm up model/kernels
+
+    results = {}
+    for label, size in (("per-frame", 1), (f"batch={batch_size}", batch_size)):
+        start = time.perf_counter()
+        results[label] = engine.analyze_video(video_path, batch_size=size)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<12}: {elapsed:.2f}s -> {results[label]}")
+
+    first, second = results.values()
+    assert first["hip_rotation"] == second["hip_rotation"]
+    assert first["foot_strike"] == second["foot_strike"]
+    assert abs(first["valgus"] - second["valgus"]) < 1e-3
+    print("  parity      : OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--video", help="Optional clip to run through the real YOLO model")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    bench_metrics(args.frames, args.repeats)
+    if args.video:
+        print(f"Full pipeline on {args.video}:")
+        bench_video(args.video, args.batch_size)
@@ -0,0 +1,84 @@
+"""
+Process-pool scaling benchmark (needs ultralytics + the YOLO weights).
+
+    python -m benchmarks.bench_vision_pool --video clip.mp4 --max-workers 8
+
+Without --video a synthetic clip is generated. For each worker count
+(1, 2, 4, ... max) it times:
+  - one long clip split into parallel time segments
+  - a batch of whole clips analyzed concurrently (one per process)
+and checks the segmented report matches the single-process one.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.core.vision_pool import VisionPool
+
+
+def synthetic_clip(path: str, frames: int, size=(640, 480)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, size)
+    rng = np.random.default_rng(0)
+    for i in range(frames):
+        frame = np.full((size[1], size[0], 3), 40, np.uint8)
+        # A moving "athlete" blob so the pose model has something to chew on
+        x = 100 + (i * 5) % (size[0] - 200)
+        cv2.rectangle(frame, (x, 100), (x + 80, 400), (200, 180, 160), -1)
+        frame += rng.integers(0, 10, frame.shape, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+def worker_counts(max_workers: int):
+    count = 1
+    while count < max_workers:
+        yield count
+        count *= 2
+    yield max_workers
+
+
+async def bench(pool: VisionPool, video: str, clips: int):
+    start = time.perf_counter()
+    segmented = await pool.analyze(video)
+    segmented_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await pool.analyze_many([video] * clips)
+    batch_time = time.perf_counter() - start
+    return segmented, segmented_time, batch_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video")
+    parser.add_argument("--frames", type=int, default=1800, help="Synthetic clip length")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--clips", type=int, default=8, help="Clips in the concurrent batch")
+    parser.add_argument("--segment-min-frames", type=int, default=150)
+    args = parser.parse_args()
+
+    video = args.video
+    if video is None:
+        video = os.path.join(tempfile.gettempdir(), "prehab_bench_clip.avi")
+        synthetic_clip(video, args.frames)
+
+    baseline = None
+    print(f"{'workers':>7} {'segmented':>10} {'speedup':>8} {'batch':>9} {'clips/s':>8}")
+    for workers in worker_counts(args.max_workers):
+        pool = VisionPool(workers=workers, segment_min_frames=args.segment_min_frames)
+        pool.warmup()
+        report, seg_time, batch_time = asyncio.run(bench(pool, video, args.clips))
+        pool.shutdown()
+
+        if baseline is None:
+            baseline = (report, seg_time)
+        else:
+            assert report["hip_rotation"] == baseline[0]["hip_rotation"]
+            assert report["foot_strike"] == baseline[0]["foot_strike"]
+            assert abs(report["valgus"] - baseline[0]["valgus"]) < 1.0, (report, baseline[0])
+        print(f"{workers:>7} {seg_time:>9.2f}s {baseline[1] / seg_time:>7.1f}x {batch_time:>8.2f}s {args.clips / batch_time:>8.2f}")
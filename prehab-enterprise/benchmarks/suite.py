@@ -0,0 +1,412 @@
+"""
+End-to-end API performance suite: app.main in-process, offline, CPU only.
+
+    python -m benchmarks.suite                                   # every scenario, stub vision model
+    python -m benchmarks.suite --scenarios analyze,video --concurrency 16
+    python -m benchmarks.suite --real-model                      # real VisionEngine on synthetic clips
+    python -m benchmarks.suite --fail-on-regression              # exit 1 if a scenario regressed (CI)
+
+Every scenario sends real HTTP requests through httpx's ASGI transport
+(routing, auth, validation, DB, serialization; no sockets) against a
+throwaway SQLite database, with `--concurrency` requests in flight, and
+reports throughput and p50 / p95 / p99 latency (best of `--repeat` rounds).
+
+The vision model is replaced by a stub that sleeps `--stub-ms` per clip and
+returns a synthetic runner's real scores, so the video paths measure
+everything around inference (upload, hashing, result cache, Digital Twin,
+keypoint storage). --real-model uses the actual VisionEngine on rendered
+clips instead (needs ultralytics and the weights already on disk; nothing
+is downloaded).
+
+Each run is appended to `--history` (JSON lines: commit, host, config,
+per-scenario numbers). A scenario is flagged when its p95 is more than
+`--threshold` above, or its throughput that much below, the median of the
+last `--baseline-runs` runs with the same host, mode and config, and also
+outside the range those runs spanned (so host noise isn't reported). Runs
+that return errors are always flagged.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import DEFAULT_DATABASE_URL
+
+WORKDIR = tempfile.mkdtemp(prefix="prehab-suite-")
+atexit.register(shutil.rmtree, WORKDIR, ignore_errors=True)
+if os.environ["DATABASE_URL"] == DEFAULT_DATABASE_URL:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'suite.db')}"
+os.environ.setdefault("TRACK_STORE_DIR", os.path.join(WORKDIR, "tracks"))
+
+import cv2
+import httpx
+import numpy as np
+
+from app.core.biomechanics import L_HIP, L_SHOULDER, R_HIP, R_SHOULDER, SIDES
+from app.core.security import create_access_token, get_password_hash
+from app.core.vision_engine import VisionEngine
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.models.user import Organization, User
+from benchmarks.bench_gait import FPS, SAMPLE_EVERY, runner
+
+API = "/api/v1"
+PASSWORD = "suite-password"
+SQUAD_SIZE = 100
+BULK_ROWS = 1000
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), "results.jsonl")
+# Stick figure: ear-shoulder-hip-knee-ankle on each side, plus shoulder and hip lines
+EDGES = [(int(a), int(b)) for side in SIDES for a, b in zip(side[:-1], side[1:])]
+EDGES += [(L_SHOULDER, R_SHOULDER), (L_HIP, R_HIP)]
+
+
+# === 1. VISION MODEL ===
+
+def synthetic_clip(path: str, seconds: float, width: int, height: int) -> str:
+    """Renders the bench_gait runner as a stick figure on a pitch-green background (mp4)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), FPS, (width, height))
+    scale = height / 520
+    for _, clean, _ in runner(int(seconds * FPS / SAMPLE_EVERY)):
+        frame = np.full((height, width, 3), (60, 140, 60), dtype=np.uint8)
+        points = (clean[:, :2] * scale + [width / 2 - 330 * scale, 0]).astype(int)
+        for a, b in EDGES:
+            if clean[a, :2].any() and clean[b, :2].any():
+                cv2.line(frame, tuple(points[a]), tuple(points[b]), (230, 230, 230), max(2, int(14 * scale)))
+        cv2.circle(frame, tuple(points[3] - [0, int(10 * scale)]), int(22 * scale), (200, 180, 160), -1)
+        for _ in range(SAMPLE_EVERY):
+            writer.write(frame)
+    writer.release()
+    return path
+
+
+class StubVisionEngine(VisionEngine):
+    """Same interface, no model: sleeps like inference would, returns a synthetic runner's scores."""
+
+    def __init__(self, infer_ms: float, seconds: float = 10.0):
+        super().__init__()
+        self.infer_ms = infer_ms
+        samples = list(runner(int(seconds * FPS / SAMPLE_EVERY)))
+        frames = np.array([frame_index for frame_index, _, _ in samples], dtype=np.int32)
+        keypoints = np.stack([noisy for _, _, noisy in samples])
+        n = len(frames)
+        counters = {"total": n * SAMPLE_EVERY, "decoded": n, "inferred": n, "with_pose": n, "sampling": "stride"}
+        self.results = VisionEngine.score_track(frames, keypoints, FPS, counters)
+        self.results["frames"] = counters
+        self.track = {"fps": FPS, "frames": frames, "keypoints": keypoints}
+
+    def analyze_video(self, video_path: str, batch_size=None, keep_track: bool = False) -> dict:
+        time.sleep(self.infer_ms / 1000)
+        results = dict(self.results)
+        if keep_track:
+            results["track"] = self.track
+        return results
+
+
+# === 2. SCENARIOS ===
+
+def seed() -> dict:
+    """One organization: a coach, SQUAD_SIZE athletes, and a user with a real password hash for /login."""
+    stamp = time.time_ns()
+    with SessionLocal() as db:
+        org = Organization(name=f"Suite FC {stamp}", subscription_tier="pro")
+        db.add(org)
+        db.flush()
+        coach = User(email=f"coach-{stamp}@suite", hashed_password="x", role="coach", organization_id=org.id)
+        login = User(email=f"login-{stamp}@suite", hashed_password=get_password_hash(PASSWORD), role="athlete")
+        athletes = [
+            User(email=f"athlete{i}-{stamp}@suite", hashed_password="x", role="athlete",
+                 full_name=f"Athlete {i}", organization_id=org.id)
+            for i in range(SQUAD_SIZE)
+        ]
+        db.add_all([coach, login, *athletes])
+        db.commit()
+        return {
+            "coach": {"Authorization": "Bearer " + create_access_token(data={"sub": coach.email})},
+            "athlete": {"Authorization": "Bearer " + create_access_token(data={"sub": athletes[0].email})},
+            "login_email": login.email,
+            "athlete_ids": [a.id for a in athletes],
+        }
+
+
+def random_input() -> dict:
+    return {
+        "mechanics": {
+            "knee_valgus_angle": random.uniform(0, 30),
+            "hip_internal_rotation": random.choice(["Normal", "Excessive Internal Rotation"]),
+            "foot_strike_pattern": random.choice(["Midfoot/Forefoot", "Heel Strike (Overstride)"]),
+        },
+        "load_metrics": {"acwr": random.uniform(0.6, 1.8)},
+    }
+
+
+def scenarios(ctx: dict, clip: bytes) -> dict:
+    """name -> (default request count, expected status, i -> httpx request kwargs)."""
+    now = datetime.now(timezone.utc)
+
+    def bulk(i):
+        rows = [
+            {"user_id": random.choice(ctx["athlete_ids"]), "timestamp": (now - timedelta(minutes=i * BULK_ROWS + r)).isoformat(),
+             "steps": random.randint(0, 20000), "sleep_hours": random.uniform(5, 9), "training_load": random.uniform(100, 600)}
+            for r in range(BULK_ROWS)
+        ]
+        return {"method": "POST", "url": f"{API}/analytics/biometrics/bulk", "headers": ctx["coach"], "json": {"rows": rows}}
+
+    return {
+        "auth.login": (20, 200, lambda i: {
+            "method": "POST", "url": f"{API}/auth/login", "data": {"username": ctx["login_email"], "password": PASSWORD},
+        }),
+        "auth.token": (1000, 200, lambda i: {
+            "method": "GET", "url": f"{API}/analytics/cache/stats", "headers": ctx["athlete"],
+        }),
+        "analyze": (500, 200, lambda i: {
+            "method": "POST", "url": f"{API}/analytics/analyze", "headers": ctx["athlete"], "json": random_input(),
+        }),
+        # A few unique bytes at the end = a new clip every time (past the result cache)
+        "video": (100, 200, lambda i: {
+            "method": "POST", "url": f"{API}/analytics/analyze/video", "headers": ctx["athlete"],
+            "files": {"file": ("clip.mp4", clip + os.urandom(16), "video/mp4")},
+        }),
+        "video.cached": (200, 200, lambda i: {
+            "method": "POST", "url": f"{API}/analytics/analyze/video", "headers": ctx["athlete"],
+            "files": {"file": ("clip.mp4", clip, "video/mp4")},
+        }),
+        "squad": (30, 200, lambda i: {
+            "method": "POST", "url": f"{API}/analytics/squad/analyze", "headers": ctx["coach"],
+            "json": {"athletes": [{"user_id": uid, "data": random_input()} for uid in ctx["athlete_ids"]]},
+        }),
+        "bulk": (30, 201, bulk),
+        "history": (300, 200, lambda i: {
+            "method": "GET", "url": f"{API}/analytics/history", "headers": ctx["coach"],
+            "params": {"user_id": random.choice(ctx["athlete_ids"]), "start": (now - timedelta(days=365)).date().isoformat()},
+        }),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, build, expected: int, requests: int, concurrency: int) -> dict:
+    # Warm-up (lazy imports, caches, first DB connections) is not measured
+    for i in range(min(5, requests)):
+        await client.request(**build(-1 - i))
+
+    pending = iter(range(requests))
+    latencies, failures = [], []
+
+    async def worker():
+        for i in pending:
+            request = build(i) # Payload built outside the timed section
+            start = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != expected:
+                failures.append(f"{response.status_code} {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": requests,
+        "errors": len(failures),
+        "first_error": failures[0] if failures else None,
+        "throughput": requests / wall,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+async def run_suite(names: list, scale: float, concurrency: int, repeat: int, clip: bytes) -> dict:
+    """
+    Best of `repeat` rounds per scenario, per metric (highest throughput,
+    lowest percentiles): other load on the box only ever slows a round down.
+    """
+    results = {}
+    async with app.router.lifespan_context(app):
+        table = scenarios(seed(), clip)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://suite", timeout=None) as client:
+            for name in names:
+                requests, expected, build = table[name]
+                rounds = [
+                    await run_scenario(client, build, expected, max(1, int(requests * scale)), concurrency)
+                    for _ in range(repeat)
+                ]
+                results[name] = {
+                    "requests": rounds[0]["requests"],
+                    "errors": sum(r["errors"] for r in rounds),
+                    "first_error": next((r["first_error"] for r in rounds if r["first_error"]), None),
+                    "throughput": max(r["throughput"] for r in rounds),
+                    **{key: min(r[key] for r in rounds) for key in ("p50_ms", "p95_ms", "p99_ms")},
+                }
+                print_row(name, results[name])
+    return results
+
+
+# === 3. HISTORY & REGRESSIONS ===
+
+def host() -> dict:
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def engine_name() -> str:
+    return engine.dialect.name
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(__file__))
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, timeout=10, cwd=os.path.dirname(__file__)).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "") if out.returncode == 0 else "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def load_history(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def baseline(history: list, run: dict, runs: int) -> dict:
+    """Per scenario: median and worst p95 / throughput of the last `runs` comparable runs."""
+    comparable = [
+        past for past in history
+        if past["host"] == run["host"] and past["config"] == run["config"]
+    ][-runs:]
+    summary = {}
+    for name in run["scenarios"]:
+        past = [p["scenarios"][name] for p in comparable if name in p["scenarios"]]
+        if past:
+            summary[name] = {
+                "runs": len(past),
+                "p95_ms": statistics.median(p["p95_ms"] for p in past),
+                "worst_p95_ms": max(p["p95_ms"] for p in past),
+                "throughput": statistics.median(p["throughput"] for p in past),
+                "worst_throughput": min(p["throughput"] for p in past),
+            }
+    return summary
+
+
+def regressions(run: dict, base: dict, threshold: float, min_runs: int) -> dict:
+    """
+    A metric regressed when it is `threshold` worse than the baseline median
+    AND worse than every baseline run: the spread of the earlier runs is this
+    host's noise, and being inside it is not a signal.
+    """
+    flagged = {}
+    for name, now in run["scenarios"].items():
+        reasons = [f"{now['errors']} errors"] if now["errors"] else []
+        past = base.get(name)
+        if past is not None and past["runs"] >= min_runs:
+            p95 = now["p95_ms"] / past["p95_ms"] - 1
+            throughput = now["throughput"] / past["throughput"] - 1
+            if p95 > threshold and now["p95_ms"] > past["worst_p95_ms"]:
+                reasons.append(f"p95 {p95:+.0%}")
+            if throughput < -threshold and now["throughput"] < past["worst_throughput"]:
+                reasons.append(f"throughput {throughput:+.0%}")
+        if reasons:
+            flagged[name] = reasons
+    return flagged
+
+
+def print_row(name: str, result: dict):
+    print(f"  {name:<13} {result['requests']:>6} {result['errors']:>5} {result['throughput']:>9.1f} "
+          f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+    if result["first_error"]:
+        print(f"    first error: {result['first_error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="all", help="Comma-separated, from: " + ", ".join(scenarios({}, b"")))
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplies every scenario's request count")
+    parser.add_argument("--repeat", type=int, default=3, help="Rounds per scenario; the best one is kept")
+    parser.add_argument("--stub-ms", type=float, default=50.0, help="Simulated inference time per clip")
+    parser.add_argument("--real-model", action="store_true")
+    parser.add_argument("--clip-seconds", type=float, default=5.0)
+    parser.add_argument("--clip-size", default="1280x720")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON-lines file the run is appended to")
+    parser.add_argument("--no-record", action="store_true", help="Compare with the history but don't append")
+    parser.add_argument("--baseline-runs", type=int, default=5)
+    parser.add_argument("--min-baseline-runs", type=int, default=3, help="Earlier runs needed before flagging slowdowns")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative p95 / throughput change flagged")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    names = list(scenarios({}, b"")) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = set(names) - set(scenarios({}, b""))
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # 1. Vision model: stub (default) or the real one, warmed up outside the measurements
+    from app.api.v1.endpoints import analytics
+    width, height = (int(v) for v in args.clip_size.split("x"))
+    clip_path = synthetic_clip(os.path.join(WORKDIR, "clip.mp4"), args.clip_seconds, width, height)
+    if args.real_model:
+        try:
+            analytics.vision_model.analyze_video(clip_path)
+        except ImportError as exc:
+            raise SystemExit(f"--real-model needs the vision extras installed ({exc})")
+    else:
+        analytics.vision_model = StubVisionEngine(args.stub_ms)
+    with open(clip_path, "rb") as handle:
+        clip = handle.read()
+
+    mode = "real" if args.real_model else f"stub {args.stub_ms:g} ms"
+    print(f"{len(names)} scenarios x {args.repeat} rounds, concurrency {args.concurrency}, vision {mode}, clip {args.clip_size} "
+          f"{args.clip_seconds:g}s ({len(clip) / 1024:.0f} KiB)")
+    print(f"  {'scenario':<13} {'req':>6} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    results = asyncio.run(run_suite(names, args.scale, args.concurrency, args.repeat, clip))
+
+    # 2. Compare with earlier runs of the same config on this host, then record
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "host": host(),
+        "config": {
+            "vision": mode, "concurrency": args.concurrency, "scale": args.scale, "repeat": args.repeat,
+            "clip": f"{args.clip_size}@{args.clip_seconds:g}s", "database": engine_name(),
+        },
+        "scenarios": results,
+    }
+    base = baseline(load_history(args.history), run, args.baseline_runs)
+    flagged = regressions(run, base, args.threshold, args.min_baseline_runs)
+    if base:
+        print(f"vs median of the last {max(b['runs'] for b in base.values())} comparable runs:")
+        for name, now in results.items():
+            if name in base:
+                status = "REGRESSION " + ", ".join(flagged[name]) if name in flagged else "ok"
+                if base[name]["runs"] < args.min_baseline_runs and name not in flagged:
+                    status = f"baseline {base[name]['runs']}/{args.min_baseline_runs}"
+                print(f"  {name:<13} p95 {now['p95_ms'] / base[name]['p95_ms'] - 1:+6.1%}   "
+                      f"req/s {now['throughput'] / base[name]['throughput'] - 1:+6.1%}   {status}")
+    else:
+        print("no comparable earlier runs (this one starts the baseline)")
+    for name in flagged.keys() - base.keys():
+        print(f"  {name:<13} REGRESSION {', '.join(flagged[name])}")
+    if not args.no_record:
+        with open(args.history, "a") as handle:
+            handle.write(json.dumps(run) + "\n")
+        print(f"recorded in {args.history}")
+    if flagged and args.fail_on_regression:
+        raise SystemExit(f"Regressed: {', '.join(flagged)}")
@@ -12,6 +12,42 @@ st.set_page_config(page_title="Prehab 2.0 | Elite Sports Twin", layout="wide")
 if 'token' not in st.session_state:
     st.session_state.token = None
 
+# === API CLIENT (cached) ===
+# One keep-alive session per Streamlit server; responses are cached per token
+# and query for a minute, so reruns (every widget click) don't hit the API.
+@st.cache_resource
+def api_session():
+    return requests.Session()
+
+def api_get_pages(path, token, params, key="points"):
+    """GET that follows next_cursor until the last page, concatenating `key`."""
+    headers = {"Authorization": f"Bearer {token}"}
+    params, items = dict(params), []
+    while True:
+        res = api_session().get(f"{API_URL}{path}", headers=headers, params=params, timeout=30)
+        res.raise_for_status()
+        page = res.json()
+        items.extend(page[key])
+        if not page.get("next_cursor"):
+            return items
+        params["cursor"] = page["next_cursor"]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_team_summary(token, days):
+    return pd.DataFrame(api_get_pages("/analytics/team/summary", token, {"days": days}, key="athletes"))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_squad_acwr(token):
+    res = api_session().get(f"{API_URL}/analytics/squad/acwr", headers={"Authorization": f"Bearer {token}"}, timeout=30)
+    res.raise_for_status()
+    return pd.DataFrame(res.json()["athletes"])
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_history(token, user_id, days, max_points=120):
+    params = {"user_id": user_id, "max_points": max_points}
+    params["start"] = (pd.Timestamp.utcnow().normalize() - pd.Timedelta(days=days - 1)).date().isoformat()
+    return pd.DataFrame(api_get_pages("/analytics/history", token, params))
+
 # === SIDEBAR: LOGIN ===
 with st.sidebar:
     st.image("https://cdn-icons-png.flaticon.com/512/3048/3048122.png", width=100)
@@ -91,19 +127,47 @@ if st.session_state.token:
                         except Exception as e:
                             st.error(f"Connection Failed: {e}")
 
-    # --- TAB 2: MOCK TEAM DATA ---
+    # --- TAB 2: TEAM DATA (history rollups + server ACWR) ---
     with tab2:
         st.subheader("Team Workload Management")
-        mock_data = pd.DataFrame({
-            "Player": ["Rona", "Messi", "Neymar", "Chhetri"],
-            "Acute Load": [1.5, 0.8, 1.2, 0.9], 
-            "Recovery": [40, 90, 60, 85]
-        })
-        
-        fig = go.Figure(data=[
-            go.Bar(name='ACWR (Load)', x=mock_data['Player'], y=mock_data['Acute Load'], marker_color='indianred'),
-            go.Bar(name='Recovery %', x=mock_data['Player'], y=mock_data['Recovery']/100, marker_color='lightgreen')
-        ])
-        st.plotly_chart(fig, use_container_width=True)
+        days = st.selectbox("Window", [7, 28, 90], format_func=lambda d: f"Last {d} days")
+        token = st.session_state.token
+        try:
+            team = fetch_team_summary(token, days)
+            acwr = fetch_squad_acwr(token)
+        except requests.RequestException as e:
+            st.error(f"Could not load team data: {e}")
+            team = pd.DataFrame()
+
+        if team.empty:
+            st.info("No athletes in your organization yet.")
+        else:
+            if not acwr.empty:
+                team = team.merge(acwr[["user_id", "acwr"]], on="user_id", how="left", suffixes=("_logged", ""))
+            team["Player"] = team["full_name"].fillna(team["user_id"].astype(str))
+            team["Recovery"] = (team["sleep_hours"] / 8).clip(upper=1) * 100 # Sleep vs an 8h target
+
+            fig = go.Figure(data=[
+                go.Bar(name='ACWR (Load)', x=team['Player'], y=team['acwr'], marker_color='indianred'),
+                go.Bar(name='Recovery %', x=team['Player'], y=team['Recovery']/100, marker_color='lightgreen')
+            ])
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(
+                team[["Player", "logs", "acwr", "training_load_total", "sleep_hours", "steps", "score"]],
+                use_container_width=True, hide_index=True,
+            )
+
+            # Drill-down: one athlete's history, downsampled server-side
+            player = st.selectbox("Athlete history", team["user_id"], format_func=lambda u: team.set_index("user_id")["Player"][u])
+            history_days = st.select_slider("History", [30, 90, 180, 365, 730], value=90)
+            try:
+                points = fetch_history(token, int(player), history_days)
+            except requests.RequestException as e:
+                st.error(f"Could not load history: {e}")
+                points = pd.DataFrame()
+            if points.empty:
+                st.info("No logs for this athlete in that period.")
+            else:
+                st.line_chart(points.set_index("start")[["training_load_total", "acwr", "sleep_hours"]])
 else:
     st.info("Please login from the sidebar to access the Digital Twin.")
\ No newline at end of file